@@ -0,0 +1,118 @@
+"""Helpers of benchmarks running queries directly with a privileged account against generated data."""
+import statistics
+import uuid
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Iterator
+
+from PyQt5.QtSql import QSqlDatabase, QSqlQuery
+
+from phone_book import database as db
+from phone_book.app_settings import get_settings, headless_application
+from phone_book.database.statements import ParsedStatement
+
+LETTER_SETS = ("АБ", "ВГ", "ДЕЁ", "ЖЗИЙ", "КЛ", "МН", "ОП", "РС", "ТУ", "ФХ", "ЦЧШЩ", "ЪЫЬЭ", "ЮЯ")
+# generated names start with a Cyrillic letter mostly & with a Latin one sometimes, i.e. go to the "rest" page
+FIRST_LETTERS = "".join(LETTER_SETS) + "ABC"
+
+
+def add_connection_arguments(parser):
+    parser.add_argument("--username", required=True, help="an account having SELECT, INSERT & DELETE privileges")
+    parser.add_argument("--password", default="")
+
+
+def connect(args, connection_name="benchmark") -> QSqlDatabase:
+    """open a connection with the application's settings but the given account"""
+    settings, default_settings = get_settings()
+    params = {}
+    for key in db.ConnectionParams._fields:
+        params[key] = settings.value("database/" + key, default_settings.value("database/" + key))
+    params["username"], params["password"] = args.username, args.password
+    conn = QSqlDatabase.addDatabase(params["qsql_driver"], connection_name)
+    for val, method in ((params["host_name"], conn.setHostName), (int(params["port"]), conn.setPort),
+                        (params["database_name"], conn.setDatabaseName), (params["username"], conn.setUserName),
+                        (params["password"], conn.setPassword)):
+        method(val)
+    if not conn.open():
+        db.process_error(conn)
+    return conn
+
+
+@contextmanager
+def connected(args, connection_name="benchmark") -> Iterator[QSqlDatabase]:
+    """set up an application object & the database as the application does, then open a connection of the given
+    account (see `connect()`); everything is closed on exit"""
+    with headless_application():
+        conn = connect(args, connection_name)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+
+def exec_query(conn, sql, **values) -> QSqlQuery:
+    statement = ParsedStatement(conn, sql)
+    statement.bind_values(**values)
+    return statement.exec()
+
+
+def create_owner(conn, contacts_count) -> int:
+    """create a user with generated contacts (the Sequence engine is needed) & return its id"""
+    suffix = uuid.uuid4().hex[:8]
+    query = exec_query(conn, "INSERT INTO users (username, email, password, birth_date) "
+                             "VALUES (:username, :email, MD5('password'), '2000-01-01')",
+                       username="bench_" + suffix, email="bench_{}@example.com".format(suffix))
+    owner_id = int(query.lastInsertId())
+    start = perf_counter()
+    exec_query(conn, """
+        INSERT INTO contacts (name, phone_number, birth_date, owner_id)
+        SELECT CONCAT(SUBSTRING(:letters, 1 + seq % CHAR_LENGTH(:letters), 1), 'ontact ', seq),
+               LPAD(seq, 11, '8'),
+               '1950-01-01' + INTERVAL seq % 25000 DAY,
+               :owner_id
+        FROM seq_1_to_{}""".format(int(contacts_count)), letters=FIRST_LETTERS, owner_id=owner_id)
+    exec_query(conn, "ANALYZE TABLE contacts")
+    print("{} contacts generated in {:.1f} s\n".format(contacts_count, perf_counter() - start))
+    return owner_id
+
+
+def create_session(conn, owner_id) -> str:
+    """create a session of the user & bind it to the connection"""
+    session_key = uuid.uuid4().hex
+    exec_query(conn, "INSERT INTO sessions (user_id, session_key, expires_at) "
+                     "VALUES (:owner_id, UNHEX(:session_key), session_expiry())",
+               owner_id=owner_id, session_key=session_key)
+    exec_query(conn, "CALL bind_session(:session_key)", session_key=session_key)
+    return session_key
+
+
+def delete_owner(conn, owner_id):
+    # column-level REFERENCES clauses don't create foreign keys, so nothing is deleted in cascade
+    for table, column in (("contacts", "owner_id"), ("deleted_contacts", "owner_id"), ("sessions", "user_id"),
+                          ("users", "id")):
+        exec_query(conn, "DELETE FROM {} WHERE {} = :owner_id".format(table, column), owner_id=owner_id)
+
+
+def print_explain(conn, title, sql, **values):
+    query = exec_query(conn, "EXPLAIN " + sql, **values)
+    record = query.record()
+    names = [record.fieldName(idx) for idx in range(record.count())]
+    print(title)
+    print("  " + " | ".join(names))
+    while query.next():
+        print("  " + " | ".join(str(query.value(idx)) for idx in range(len(names))))
+    print()
+
+
+def time_query(conn, iterations, sql, **values):
+    """returns (median ms per query, rows)"""
+    timings = []
+    rows = 0
+    for _ in range(iterations):
+        start = perf_counter()
+        query = exec_query(conn, sql, **values)
+        rows = 0
+        while query.next():
+            rows += 1
+        timings.append((perf_counter() - start) * 1000)
+    return statistics.median(timings), rows
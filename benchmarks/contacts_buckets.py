@@ -0,0 +1,67 @@
+"""Compares the letter set filter of contacts pages: `REGEXP` over every contact vs the indexed `name_bucket` column.
+
+Run from the project directory against a development database created by `database/create_database.sql`.
+Benchmark contacts are generated by the server (the Sequence engine is needed) & the queries are run directly,
+so an account having SELECT, INSERT & DELETE privileges is needed, e.g. root:
+
+    python -m benchmarks.contacts_buckets --username root --password ... [--contacts N] [--iterations N] [--keep]
+
+EXPLAIN output of both queries is printed along with their timings.
+"""
+import argparse
+
+from .common import (LETTER_SETS, add_connection_arguments, connected, create_owner, delete_owner, print_explain,
+                     time_query)
+
+REGEXP_QUERY = """
+SELECT id, name, phone_number, birth_date
+FROM contacts
+WHERE owner_id = :owner_id
+  AND (name REGEXP CONCAT('(?i)^[', :letter_set, ']') XOR :exclude)
+ORDER BY name"""
+
+BUCKET_QUERY = """
+SELECT id, name, phone_number, birth_date
+FROM contacts
+WHERE owner_id = :owner_id
+  AND name_bucket = :bucket
+ORDER BY name"""
+
+
+def run(conn, args):
+    owner_id = create_owner(conn, args.contacts)
+    try:
+        print_explain(conn, "Before (REGEXP):", REGEXP_QUERY, owner_id=owner_id, letter_set=LETTER_SETS[0],
+                      exclude=False)
+        print_explain(conn, "After (name_bucket):", BUCKET_QUERY, owner_id=owner_id, bucket=1)
+
+        print("{:<10}{:>10}{:>16}{:>16}".format("page", "rows", "ms before", "ms after"))
+        pages = [(idx + 1, letter_set, False) for idx, letter_set in enumerate(LETTER_SETS)]
+        pages.append((0, "".join(LETTER_SETS), True))
+        for bucket, letter_set, exclude in pages:
+            before_ms, before_rows = time_query(conn, args.iterations, REGEXP_QUERY, owner_id=owner_id,
+                                                letter_set=letter_set, exclude=exclude)
+            after_ms, after_rows = time_query(conn, args.iterations, BUCKET_QUERY, owner_id=owner_id, bucket=bucket)
+            if before_rows != after_rows:
+                print("rows mismatch for {}: {} vs {}".format(letter_set, before_rows, after_rows))
+            print("{:<10}{:>10}{:>16.1f}{:>16.1f}".format("Другое" if exclude else letter_set, after_rows,
+                                                          before_ms, after_ms))
+    finally:
+        if not args.keep:
+            delete_owner(conn, owner_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_connection_arguments(parser)
+    parser.add_argument("--contacts", type=int, default=1000000)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="don't delete the benchmark user & its contacts")
+    args = parser.parse_args()
+
+    with connected(args) as conn:
+        run(conn, args)
+
+
+if __name__ == "__main__":
+    main()
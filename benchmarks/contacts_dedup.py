@@ -0,0 +1,54 @@
+"""Times the search of duplicate contacts on generated ones, serially & by a process pool; no database is needed:
+
+    python -m benchmarks.contacts_dedup [--contacts N] [--duplicates-share X] [--workers N] [--seed N]
+
+Every duplicate has the words of its original's name swapped & the phone number written with "8" instead of "+7".
+"""
+import argparse
+import os
+import random
+from time import perf_counter
+
+from phone_book.contacts_dedup import DuplicatesFinder
+
+SURNAMES = ("Иванов", "Смирнов", "Кузнецов", "Попов", "Васильев", "Петров", "Соколов", "Михайлов", "Новиков",
+            "Фёдоров", "Морозов", "Волков", "Алексеев", "Лебедев", "Семёнов", "Егоров", "Павлов", "Козлов")
+FIRST_NAMES = ("Александр", "Сергей", "Елена", "Ольга", "Андрей", "Наталья", "Дмитрий", "Татьяна", "Алексей",
+               "Ирина", "Михаил", "Анна", "Иван", "Мария", "Юрий", "Светлана")
+FIRST_JULIAN_DAY = 2415021  # Jan 1 1900
+
+
+def generate_contacts(count: int, duplicates_share: float, seed: int):
+    rnd = random.Random(seed)
+    contacts = []
+    for contact_id in range(count):
+        # a number makes names distinct, so that only generated duplicates are duplicates mostly
+        surname = "{}{}".format(rnd.choice(SURNAMES), rnd.randrange(1000))
+        first_name = rnd.choice(FIRST_NAMES)
+        phone_number = "+7{:010d}".format(rnd.randrange(10 ** 10))
+        birth_day = FIRST_JULIAN_DAY + rnd.randrange(40000)
+        contacts.append((contact_id, "{} {}".format(surname, first_name), phone_number, birth_day))
+        if rnd.random() < duplicates_share:
+            contacts.append((count + contact_id, "{} {}".format(first_name, surname), "8" + phone_number[2:],
+                             birth_day))
+    return contacts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--contacts", type=int, default=1000000)
+    parser.add_argument("--duplicates-share", type=float, default=0.02)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    contacts = generate_contacts(args.contacts, args.duplicates_share, args.seed)
+    print("{:<10}{:>12}{:>12}{:>12}".format("workers", "contacts", "groups", "s"))
+    for workers in sorted({1, args.workers}):
+        started_at = perf_counter()
+        groups = DuplicatesFinder(workers).find(contacts)
+        print("{:<10}{:>12}{:>12}{:>12.1f}".format(workers, len(contacts), len(groups), perf_counter() - started_at))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Compares name search: `LIKE '%query%'` over every contact vs the `search_contacts` procedure's index range.
+
+Run from the project directory against a development database created by `database/create_database.sql`
+with an account having SELECT, INSERT & DELETE privileges, e.g. root:
+
+    python -m benchmarks.contacts_search --username root --password ... [--contacts N] [--iterations N] [--keep]
+
+As a CALL can't be explained, EXPLAIN is shown for the procedure's prefix part.
+"""
+import argparse
+
+from .common import (add_connection_arguments, connected, create_owner, create_session, delete_owner, print_explain,
+                     time_query)
+
+SCAN_QUERY = """
+SELECT id, name, phone_number, birth_date
+FROM contacts
+WHERE owner_id = :owner_id
+  AND name LIKE CONCAT('%', :query, '%')
+ORDER BY name, id
+LIMIT :result_limit"""
+
+PREFIX_QUERY = """
+SELECT id, name, phone_number, birth_date
+FROM contacts
+WHERE owner_id = :owner_id
+  AND name LIKE CONCAT(:query, '%')
+ORDER BY name, id
+LIMIT :result_limit"""
+
+PROCEDURE_CALL = "CALL search_contacts(:query, :result_limit)"
+
+# generated names are like "Иontact 123": a letter, a common part & a number
+QUERIES = ("и", "Иontact", "иontact 1", "Иontact 12345", "Яontact 999999")
+
+
+def run(conn, args):
+    owner_id = create_owner(conn, args.contacts)
+    create_session(conn, owner_id)
+    try:
+        print_explain(conn, "Before (LIKE '%query%'):", SCAN_QUERY, owner_id=owner_id, query=QUERIES[1],
+                      result_limit=args.limit)
+        print_explain(conn, "After (prefix range):", PREFIX_QUERY, owner_id=owner_id, query=QUERIES[1],
+                      result_limit=args.limit)
+
+        print("{:<16}{:>12}{:>12}{:>16}{:>16}".format("query", "rows before", "rows after", "ms before", "ms after"))
+        for query in QUERIES:
+            before_ms, before_rows = time_query(conn, args.iterations, SCAN_QUERY, owner_id=owner_id, query=query,
+                                                result_limit=args.limit)
+            after_ms, after_rows = time_query(conn, args.iterations, PROCEDURE_CALL, query=query,
+                                              result_limit=args.limit)
+            print("{:<16}{:>12}{:>12}{:>16.1f}{:>16.1f}".format(query, before_rows, after_rows, before_ms, after_ms))
+    finally:
+        if not args.keep:
+            delete_owner(conn, owner_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_connection_arguments(parser)
+    parser.add_argument("--contacts", type=int, default=1000000)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--keep", action="store_true", help="don't delete the benchmark user & its contacts")
+    args = parser.parse_args()
+
+    with connected(args) as conn:
+        run(conn, args)
+
+
+if __name__ == "__main__":
+    main()
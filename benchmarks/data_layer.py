@@ -0,0 +1,286 @@
+"""Times every wrapper of `phone_book.database.stored_procedures` & the models' `refresh()` on generated data.
+
+Run from the project directory against a development database created by `database/create_database.sql`.
+The wrappers use the application's connection settings; generating & deleting data needs an account having
+SELECT, INSERT & DELETE privileges, e.g. root:
+
+    python -m benchmarks.data_layer --username root --password ... [--users N] [--contacts N] [--iterations N]
+                                    [--output results.json] [--compare previous.json] [--keep]
+
+Every user gets `--contacts` contacts, the calls are made on behalf of the first one. Only Qt Core is used,
+so nothing is shown & no display is needed (`QT_QPA_PLATFORM=offscreen` isn't needed either).
+The results are written as JSON: p50/p95/p99 & mean milliseconds per call, round trips per call (statements &
+preparations counted by the server) & rows per second; `--compare` prints the change of p50 & p95 against
+a previous run, e.g. of another commit.
+"""
+import argparse
+import json
+import math
+import platform
+import subprocess
+import sys
+import uuid
+from datetime import datetime
+from time import perf_counter
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from PyQt5.QtCore import PYQT_VERSION_STR, QT_VERSION_STR
+
+from phone_book import database as db
+from .common import (LETTER_SETS, add_connection_arguments, connected, create_owner, create_session, delete_owner,
+                     exec_query)
+from .round_trips import count_round_trips
+
+# letter sets' buckets & the "rest" one
+BUCKETS_COUNT = len(LETTER_SETS) + 1
+SEARCH_QUERIES = ("и", "Иontact", "иontact 1", "Яontact 999")
+# generated phone numbers are like 88888812345, see `create_owner()`
+PHONE_LOOKUPS = ("2345", "12345", "+78888812345")
+
+
+class Case(NamedTuple):
+    name: str
+    call: Callable[[int], object]  # gets an iteration's index
+    iterations: int
+    get_rows_count: Callable[[object], int] = lambda result: len(result) if isinstance(result, (list, dict)) else 0
+    prepare: Optional[Callable[[int], None]] = None  # is called before a call & isn't timed
+
+
+def percentile(sorted_values: List[float], share: float) -> float:
+    """the nearest-rank percentile"""
+    return sorted_values[max(1, math.ceil(len(sorted_values) * share)) - 1]
+
+
+def measure(case: Case) -> Dict:
+    timings = []
+    round_trips = rows = 0
+    for idx in range(case.iterations):
+        if case.prepare is not None:
+            case.prepare(idx)
+        before = count_round_trips()
+        start = perf_counter()
+        result = case.call(idx)
+        timings.append(perf_counter() - start)
+        # the SHOW statement of the second `count_round_trips()` is counted too
+        round_trips += count_round_trips() - before - 1
+        rows += case.get_rows_count(result)
+    total = sum(timings)
+    timings.sort()
+    return {
+        "iterations": case.iterations,
+        "p50_ms": percentile(timings, 0.5) * 1000,
+        "p95_ms": percentile(timings, 0.95) * 1000,
+        "p99_ms": percentile(timings, 0.99) * 1000,
+        "mean_ms": total * 1000 / case.iterations,
+        "round_trips_per_call": round_trips / case.iterations,
+        "rows_per_call": rows / case.iterations,
+        "rows_per_s": rows / total if total else 0.0,
+    }
+
+
+def make_cases(args, session_key: str, suffix: str) -> List[Case]:
+    iterations, full_iterations, batch_size = args.iterations, args.full_fetch_iterations, args.batch_size
+    registered = {"username": "bench_login_" + suffix, "password": None, "session_keys": []}
+    added = {"contact_ids": [], "batches": [], "merges": []}
+
+    def contact(prefix, idx, phone_number="89110000000"):
+        return "{} {} {}".format(prefix, suffix, idx), phone_number, "2000-01-01"
+
+    def register(idx):
+        username = "{}_{}".format(registered["username"], idx) if idx else registered["username"]
+        result, password = db.register(username, "{}@example.com".format(username), "2000-01-01")
+        if not idx:
+            registered["password"] = password
+        return result
+
+    def log_in(idx):
+        session = db.log_in(registered["username"], registered["password"])
+        registered["session_keys"].append(session)
+        return session
+
+    def add_contact(idx):
+        result, contact_id = db._add_contact(*contact("Single", idx))
+        added["contact_ids"].append(contact_id)
+        return result
+
+    def add_contacts(idx):
+        batch = [contact("Batch {}".format(idx), item_idx) for item_idx in range(batch_size)]
+        added["batches"].append(batch)
+        return db.add_contacts(batch)
+
+    def contact_ids_by_names(names: List[str]) -> List[int]:
+        # ids of contacts added in batches aren't returned, they are looked up by the search
+        return [int(db.search_contacts(name, 1)[0][0]) for name in names]
+
+    def prepare_batch_ids(idx):
+        batch = added["batches"][idx]
+        if isinstance(batch[0], tuple):
+            added["batches"][idx] = contact_ids_by_names([name for name, _, _ in batch])
+
+    def prepare_merge(idx):
+        pair = [contact("Merged {}".format(idx), item_idx) for item_idx in range(2)]
+        db.add_contacts(pair)
+        kept_id, merged_id = contact_ids_by_names([name for name, _, _ in pair])
+        added["merges"].append([(kept_id, [merged_id]) + pair[0]])
+
+    page_cursors = {}
+
+    def prepare_page_before(idx):
+        # the page before the second one of a bucket
+        rows = db.get_contacts_page(idx % BUCKETS_COUNT)
+        page_cursors[idx] = (rows[-1][1], rows[-1][0]) if rows else (None, None)
+
+    contacts_model = db.ContactsReadWriteModel()
+    # `ContactsPageReadWriteModel` filters the snapshot of the source model, so it's refreshed by the source;
+    # the proxies of all pages filter the snapshot again after every reset, just like in the application
+    pages_models = [db.ContactsPageReadWriteModel(contacts_model, letter_set) for letter_set in LETTER_SETS]
+    pages_models.append(db.ContactsPageReadWriteModel(contacts_model, "".join(LETTER_SETS), exclude=True))
+
+    def refresh_pages(idx):
+        contacts_model.refresh()
+        return contacts_model
+
+    birthdays_model = db.UpcomingBirthdaysReadModel("week", 1, parent=None)
+
+    def refresh_birthdays(idx):
+        birthdays_model.refresh()
+        return birthdays_model
+
+    def model_rows(model) -> int:
+        return model.rowCount()
+
+    return [
+        Case("check_session_exists", lambda idx: db.check_session_exists(session_key), iterations),
+        Case("get_user_info", lambda idx: db.get_user_info(session_key), iterations),
+        Case("register", register, iterations),
+        Case("log_in", log_in, iterations),
+        Case("log_out", lambda idx: db.log_out(registered["session_keys"][idx]), iterations),
+        Case("count_contacts", lambda idx: db.count_contacts(), iterations),
+        Case("get_all_contacts", lambda idx: db.get_all_contacts(), full_iterations),
+        Case("get_contacts", lambda idx: db.get_contacts(idx % BUCKETS_COUNT), iterations),
+        Case("get_contacts_page", lambda idx: db.get_contacts_page(idx % BUCKETS_COUNT), iterations),
+        Case("get_contacts_page_before",
+             lambda idx: db.get_contacts_page_before(idx % BUCKETS_COUNT, *page_cursors[idx]), iterations,
+             prepare=prepare_page_before),
+        Case("get_contacts_chunk", lambda idx: db.get_contacts_chunk(), iterations),
+        Case("search_contacts", lambda idx: db.search_contacts(SEARCH_QUERIES[idx % len(SEARCH_QUERIES)]),
+             iterations),
+        Case("lookup_by_phone", lambda idx: db.lookup_by_phone(PHONE_LOOKUPS[idx % len(PHONE_LOOKUPS)]),
+             iterations),
+        Case("get_contacts_changed_since", lambda idx: db.get_contacts_changed_since(0), full_iterations),
+        Case("get_contacts_having_birthday_in_range",
+             lambda idx: db.get_contacts_having_birthday_in_range((1, 7, 30)[idx % 3]), iterations),
+        Case("_add_contact", add_contact, iterations),
+        Case("_edit_contact",
+             lambda idx: db._edit_contact(added["contact_ids"][idx], *contact("Single edited", idx)), iterations),
+        Case("_delete_contact", lambda idx: db._delete_contact(added["contact_ids"][idx]), iterations),
+        Case("add_contacts", add_contacts, iterations),
+        Case("edit_contacts",
+             lambda idx: db.edit_contacts([(contact_id,) + contact("Batch edited {}".format(idx), item_idx)
+                                           for item_idx, contact_id in enumerate(added["batches"][idx])]),
+             iterations, prepare=prepare_batch_ids),
+        Case("delete_contacts", lambda idx: db.delete_contacts(added["batches"][idx]), iterations),
+        Case("merge_contacts", lambda idx: db.merge_contacts(added["merges"][idx]), iterations,
+             prepare=prepare_merge),
+        Case("ContactsPageReadWriteModel.refresh", refresh_pages, full_iterations, get_rows_count=model_rows),
+        Case("UpcomingBirthdaysReadModel.refresh", refresh_birthdays, iterations, get_rows_count=model_rows),
+    ]
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: Dict[str, Dict], previous: Optional[Dict[str, Dict]]):
+    header = "{:<40}{:>8}{:>10}{:>10}{:>10}{:>8}{:>12}".format("call", "calls", "p50 ms", "p95 ms", "p99 ms",
+                                                             "trips", "rows/s")
+    if previous is not None:
+        header += "{:>10}{:>10}".format("p50 Δ", "p95 Δ")
+    print(header)
+    for name, result in results.items():
+        line = "{:<40}{:>8}{:>10.2f}{:>10.2f}{:>10.2f}{:>8.1f}{:>12.0f}".format(
+            name, result["iterations"], result["p50_ms"], result["p95_ms"], result["p99_ms"],
+            result["round_trips_per_call"], result["rows_per_s"])
+        previous_result = None if previous is None else previous.get(name)
+        if previous_result is not None:
+            line += "".join("{:>+10.0%}".format(result[key] / previous_result[key] - 1) if previous_result[key]
+                            else "{:>10}".format("-") for key in ("p50_ms", "p95_ms"))
+        print(line)
+
+
+def run(conn, args) -> Dict:
+    suffix = uuid.uuid4().hex[:8]
+    owner_ids = []
+    try:
+        for _ in range(args.users):
+            owner_ids.append(create_owner(conn, args.contacts))
+        session_key = create_session(conn, owner_ids[0])
+        db.bind_session(session_key)
+
+        results = {}
+        for case in make_cases(args, session_key, suffix):
+            print("{}...".format(case.name), end="", flush=True, file=sys.stderr)
+            results[case.name] = measure(case)
+            print("\r", end="", file=sys.stderr)
+        return results
+    finally:
+        db.bind_session(None)
+        if not args.keep:
+            for owner_id in owner_ids:
+                delete_owner(conn, owner_id)
+        # users registered by the benchmark are deleted anyway
+        query = exec_query(conn, "SELECT id FROM users WHERE username LIKE :pattern",
+                           pattern="bench_login_{}%".format(suffix))
+        registered_ids = []
+        while query.next():
+            registered_ids.append(int(query.value(0)))
+        for user_id in registered_ids:
+            delete_owner(conn, user_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_connection_arguments(parser)
+    parser.add_argument("--users", type=int, default=1)
+    parser.add_argument("--contacts", type=int, default=100000, help="per user")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--full-fetch-iterations", type=int, default=10,
+                        help="iterations of calls fetching all contacts")
+    parser.add_argument("--batch-size", type=int, default=100, help="contacts per call of bulk procedures")
+    parser.add_argument("--output", default="data_layer_benchmark.json")
+    parser.add_argument("--compare", help="a JSON file of a previous run")
+    parser.add_argument("--keep", action="store_true", help="don't delete the generated users & their contacts")
+    args = parser.parse_args()
+
+    previous = None
+    if args.compare is not None:
+        with open(args.compare, encoding="utf-8") as file:
+            previous = json.load(file)["results"]
+
+    with connected(args) as conn:
+        started_at = datetime.now()
+        results = run(conn, args)
+
+    report = {
+        "started_at": started_at.isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "qt": QT_VERSION_STR,
+        "pyqt": PYQT_VERSION_STR,
+        "users": args.users,
+        "contacts_per_user": args.contacts,
+        "batch_size": args.batch_size,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print_results(results, previous)
+    print("\nwritten to {}".format(args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+"""Generates users & their contacts at production volume, deterministically from a seed.
+
+Run from the project directory. Either insert the data by batches into the database of the application's settings
+with an account having INSERT privileges, e.g. root:
+
+    python -m benchmarks.datagen --username root --password ... [--users N] [--contacts N] [--seed N]
+
+or write tab-separated files & a script loading them with `LOAD DATA LOCAL INFILE` by the mysql client:
+
+    python -m benchmarks.datagen --output-dir DIR [--users N] [--contacts N] [--seed N]
+    mysql --local-infile=1 -u root -p vista_test_task_phone_book < DIR/load.sql
+
+Names follow the frequencies of surnames' first letters, so every contacts page gets some, "Другое" too
+(Latin names & service contacts). Some contacts are near-duplicates of others: swapped words of a name, another
+way to write the number, a typo. Numbers are written with +7, 7 or 8; birthdays are spread over the year.
+Every generated user's password is "password".
+"""
+import argparse
+import hashlib
+import math
+import os
+import random
+import sys
+from datetime import date, timedelta
+from time import perf_counter
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from phone_book.database.statements import ParsedStatement
+from .common import connected, exec_query
+
+PASSWORD = "password"
+
+# a first letter's share of surnames & surnames starting with it, the most common first
+SURNAMES: Dict[str, Tuple[float, Tuple[str, ...]]] = {
+    "А": (4.0, ("Алексеев", "Андреев", "Антонов", "Абрамов", "Александров", "Аксёнов", "Агапов")),
+    "Б": (6.5, ("Богданов", "Белов", "Борисов", "Баранов", "Белоусов", "Быков", "Блинов", "Бондаренко")),
+    "В": (5.0, ("Васильев", "Волков", "Виноградов", "Воробьёв", "Власов", "Веселов", "Воронцов")),
+    "Г": (5.0, ("Григорьев", "Гусев", "Голубев", "Герасимов", "Гаврилов", "Гончаров", "Громов")),
+    "Д": (4.5, ("Дмитриев", "Давыдов", "Денисов", "Демидов", "Данилов", "Дорофеев", "Дьячков")),
+    "Е": (2.0, ("Егоров", "Ефимов", "Ершов", "Евдокимов", "Ермаков", "Елисеев")),
+    "Ё": (0.2, ("Ёлкин", "Ёжиков", "Ёрохов")),
+    "Ж": (0.8, ("Жуков", "Журавлёв", "Жданов", "Жилин")),
+    "З": (2.5, ("Зайцев", "Захаров", "Зуев", "Зиновьев", "Зверев", "Зотов")),
+    "И": (2.0, ("Иванов", "Ильин", "Игнатов", "Исаев", "Исаков", "Иванченко")),
+    "Й": (0.1, ("Йовенко", "Йылмаз")),
+    "К": (10.0, ("Кузнецов", "Козлов", "Киселёв", "Ковалёв", "Комаров", "Крылов", "Кудрявцев", "Калинин",
+                 "Кравченко", "Ким")),
+    "Л": (4.5, ("Лебедев", "Лазарев", "Логинов", "Литвинов", "Лукин", "Лаврентьев")),
+    "М": (7.0, ("Морозов", "Михайлов", "Макаров", "Медведев", "Матвеев", "Мельников", "Мартынов", "Мухаметов")),
+    "Н": (4.0, ("Новиков", "Никитин", "Николаев", "Назаров", "Некрасов", "Нестеров")),
+    "О": (2.0, ("Орлов", "Осипов", "Овчинников", "Одинцов", "Олейник")),
+    "П": (7.0, ("Попов", "Петров", "Павлов", "Поляков", "Пономарёв", "Прохоров", "Панов", "Пестов")),
+    "Р": (3.5, ("Романов", "Родионов", "Рябов", "Руденко", "Рыбаков", "Русаков")),
+    "С": (8.0, ("Смирнов", "Соколов", "Семёнов", "Сергеев", "Степанов", "Сорокин", "Соловьёв", "Сидоров")),
+    "Т": (4.5, ("Тарасов", "Тимофеев", "Титов", "Тихонов", "Третьяков", "Ткаченко")),
+    "У": (0.8, ("Уваров", "Ульянов", "Устинов", "Усманов")),
+    "Ф": (2.5, ("Фёдоров", "Филиппов", "Фролов", "Фомин", "Фадеев", "Федосеев")),
+    "Х": (2.0, ("Харитонов", "Хохлов", "Худяков", "Хасанов", "Хромов")),
+    "Ц": (0.5, ("Цветков", "Царёв", "Цой", "Цыганков")),
+    "Ч": (3.0, ("Чернов", "Чистяков", "Чижов", "Чернышёв", "Черненко")),
+    "Ш": (3.5, ("Шестаков", "Шаров", "Шубин", "Широков", "Шевченко", "Шамсутдинов")),
+    "Щ": (0.4, ("Щербаков", "Щукин", "Щеглов")),
+    "Э": (0.4, ("Эльдаров", "Эминов", "Эрдниев")),
+    "Ю": (0.4, ("Юдин", "Юсупов", "Юрьев")),
+    "Я": (1.0, ("Яковлев", "Яшин", "Ястребов", "Якушев")),
+}
+MALE_NAMES = ("Александр", "Сергей", "Дмитрий", "Андрей", "Алексей", "Максим", "Евгений", "Иван", "Михаил",
+              "Артём", "Николай", "Владимир", "Игорь", "Павел", "Олег", "Юрий", "Роман", "Виктор")
+FEMALE_NAMES = ("Елена", "Ольга", "Наталья", "Татьяна", "Анна", "Мария", "Ирина", "Екатерина", "Светлана",
+                "Юлия", "Анастасия", "Марина", "Дарья", "Людмила", "Алёна", "Ксения")
+PATRONYMICS = ("Александров", "Сергеев", "Владимиров", "Николаев", "Викторов", "Иванов", "Михайлов")
+# names of the "Другое" page
+LATIN_SURNAMES = ("Smith", "Johnson", "Müller", "Garcia", "Brown", "Nguyen", "Schmidt", "Rossi", "Kim", "Wang",
+                  "Lopez", "Martin")
+LATIN_NAMES = ("John", "Anna", "Michael", "Maria", "David", "Laura", "Peter", "Sophie", "Tom", "Emma")
+SERVICE_NAMES = ("Мама", "Папа", "Бабушка", "Такси", "Сантехник", "Врач", "Доставка пиццы", "Работа", "Офис",
+                 "24 часа аптека", "112", "#домофон", "2ГИС поддержка", "Дача сосед")
+
+MALE_SURNAME_ENDINGS = (("ский", "ская"), ("цкий", "цкая"), ("ов", "ова"), ("ев", "ева"), ("ёв", "ёва"),
+                        ("ин", "ина"), ("ын", "ына"))
+# a name's share of the formats of names
+NAME_FORMATS = (("surname_first", 55), ("first_surname", 20), ("full", 10), ("first", 3), ("latin", 8),
+                ("service", 4))
+
+
+def _zipf_weights(count: int) -> List[float]:
+    return [1 / rank for rank in range(1, count + 1)]
+
+
+def female_surname(surname: str) -> str:
+    for male_ending, female_ending in MALE_SURNAME_ENDINGS:
+        if surname.endswith(male_ending):
+            return surname[:-len(male_ending)] + female_ending
+    return surname
+
+
+class ContactsGenerator:
+    """generates (name, phone number, ISO birth date) contacts; everything is drawn from the given `random.Random`"""
+    mobile_share = 0.9
+    # shares of ways to write a number
+    phone_prefixes = (("+7", 50), ("8", 40), ("7", 10))
+
+    def __init__(self, rnd: random.Random, reference_date: date, duplicates_share=0.03):
+        self.rnd = rnd
+        self.reference_date = reference_date
+        self.duplicates_share = duplicates_share
+        letters = list(SURNAMES)
+        self._letters, self._letter_weights = letters, [SURNAMES[letter][0] for letter in letters]
+        self._surname_weights = {letter: _zipf_weights(len(SURNAMES[letter][1])) for letter in letters}
+        self._male_name_weights = _zipf_weights(len(MALE_NAMES))
+        self._female_name_weights = _zipf_weights(len(FEMALE_NAMES))
+        self._formats = [name_format for name_format, _ in NAME_FORMATS]
+        self._format_weights = [weight for _, weight in NAME_FORMATS]
+        self._prefixes = [prefix for prefix, _ in self.phone_prefixes]
+        self._prefix_weights = [weight for _, weight in self.phone_prefixes]
+
+    def _choice(self, items, weights):
+        return self.rnd.choices(items, weights)[0]
+
+    def name(self) -> str:
+        rnd = self.rnd
+        name_format = self._choice(self._formats, self._format_weights)
+        if name_format == "latin":
+            return "{} {}".format(rnd.choice(LATIN_NAMES), rnd.choice(LATIN_SURNAMES))
+        if name_format == "service":
+            return rnd.choice(SERVICE_NAMES)
+        letter = self._choice(self._letters, self._letter_weights)
+        surname = self._choice(SURNAMES[letter][1], self._surname_weights[letter])
+        if rnd.random() < 0.5:
+            first_name = self._choice(MALE_NAMES, self._male_name_weights)
+            patronymic_ending = "ич"
+        else:
+            first_name = self._choice(FEMALE_NAMES, self._female_name_weights)
+            surname = female_surname(surname)
+            patronymic_ending = "на"
+        if name_format == "surname_first":
+            return "{} {}".format(surname, first_name)
+        if name_format == "first_surname":
+            return "{} {}".format(first_name, surname)
+        if name_format == "full":
+            return "{} {} {}{}".format(surname, first_name, rnd.choice(PATRONYMICS), patronymic_ending)
+        return first_name
+
+    def digits(self) -> str:
+        """10 digits of a mobile or a city number"""
+        if self.rnd.random() < self.mobile_share:
+            return "9{:09d}".format(self.rnd.randrange(10 ** 9))
+        return "{}{:07d}".format(self.rnd.choice(("495", "499", "812", "343", "383")), self.rnd.randrange(10 ** 7))
+
+    def phone_number(self, digits: Optional[str] = None) -> str:
+        return self._choice(self._prefixes, self._prefix_weights) + (digits or self.digits())
+
+    def birth_date(self, min_age=0) -> str:
+        # ages of 0 to 90 years, most of 25 to 45; days are spread over the year evenly
+        age = int(self.rnd.triangular(min_age, 90, max(min_age, 35)))
+        year = self.reference_date.year - 1 - age
+        day = date(year, 1, 1) + timedelta(days=self.rnd.randrange(366 if year % 4 == 0 else 365))
+        return day.isoformat()
+
+    def near_duplicate(self, contact: Tuple[str, str, str]) -> Tuple[str, str, str]:
+        """the contact written another way: words of the name swapped, a typo in the name or the number with another
+        prefix & the birth date a day off; the unique key compares numbers normalized & names ignoring case, so every
+        way differs in a column of the key"""
+        name, phone_number, birth_date = contact
+        digits = phone_number[-10:]
+        kind = self.rnd.randrange(3)
+        words = name.split()
+        if kind == 0 and len(words) > 1:
+            name = " ".join(words[1:] + words[:1])
+        elif kind == 1 or len(name) < 4:
+            phone_number = self.rnd.choice([prefix for prefix in self._prefixes
+                                            if phone_number != prefix + digits]) + digits
+            birth_date = (date.fromisoformat(birth_date) + timedelta(days=self.rnd.choice((-1, 1)))).isoformat()
+        else:
+            idx = self.rnd.randrange(1, len(name))
+            name = name[:idx] + name[idx + 1:]
+        return name, phone_number, birth_date
+
+    def contacts(self, count: int) -> Iterator[Tuple[str, str, str]]:
+        generated: List[Tuple[str, str, str]] = []
+        for _ in range(count):
+            if generated and self.rnd.random() < self.duplicates_share:
+                contact = self.near_duplicate(self.rnd.choice(generated))
+            else:
+                contact = (self.name(), self.phone_number(), self.birth_date())
+            generated.append(contact)
+            yield contact
+
+
+class User(NamedTuple):
+    id: int
+    username: str
+    email: str
+    birth_date: str
+    contacts_count: int
+
+
+def generate_users(rnd: random.Random, generator: ContactsGenerator, count: int, first_id: int, prefix: str,
+                   mean_contacts: int, sigma: float) -> Iterator[User]:
+    """users having log-normally distributed numbers of contacts, i.e. many small address books & a few huge ones"""
+    mu = math.log(max(mean_contacts, 1)) - sigma ** 2 / 2
+    for idx in range(count):
+        contacts_count = mean_contacts if sigma == 0 else int(round(rnd.lognormvariate(mu, sigma)))
+        username = "{}{}".format(prefix, idx)
+        yield User(first_id + idx, username, "{}@example.com".format(username), generator.birth_date(min_age=16),
+                   contacts_count)
+
+
+class _FilesSink:
+    """tab-separated files with MySQL's default escaping & a script loading them"""
+    def __init__(self, output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = os.path.abspath(output_dir)
+        self._users_file = open(os.path.join(self.output_dir, "users.tsv"), "w", encoding="utf-8", newline="\n")
+        self._contacts_file = open(os.path.join(self.output_dir, "contacts.tsv"), "w", encoding="utf-8",
+                                   newline="\n")
+
+    @staticmethod
+    def _line(values) -> str:
+        return "\t".join(str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+                         for value in values) + "\n"
+
+    def add_user(self, user: User, password_hash: str):
+        self._users_file.write(self._line((user.id, user.username, user.email, password_hash, user.birth_date)))
+
+    def add_contacts(self, owner_id: int, contacts: List[Tuple[str, str, str]]):
+        self._contacts_file.writelines(self._line(contact + (owner_id,)) for contact in contacts)
+
+    def close(self):
+        self._users_file.close()
+        self._contacts_file.close()
+        with open(os.path.join(self.output_dir, "load.sql"), "w", encoding="utf-8") as file:
+            # rows breaking unique keys, e.g. of a previous load, are skipped
+            for table, columns in (("users", "id, username, email, password, birth_date"),
+                                   ("contacts", "name, phone_number, birth_date, owner_id")):
+                path = os.path.join(self.output_dir, table + ".tsv").replace("\\", "/")
+                file.write("LOAD DATA LOCAL INFILE '{}' IGNORE INTO TABLE {} CHARACTER SET utf8mb4 ({});\n".format(
+                    path.replace("'", "\\'"), table, columns))
+            file.write("ANALYZE TABLE contacts;\n")
+
+
+class _DatabaseSink:
+    """multi-row INSERT statements by batches; counts of inserted rows are taken from the server
+
+    A user's id or username in use fails the run rather than gets another user's contacts added. A contact repeating
+    another one's data (a generated name & number may come again) is skipped by INSERT IGNORE.
+    """
+    def __init__(self, conn, batch_size: int):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.users_count = 0
+        self.contacts_count = 0
+        self._contacts: List[Tuple] = []
+        self._statements = {}
+
+    def check_user_ids_free(self, first_id: int, count: int):
+        query = exec_query(self.conn, "SELECT COUNT(*) FROM users WHERE id BETWEEN :first_id AND :last_id",
+                           first_id=first_id, last_id=first_id + count - 1)
+        query.next()
+        taken_count = int(query.value(0))
+        if taken_count:
+            raise ValueError("{} of user ids {} to {} are in use, pass another --first-user-id".format(
+                taken_count, first_id, first_id + count - 1))
+
+    def _exec_insert(self, table: str, columns: Tuple[str, ...], rows: List[Tuple], ignore=False) -> int:
+        """returns the number of inserted rows, i.e. `ROW_COUNT()`"""
+        key = (table, len(rows))
+        statement = self._statements.get(key)
+        if statement is None:
+            values = ", ".join("({})".format(", ".join(":{}{}".format(column, idx) for column in columns))
+                               for idx in range(len(rows)))
+            statement = self._statements[key] = ParsedStatement(self.conn, "INSERT {}INTO {} ({}) VALUES {}".format(
+                "IGNORE " if ignore else "", table, ", ".join(columns), values))
+        for idx, row in enumerate(rows):
+            for column, value in zip(columns, row):
+                statement.bind_value("{}{}".format(column, idx), value)
+        return statement.exec().numRowsAffected()
+
+    def add_user(self, user: User, password_hash: str):
+        self.users_count += self._exec_insert("users", ("id", "username", "email", "password", "birth_date"),
+                                              [(user.id, user.username, user.email, password_hash, user.birth_date)])
+
+    def _flush(self):
+        if self._contacts:
+            self.contacts_count += self._exec_insert("contacts", ("name", "phone_number", "birth_date", "owner_id"),
+                                                     self._contacts, ignore=True)
+            self._contacts = []
+
+    def add_contacts(self, owner_id: int, contacts: List[Tuple[str, str, str]]):
+        for contact in contacts:
+            self._contacts.append(contact + (owner_id,))
+            if len(self._contacts) == self.batch_size:
+                self._flush()
+
+    def close(self):
+        self._flush()
+        exec_query(self.conn, "ANALYZE TABLE contacts")
+
+
+def generate(sink, args) -> Tuple[int, int]:
+    """returns the numbers of users & contacts generated"""
+    rnd = random.Random(args.seed)
+    generator = ContactsGenerator(rnd, date(args.reference_year, 1, 1), args.duplicates_share)
+    password_hash = hashlib.md5(PASSWORD.encode()).hexdigest()
+    prefix = args.username_prefix if args.username_prefix is not None else "gen{}_".format(args.seed)
+    users_count = contacts_count = 0
+    for user in generate_users(rnd, generator, args.users, args.first_user_id, prefix, args.contacts, args.sigma):
+        sink.add_user(user, password_hash)
+        chunk: List[Tuple[str, str, str]] = []
+        for contact in generator.contacts(user.contacts_count):
+            chunk.append(contact)
+            if len(chunk) == 10000:
+                sink.add_contacts(user.id, chunk)
+                chunk = []
+        sink.add_contacts(user.id, chunk)
+        users_count += 1
+        contacts_count += user.contacts_count
+        print("\rusers: {}, contacts: {}".format(users_count, contacts_count), end="", file=sys.stderr)
+    print(file=sys.stderr)
+    return users_count, contacts_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--contacts", type=int, default=1000, help="the mean number of contacts per user")
+    parser.add_argument("--sigma", type=float, default=1.0,
+                        help="the spread of numbers of contacts per user (log-normal), 0 for the same number")
+    parser.add_argument("--duplicates-share", type=float, default=0.03)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--reference-year", type=int, default=2024, help="ages are counted to the start of it")
+    parser.add_argument("--first-user-id", type=int, default=1000000,
+                        help="users get ids in a row, far after the ones of registered users")
+    parser.add_argument("--username-prefix", help="gen<seed>_ by default")
+    parser.add_argument("--output-dir", help="write files for LOAD DATA instead of inserting")
+    parser.add_argument("--batch-size", type=int, default=2000, help="contacts per INSERT")
+    parser.add_argument("--username", help="an account having INSERT privileges")
+    parser.add_argument("--password", default="")
+    args = parser.parse_args()
+    if args.output_dir is None and args.username is None:
+        parser.error("either --output-dir or --username is required")
+
+    start = perf_counter()
+    if args.output_dir is not None:
+        sink = _FilesSink(args.output_dir)
+        try:
+            users_count, contacts_count = generate(sink, args)
+        finally:
+            sink.close()
+        print("load them with: mysql --local-infile=1 ... < {}".format(os.path.join(sink.output_dir, "load.sql")))
+    else:
+        with connected(args, "datagen") as conn:
+            sink = _DatabaseSink(conn, args.batch_size)
+            try:
+                sink.check_user_ids_free(args.first_user_id, args.users)
+            except ValueError as exc:
+                sys.exit(str(exc))
+            _, generated_count = generate(sink, args)
+            sink.close()
+        users_count, contacts_count = sink.users_count, sink.contacts_count
+        if contacts_count < generated_count:
+            print("{} generated contacts repeat others' data & are skipped".format(generated_count - contacts_count))
+    elapsed = perf_counter() - start
+    print("{} users & {} contacts in {:.1f} s ({:.0f} contacts/s)".format(users_count, contacts_count, elapsed,
+                                                                          contacts_count / elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Counts client-server round trips per operation: OUT-parameter procedures + `SELECT @out` vs `*_rs` ones.
+
+Run from the project directory against a development database created by `database/create_database.sql`
+(a benchmark user and its sessions are left there):
+
+    python -m benchmarks.round_trips [--iterations N]
+
+Round trips are taken from the server's own session counters: every statement sent by a client
+(`Questions`) plus every statement preparation (`Com_stmt_prepare`) costs one.
+"""
+import argparse
+import uuid
+from time import perf_counter
+
+from PyQt5.QtSql import QSqlQuery
+
+from phone_book import database as db
+from phone_book.app_settings import headless_application
+
+
+def count_round_trips():
+    query = QSqlQuery(db.get_opened_db())
+    if not query.exec("SHOW SESSION STATUS WHERE Variable_name IN ('Questions', 'Com_stmt_prepare')"):
+        db.process_error(query)
+    total = 0
+    while query.next():
+        total += int(query.value(1))
+    return total
+
+
+def _legacy_call(procedure_call, out_vars, **values):
+    query = QSqlQuery(db.get_opened_db())
+    query.prepare("CALL {}".format(procedure_call))
+    for name, value in values.items():
+        query.bindValue(":" + name, value)
+    if not query.exec():
+        db.process_error(query)
+    if not query.exec("SELECT {}".format(", ".join(out_vars))):
+        db.process_error(query)
+    if not query.next():
+        db.process_error(query)
+    return [query.value(idx) for idx in range(len(out_vars))]
+
+
+def legacy_check_session(session_key):
+    return _legacy_call("check_session(:session_key, @session_exists)", ["@session_exists"],
+                        session_key=session_key)
+
+
+def legacy_log_in(username, password):
+    return _legacy_call("log_in(:username_or_email, :password, @session_key)", ["@session_key"],
+                        username_or_email=username, password=password)
+
+
+def legacy_get_user_info(session_key):
+    return _legacy_call("get_user_info(:session_key, @username, @email)", ["@username", "@email"],
+                        session_key=session_key)
+
+
+def legacy_add_contact(name, phone_number, birth_date):
+    return _legacy_call("add_contact(:name, :phone_number, :birth_date, @result_msg, @contact_id)",
+                        ["@result_msg", "@contact_id"], name=name, phone_number=phone_number, birth_date=birth_date)
+
+
+def legacy_edit_contact(contact_id, name, phone_number, birth_date):
+    return _legacy_call(
+        "edit_contact(:contact_id, :name, :phone_number, :birth_date, @result_msg, @same_data_contact_id)",
+        ["@result_msg", "@same_data_contact_id"],
+        contact_id=contact_id, name=name, phone_number=phone_number, birth_date=birth_date)
+
+
+def legacy_delete_contact(contact_id):
+    return _legacy_call("delete_contact(:contact_id, @result_msg)", ["@result_msg"], contact_id=contact_id)
+
+
+def measure(operation, iterations):
+    """returns (round trips per call, ms per call)"""
+    before = count_round_trips()
+    start = perf_counter()
+    for idx in range(iterations):
+        operation(idx)
+    elapsed = perf_counter() - start
+    after = count_round_trips()
+    # the SHOW statement of the second `count_round_trips()` is counted too
+    return (after - before - 1) / iterations, elapsed * 1000 / iterations
+
+
+def run(iterations):
+    suffix = uuid.uuid4().hex[:8]
+    username, email = "bench_" + suffix, "bench_{}@example.com".format(suffix)
+    result, password = db.register(username, email, "2000.01.01")
+    if result is not db.RegisterResult.SUCCESS:
+        raise RuntimeError("can't register a benchmark user: {}".format(result))
+    session_key = db.log_in(username, password)
+    db.bind_session(session_key)
+
+    def contact_name(prefix, idx):
+        return "{} {} {}".format(prefix, suffix, idx)
+
+    added = {"legacy": [], "rs": []}
+
+    def legacy_add(idx):
+        _, contact_id = legacy_add_contact(contact_name("Legacy", idx), "89110000000", "2000.01.01")
+        added["legacy"].append(int(contact_id))
+
+    def rs_add(idx):
+        _, contact_id = db._add_contact(contact_name("Rs", idx), "89110000000", "2000.01.01")
+        added["rs"].append(contact_id)
+
+    cases = [
+        ("check_session", lambda idx: legacy_check_session(session_key),
+         lambda idx: db.check_session_exists(session_key)),
+        ("log_in", lambda idx: legacy_log_in(username, password), lambda idx: db.log_in(username, password)),
+        ("get_user_info", lambda idx: legacy_get_user_info(session_key), lambda idx: db.get_user_info(session_key)),
+        ("add_contact", legacy_add, rs_add),
+        ("edit_contact",
+         lambda idx: legacy_edit_contact(added["legacy"][idx], contact_name("Legacy edited", idx),
+                                         "89110000001", "2000.01.02"),
+         lambda idx: db._edit_contact(added["rs"][idx], contact_name("Rs edited", idx), "89110000001", "2000.01.02")),
+        ("delete_contact", lambda idx: legacy_delete_contact(added["legacy"][idx]),
+         lambda idx: db._delete_contact(added["rs"][idx])),
+    ]
+
+    print("{:<16}{:>18}{:>18}{:>14}{:>14}".format("operation", "round trips/op", "round trips/op",
+                                                  "ms/op", "ms/op"))
+    print("{:<16}{:>18}{:>18}{:>14}{:>14}".format("", "before", "after", "before", "after"))
+    for name, legacy_operation, rs_operation in cases:
+        legacy_round_trips, legacy_ms = measure(legacy_operation, iterations)
+        rs_round_trips, rs_ms = measure(rs_operation, iterations)
+        print("{:<16}{:>18.1f}{:>18.1f}{:>14.2f}{:>14.2f}".format(name, legacy_round_trips, rs_round_trips,
+                                                                 legacy_ms, rs_ms))
+    db.log_out(session_key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100)
+    args = parser.parse_args()
+
+    with headless_application():
+        run(args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Compares upcoming birthdays lookups: `seconds_to_next_birthday()` per contact vs ranges of the indexed `birth_md`.
+
+Run from the project directory against a development database created by `database/create_database.sql`
+with an account having SELECT, INSERT & DELETE privileges, e.g. root:
+
+    python -m benchmarks.upcoming_birthdays --username root --password ... [--contacts N] [--iterations N] [--keep]
+
+The "after" timings are of the `get_contacts_having_birthday_in_range` procedure itself; as a CALL can't be
+explained, EXPLAIN is shown for the equivalent query with the ranges the procedure would compute today.
+"""
+import argparse
+from datetime import date, timedelta
+
+from .common import (add_connection_arguments, connected, create_owner, create_session, delete_owner, print_explain,
+                     time_query)
+
+FUNCTION_QUERY = """
+SELECT id, name, phone_number, birth_date
+FROM contacts
+WHERE owner_id = :owner_id
+  AND seconds_to_next_birthday(contacts.birth_date) < :seconds"""
+
+RANGES_QUERY = """
+SELECT c.id, c.name, c.phone_number, c.birth_date
+FROM contacts AS c
+WHERE c.owner_id = :owner_id
+  AND (c.birth_md BETWEEN :first_from AND :first_to
+    OR c.birth_md BETWEEN :second_from AND :second_to)
+ORDER BY c.birth_md < :today_md, c.birth_md, c.name"""
+
+PROCEDURE_CALL = "CALL get_contacts_having_birthday_in_range(:days)"
+
+
+def month_day(day: date) -> int:
+    return day.month * 100 + day.day
+
+
+def birth_md_ranges(today: date, days: int):
+    """the same ranges as `get_contacts_having_birthday_in_range` uses, Feb 29 aside"""
+    last_day = today + timedelta(days=days - 1)
+    if days >= 366:
+        return (101, 1231), (1, 0)
+    if last_day.year == today.year:
+        return (month_day(today), month_day(last_day)), (1, 0)
+    return (month_day(today), 1231), (101, month_day(last_day))
+
+
+def run(conn, args):
+    owner_id = create_owner(conn, args.contacts)
+    create_session(conn, owner_id)
+    today = date.today()
+    try:
+        print_explain(conn, "Before (seconds_to_next_birthday):", FUNCTION_QUERY, owner_id=owner_id,
+                      seconds=7 * 24 * 3600)
+        (first_from, first_to), (second_from, second_to) = birth_md_ranges(today, 7)
+        print_explain(conn, "After (birth_md ranges):", RANGES_QUERY, owner_id=owner_id, first_from=first_from,
+                      first_to=first_to, second_from=second_from, second_to=second_to, today_md=month_day(today))
+
+        print("{:<10}{:>12}{:>12}{:>16}{:>16}".format("days", "rows before", "rows after", "ms before", "ms after"))
+        for days in (1, 7, 30, 90, 365):
+            # the old procedure's range is (now, now + days], the new one's is [today, today + days)
+            before_ms, before_rows = time_query(conn, args.iterations, FUNCTION_QUERY, owner_id=owner_id,
+                                                seconds=days * 24 * 3600)
+            after_ms, after_rows = time_query(conn, args.iterations, PROCEDURE_CALL, days=days)
+            print("{:<10}{:>12}{:>12}{:>16.1f}{:>16.1f}".format(days, before_rows, after_rows, before_ms, after_ms))
+    finally:
+        if not args.keep:
+            delete_owner(conn, owner_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_connection_arguments(parser)
+    parser.add_argument("--contacts", type=int, default=1000000)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="don't delete the benchmark user & its contacts")
+    args = parser.parse_args()
+
+    with connected(args) as conn:
+        run(conn, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -21,6 +21,29 @@ BEGIN
     RETURN TO_SECONDS(next_birthday_datetime) - TO_SECONDS(CURRENT_TIMESTAMP);
 END //
 
+-- Sessions expire if not used for the time-to-live: every check of a session prolongs it
+CREATE FUNCTION session_expiry() RETURNS DATETIME
+    NOT DETERMINISTIC
+    COMMENT 'expiry time of a session used now'
+    RETURN NOW() + INTERVAL 30 DAY;
+//
+
+-- Phone numbers are compared in E.164 form: +7 & 10 digits whether a number is written with +7, 7 or 8 & separators.
+-- The expression is repeated by `contacts.phone_norm` (a generated column can't call a stored function)
+-- & by `normalize_phone_number()` of the client's `phone_book/input_validation.py`
+CREATE FUNCTION normalize_phone_number(phone_number VARCHAR(32)) RETURNS VARCHAR(33)
+    DETERMINISTIC
+    NO SQL
+    COMMENT 'E.164 form of a phone number'
+    RETURN CASE
+               WHEN REGEXP_REPLACE(phone_number, '[^0-9]', '') REGEXP '^[78][0-9]{10}$'
+                   THEN CONCAT('+7', RIGHT(REGEXP_REPLACE(phone_number, '[^0-9]', ''), 10))
+               WHEN REGEXP_REPLACE(phone_number, '[^0-9]', '') REGEXP '^[0-9]{10}$'
+                   THEN CONCAT('+7', REGEXP_REPLACE(phone_number, '[^0-9]', ''))
+               ELSE CONCAT('+', REGEXP_REPLACE(phone_number, '[^0-9]', ''))
+        END;
+//
+
 DELIMITER ;
 
 
@@ -38,12 +61,36 @@ CREATE TABLE users
 
 CREATE TABLE sessions
 (
-    id          INT      NOT NULL AUTO_INCREMENT PRIMARY KEY,
-    user_id     INT      NOT NULL REFERENCES users (id) ON DELETE CASCADE,
-    session_key CHAR(32) NOT NULL UNIQUE,
-    created_at  DATETIME NOT NULL DEFAULT now()
+    id           INT         NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    user_id      INT         NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    -- clients get keys as 32 hex digits, stored are their 16 bytes, i.e. UNHEX(key): the index is twice smaller
+    session_key  BINARY(16)  NOT NULL UNIQUE,
+    created_at   DATETIME    NOT NULL DEFAULT now(),
+    -- microseconds make every check of a session actually change the row, see `check_session`
+    last_seen_at DATETIME(6) NOT NULL DEFAULT now(6),
+    expires_at   DATETIME    NOT NULL,
+    INDEX session_expires_at (expires_at)
 );
 
+-- Sessions bound to connections by `bind_session`: procedures called on a connection act on behalf of its user,
+-- so the key isn't passed & looked up with every call. Unlike user variables, bindings can't be set by a client.
+-- Connection ids start over with a restarted server, so the table is kept in memory to start empty as well
+CREATE TABLE session_bindings
+(
+    connection_id BIGINT UNSIGNED NOT NULL PRIMARY KEY,
+    session_id    INT             NOT NULL,
+    user_id       INT             NOT NULL,
+    INDEX session_binding_session_id (session_id)
+) ENGINE = MEMORY;
+
+-- Bindings of sessions not expired yet: contact procedures take the user from here, so an expired session stops
+-- working at once on connections bound to it rather than when they are bound anew
+CREATE VIEW live_session_bindings AS
+SELECT b.connection_id, b.user_id
+FROM session_bindings AS b
+         JOIN sessions AS s ON s.id = b.session_id
+WHERE s.expires_at > NOW();
+
 CREATE TABLE contacts
 (
     id           INT          NOT NULL AUTO_INCREMENT PRIMARY KEY,
@@ -51,21 +98,144 @@ CREATE TABLE contacts
     phone_number VARCHAR(15)  NOT NULL,
     birth_date   DATE,
     owner_id     INT          NOT NULL REFERENCES users (id) ON DELETE CASCADE,
-    UNIQUE INDEX contact_uniq_within_user_data (name, phone_number, birth_date, owner_id)
+    row_version  BIGINT       NOT NULL DEFAULT 0,
+    -- Number of the contacts page showing a name: 1-based index of its letter set or 0 for the rest.
+    -- The letter sets are the ones of contacts pages, i.e. `MainWindow.letter_sets` of the client
+    name_bucket  TINYINT AS (CASE
+                            WHEN UPPER(LEFT(name, 1)) COLLATE utf8mb4_bin IN ('А', 'Б') THEN 1
+                            WHEN UPPER(LEFT(name, 1)) COLLATE utf8mb4_bin IN ('В', 'Г') THEN 2
+                            WHEN UPPER(LEFT(name, 1)) COLLATE utf8mb4_bin IN ('Д', 'Е', 'Ё') THEN 3
+                            WHEN UPPER(LEFT(name, 1)) COLLATE utf8mb4_bin IN ('Ж', 'З', 'И', 'Й') THEN 4
+                            WHEN UPPER(LEFT(name, 1)) COLLATE utf8mb4_bin IN ('К', 'Л') THEN 5
+                            WHEN UPPER(LEFT(name, 1)) COLLATE utf8mb4_bin IN ('М', 'Н') THEN 6
+                            WHEN UPPER(LEFT(name, 1)) COLLATE utf8mb4_bin IN ('О', 'П') THEN 7
+                            WHEN UPPER(LEFT(name, 1)) COLLATE utf8mb4_bin IN ('Р', 'С') THEN 8
+                            WHEN UPPER(LEFT(name, 1)) COLLATE utf8mb4_bin IN ('Т', 'У') THEN 9
+                            WHEN UPPER(LEFT(name, 1)) COLLATE utf8mb4_bin IN ('Ф', 'Х') THEN 10
+                            WHEN UPPER(LEFT(name, 1)) COLLATE utf8mb4_bin IN ('Ц', 'Ч', 'Ш', 'Щ') THEN 11
+                            WHEN UPPER(LEFT(name, 1)) COLLATE utf8mb4_bin IN ('Ъ', 'Ы', 'Ь', 'Э') THEN 12
+                            WHEN UPPER(LEFT(name, 1)) COLLATE utf8mb4_bin IN ('Ю', 'Я') THEN 13
+                            ELSE 0
+                        END) PERSISTENT,
+    -- a birthday as a number like 1231 for Dec 31, so upcoming birthdays are an index range
+    birth_md     SMALLINT AS (MONTH(birth_date) * 100 + DAYOFMONTH(birth_date)) PERSISTENT,
+    -- the number as `normalize_phone_number()` gives it
+    phone_norm   VARCHAR(16) AS (CASE
+                                 WHEN REGEXP_REPLACE(phone_number, '[^0-9]', '') REGEXP '^[78][0-9]{10}$'
+                                     THEN CONCAT('+7', RIGHT(REGEXP_REPLACE(phone_number, '[^0-9]', ''), 10))
+                                 WHEN REGEXP_REPLACE(phone_number, '[^0-9]', '') REGEXP '^[0-9]{10}$'
+                                     THEN CONCAT('+7', REGEXP_REPLACE(phone_number, '[^0-9]', ''))
+                                 ELSE CONCAT('+', REGEXP_REPLACE(phone_number, '[^0-9]', ''))
+                             END) PERSISTENT,
+    -- digits of the normalized number in reverse, so the last digits of a number are an index range
+    phone_rev    VARCHAR(15) AS (REVERSE(SUBSTRING(phone_norm, 2))) PERSISTENT,
+    -- the same number written another way is the same contact
+    UNIQUE INDEX contact_uniq_within_user_data (name, phone_norm, birth_date, owner_id),
+    -- serve contacts ordered by (name, id): InnoDB appends the primary key to every secondary index
+    INDEX contact_owner_name (owner_id, name),
+    INDEX contact_owner_bucket_name (owner_id, name_bucket, name),
+    INDEX contact_owner_row_version (owner_id, row_version),
+    INDEX contact_owner_birth_md (owner_id, birth_md),
+    INDEX contact_owner_phone_norm (owner_id, phone_norm),
+    INDEX contact_owner_phone_rev (owner_id, phone_rev)
+);
+
+-- Tombstones of deleted contacts, so clients' replicas learn about deletions too
+CREATE TABLE deleted_contacts
+(
+    contact_id  INT      NOT NULL PRIMARY KEY,
+    owner_id    INT      NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    row_version BIGINT   NOT NULL,
+    deleted_at  DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX deleted_contact_owner_row_version (owner_id, row_version),
+    INDEX deleted_contact_deleted_at (deleted_at)
+);
+
+-- Row versions of a user's contacts (see `next_contact_row_version()`). Tombstones are purged after a while (see
+-- `purge_contact_tombstones`): a replica synced before the greatest purged version of its user may have missed
+-- deletions, so it has to be loaded anew
+CREATE TABLE contact_row_versions
+(
+    owner_id           INT    NOT NULL PRIMARY KEY REFERENCES users (id) ON DELETE CASCADE,
+    row_version        BIGINT NOT NULL,
+    tombstones_horizon BIGINT NOT NULL DEFAULT 0
 );
 
 
+-- *** Row versions ***
+
+-- Every change of a contact takes the next version of its owner, so a client asks for whatever is changed after
+-- the greatest version it has seen. The owner's counter row stays locked till the transaction ends, so changes of
+-- a user are committed in the order of their versions: no version is committed after a greater one is seen.
+-- Transactions changing contacts of the same user wait for each other, ones of different users don't
+DELIMITER //
+
+CREATE FUNCTION next_contact_row_version(contact_owner_id INT) RETURNS BIGINT
+    NOT DETERMINISTIC
+    MODIFIES SQL DATA
+    COMMENT 'take the next row version of the user\'s contacts'
+BEGIN
+    INSERT INTO contact_row_versions (owner_id, row_version)
+    VALUES (contact_owner_id, 1)
+    ON DUPLICATE KEY UPDATE row_version = row_version + 1;
+    RETURN (SELECT v.row_version FROM contact_row_versions AS v WHERE v.owner_id = contact_owner_id);
+END;
+//
+
+DELIMITER ;
+
+CREATE TRIGGER contact_versioned_on_insert
+    BEFORE INSERT
+    ON contacts
+    FOR EACH ROW SET NEW.row_version = next_contact_row_version(NEW.owner_id);
+
+CREATE TRIGGER contact_versioned_on_update
+    BEFORE UPDATE
+    ON contacts
+    FOR EACH ROW SET NEW.row_version = next_contact_row_version(NEW.owner_id);
+
+CREATE TRIGGER contact_tombstoned_on_delete
+    AFTER DELETE
+    ON contacts
+    FOR EACH ROW INSERT INTO deleted_contacts(contact_id, owner_id, row_version)
+                 VALUES (OLD.id, OLD.owner_id, next_contact_row_version(OLD.owner_id));
+
+
 -- *** Stored procedures ***
 
 DELIMITER //
 
 CREATE PROCEDURE check_session(session_key CHAR(32), OUT session_exists BOOL)
     NOT DETERMINISTIC
-    READS SQL DATA
-    COMMENT 'check whether a session exists'
-    SET session_exists = EXISTS(SELECT 42
-                                FROM sessions
-                                WHERE sessions.session_key = session_key);
+    MODIFIES SQL DATA
+    COMMENT 'check whether a session exists & is not expired, prolonging it'
+BEGIN
+    UPDATE sessions
+    SET sessions.last_seen_at = NOW(6),
+        sessions.expires_at   = session_expiry()
+    WHERE sessions.session_key = UNHEX(session_key)
+      AND sessions.expires_at > NOW();
+    SET session_exists = ROW_COUNT() > 0;
+END;
+//
+
+CREATE PROCEDURE bind_session(session_key CHAR(32))
+    NOT DETERMINISTIC
+    MODIFIES SQL DATA
+    COMMENT 'make procedures called on this connection act on behalf of the session\'s user, prolonging the session'
+BEGIN
+    DELETE FROM session_bindings WHERE connection_id = CONNECTION_ID();
+    UPDATE sessions
+    SET sessions.last_seen_at = NOW(6),
+        sessions.expires_at   = session_expiry()
+    WHERE sessions.session_key = UNHEX(session_key)
+      AND sessions.expires_at > NOW();
+    INSERT INTO session_bindings (connection_id, session_id, user_id)
+    SELECT CONNECTION_ID(), s.id, s.user_id
+    FROM sessions AS s
+    WHERE s.session_key = UNHEX(session_key)
+      AND s.expires_at > NOW();
+END;
 //
 
 CREATE PROCEDURE register(username VARCHAR(255), email VARCHAR(255), birth_date DATE,
@@ -110,7 +280,7 @@ BEGIN
         LEAVE main;
     END IF;
     SET session_key = md5(rand()); -- TODO: ensure the generated key is not a duplicate
-    INSERT INTO sessions (user_id, session_key) VALUES (user_id, session_key);
+    INSERT INTO sessions (user_id, session_key, expires_at) VALUES (user_id, UNHEX(session_key), session_expiry());
 END;
 //
 
@@ -118,9 +288,15 @@ CREATE PROCEDURE log_out(session_key CHAR(32))
     NOT DETERMINISTIC
     MODIFIES SQL DATA
     COMMENT 'remove the passed session_key'
-DELETE
-FROM sessions
-WHERE sessions.session_key = session_key;
+BEGIN
+    DELETE b
+    FROM session_bindings AS b
+             JOIN sessions AS s ON s.id = b.session_id
+    WHERE s.session_key = UNHEX(session_key);
+    DELETE
+    FROM sessions
+    WHERE sessions.session_key = UNHEX(session_key);
+END;
 //
 
 CREATE PROCEDURE get_user_info(session_key CHAR(32), OUT username VARCHAR(255), OUT email VARCHAR(255))
@@ -130,31 +306,33 @@ CREATE PROCEDURE get_user_info(session_key CHAR(32), OUT username VARCHAR(255),
 SELECT u.username, u.email
 INTO username, email
 FROM users as u
-WHERE u.id = (SELECT user_id FROM sessions WHERE sessions.session_key = session_key LIMIT 1);
+WHERE u.id = (SELECT user_id
+              FROM sessions
+              WHERE sessions.session_key = UNHEX(session_key) AND sessions.expires_at > NOW());
 //
 
-CREATE PROCEDURE get_all_contacts(session_key CHAR(32))
+CREATE PROCEDURE get_all_contacts()
     NOT DETERMINISTIC
     READS SQL DATA
     COMMENT 'select all user\'s contacts'
 SELECT id, name, phone_number, birth_date
 FROM contacts
-WHERE owner_id = (SELECT user_id FROM sessions WHERE sessions.session_key = session_key LIMIT 1);
+WHERE owner_id = (SELECT user_id FROM live_session_bindings WHERE connection_id = CONNECTION_ID())
+ORDER BY name;
 //
 
-CREATE PROCEDURE get_contacts(session_key CHAR(32), letter_set VARCHAR(255), exclude BOOL)
+CREATE PROCEDURE get_contacts(bucket TINYINT)
     NOT DETERMINISTIC
     READS SQL DATA
-    COMMENT 'select user\'s contacts if a name (not) starting with one of given letters if exclude = (False) True'
-
+    COMMENT 'select user\'s contacts of a page, see `contacts.name_bucket`'
 SELECT id, name, phone_number, birth_date
 FROM contacts
-WHERE owner_id = (SELECT user_id FROM sessions WHERE sessions.session_key = session_key LIMIT 1)
-  AND (name REGEXP CONCAT('(?i)^[', letter_set, ']') XOR exclude)
+WHERE owner_id = (SELECT user_id FROM live_session_bindings WHERE connection_id = CONNECTION_ID())
+  AND name_bucket = bucket
 ORDER BY name;
 //
 
-CREATE PROCEDURE add_contact(session_key CHAR(32), name VARCHAR(255), phone_number VARCHAR(15), birth_date DATE,
+CREATE PROCEDURE add_contact(name VARCHAR(255), phone_number VARCHAR(15), birth_date DATE,
                              OUT result VARCHAR(255), OUT contact_id INT)
     NOT DETERMINISTIC
     MODIFIES SQL DATA
@@ -162,7 +340,7 @@ CREATE PROCEDURE add_contact(session_key CHAR(32), name VARCHAR(255), phone_numb
 main:
 BEGIN
     DECLARE owner_id INT;
-    SET owner_id = (SELECT user_id FROM sessions WHERE sessions.session_key = session_key LIMIT 1);
+    SET owner_id = (SELECT user_id FROM live_session_bindings WHERE connection_id = CONNECTION_ID());
     IF owner_id IS NULL THEN
         SET result = 'invalid_session_key';
         LEAVE main;
@@ -171,7 +349,7 @@ BEGIN
                       FROM contacts as c
                       WHERE c.owner_id = owner_id
                         AND c.name = name
-                        AND c.phone_number = phone_number
+                        AND c.phone_norm = normalize_phone_number(phone_number)
                         AND c.birth_date = birth_date
                       LIMIT 1);
     IF contact_id IS NOT NULL THEN
@@ -194,8 +372,46 @@ BEGIN
 END;
 //
 
-CREATE PROCEDURE edit_contact(session_key CHAR(32), contact_id INT, name VARCHAR(255), phone_number VARCHAR(15),
-                              birth_date DATE,
+-- Bulk import: one call per batch of contacts instead of a call per contact.
+-- Existing contacts & repeats within the batch are skipped by explicit checks comparing the columns of
+-- `contact_uniq_within_user_data` the way it does, so any other error, e.g. a value not fitting its column,
+-- fails the call instead of being taken for a duplicate
+CREATE PROCEDURE add_contacts(contacts_json LONGTEXT)
+    NOT DETERMINISTIC
+    MODIFIES SQL DATA
+    COMMENT 'create contacts of a JSON array of [name, phone_number, birth_date] ones unless they exist'
+BEGIN
+    DECLARE owner_id INT;
+    SET owner_id = (SELECT user_id FROM live_session_bindings WHERE connection_id = CONNECTION_ID());
+    IF owner_id IS NULL THEN
+        SELECT 'invalid_session_key' AS result, 0 AS added_count;
+    ELSE
+        INSERT INTO contacts (name, phone_number, birth_date, owner_id)
+        SELECT batch.name, batch.phone_number, batch.birth_date, owner_id
+        FROM (SELECT jt.name,
+                     jt.phone_number,
+                     jt.birth_date,
+                     normalize_phone_number(jt.phone_number) AS phone_norm,
+                     ROW_NUMBER() OVER (PARTITION BY jt.name, normalize_phone_number(jt.phone_number), jt.birth_date
+                         ORDER BY jt.idx) AS repeat_no
+              FROM JSON_TABLE(contacts_json, '$[*]'
+                              COLUMNS (idx FOR ORDINALITY,
+                                       name VARCHAR(255) COLLATE utf8mb4_unicode_ci PATH '$[0]' ERROR ON ERROR,
+                                       phone_number VARCHAR(15) PATH '$[1]' ERROR ON ERROR,
+                                       birth_date DATE PATH '$[2]' ERROR ON ERROR)) AS jt) AS batch
+        WHERE batch.repeat_no = 1
+          AND NOT EXISTS(SELECT 1
+                         FROM contacts AS c
+                         WHERE c.name = batch.name
+                           AND c.phone_norm = batch.phone_norm
+                           AND c.birth_date = batch.birth_date
+                           AND c.owner_id = owner_id);
+        SELECT 'added_successfully' AS result, ROW_COUNT() AS added_count;
+    END IF;
+END;
+//
+
+CREATE PROCEDURE edit_contact(contact_id INT, name VARCHAR(255), phone_number VARCHAR(15), birth_date DATE,
                               OUT result VARCHAR(255), OUT same_data_contact_id INT)
     NOT DETERMINISTIC
     MODIFIES SQL DATA
@@ -203,7 +419,7 @@ CREATE PROCEDURE edit_contact(session_key CHAR(32), contact_id INT, name VARCHAR
 main:
 BEGIN
     DECLARE owner_id INT;
-    SET owner_id = (SELECT user_id FROM sessions WHERE sessions.session_key = session_key LIMIT 1);
+    SET owner_id = (SELECT user_id FROM live_session_bindings WHERE connection_id = CONNECTION_ID());
     IF owner_id IS NULL THEN
         SET result = 'invalid_session_key';
         LEAVE main;
@@ -223,8 +439,9 @@ BEGIN
                                 FROM contacts as c
                                 WHERE c.owner_id = owner_id
                                   AND c.name = name
-                                  AND c.phone_number = phone_number
+                                  AND c.phone_norm = normalize_phone_number(phone_number)
                                   AND c.birth_date = birth_date
+                                  AND c.id <> contact_id
                                 LIMIT 1);
     IF same_data_contact_id IS NOT NULL THEN
         SET result = 'same_data_contact_already_exists';
@@ -251,14 +468,14 @@ BEGIN
 END;
 //
 
-CREATE PROCEDURE delete_contact(session_key CHAR(32), contact_id INT, OUT result VARCHAR(255))
+CREATE PROCEDURE delete_contact(contact_id INT, OUT result VARCHAR(255))
     NOT DETERMINISTIC
     MODIFIES SQL DATA
     COMMENT 'delete the given contact'
 main:
 BEGIN
     DECLARE owner_id INT;
-    SET owner_id = (SELECT user_id FROM sessions WHERE sessions.session_key = session_key LIMIT 1);
+    SET owner_id = (SELECT user_id FROM live_session_bindings WHERE connection_id = CONNECTION_ID());
     IF owner_id IS NULL THEN
         SET result = 'invalid_session_key';
         LEAVE main;
@@ -286,23 +503,587 @@ BEGIN
 END;
 //
 
-CREATE PROCEDURE get_contacts_having_birthday_in_range(session_key CHAR(32), seconds INT)
+-- Bulk changes: results are collected before the changes are made, as afterwards a missing contact can't be told
+-- from a deleted one, & selected at the end, so a call has a single result set of a row per contact
+CREATE PROCEDURE delete_contacts(contact_ids_json LONGTEXT)
+    NOT DETERMINISTIC
+    MODIFIES SQL DATA
+    COMMENT 'delete contacts of a JSON array of ids in a transaction, selecting a result per id'
+main:
+BEGIN
+    DECLARE owner_id INT;
+    DECLARE results LONGTEXT;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+        BEGIN
+            ROLLBACK;
+            RESIGNAL;
+        END;
+    SET owner_id = (SELECT user_id FROM live_session_bindings WHERE connection_id = CONNECTION_ID());
+    IF owner_id IS NULL THEN
+        SELECT NULL AS contact_id, 'invalid_session_key' AS result;
+        LEAVE main;
+    END IF;
+
+    START TRANSACTION;
+    SET results = (SELECT JSON_ARRAYAGG(JSON_ARRAY(ids.contact_id,
+                                                   CASE
+                                                       WHEN c.id IS NULL THEN 'given_contact_doesnt_exist'
+                                                       WHEN c.owner_id <> owner_id
+                                                           THEN 'no_authority_to_delete_given_contact'
+                                                       ELSE 'deleted_successfully'
+                                                       END))
+                   FROM JSON_TABLE(contact_ids_json, '$[*]' COLUMNS (contact_id INT PATH '$')) AS ids
+                            LEFT JOIN contacts AS c ON c.id = ids.contact_id);
+    DELETE c
+    FROM contacts AS c
+             JOIN JSON_TABLE(contact_ids_json, '$[*]' COLUMNS (contact_id INT PATH '$')) AS ids
+                  ON c.id = ids.contact_id
+    WHERE c.owner_id = owner_id;
+    COMMIT;
+
+    SELECT r.contact_id, r.result
+    FROM JSON_TABLE(results, '$[*]'
+                    COLUMNS (contact_id INT PATH '$[0]',
+                             result VARCHAR(255) PATH '$[1]')) AS r;
+END;
+//
+
+CREATE PROCEDURE edit_contacts(contacts_json LONGTEXT)
+    NOT DETERMINISTIC
+    MODIFIES SQL DATA
+    COMMENT 'edit contacts of a JSON array of [id, name, phone_number, birth_date] ones, selecting a result per id'
+main:
+BEGIN
+    DECLARE owner_id INT;
+    DECLARE results LONGTEXT;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+        BEGIN
+            ROLLBACK;
+            RESIGNAL;
+        END;
+    SET owner_id = (SELECT user_id FROM live_session_bindings WHERE connection_id = CONNECTION_ID());
+    IF owner_id IS NULL THEN
+        SELECT NULL AS contact_id, 'invalid_session_key' AS result, NULL AS same_data_contact_id;
+        LEAVE main;
+    END IF;
+
+    START TRANSACTION;
+    -- a contact can't get the data of another one, be it an existing contact or an edited one going earlier
+    SET results = (SELECT JSON_ARRAYAGG(JSON_ARRAY(e.contact_id,
+                                                   CASE
+                                                       WHEN e.owner_id IS NULL THEN 'given_contact_doesnt_exist'
+                                                       WHEN e.owner_id <> owner_id
+                                                           THEN 'no_authority_to_edit_given_contact'
+                                                       WHEN e.same_data_contact_id IS NOT NULL
+                                                           THEN 'same_data_contact_already_exists'
+                                                       ELSE 'edited_successfully'
+                                                       END,
+                                                   e.same_data_contact_id, e.name, e.phone_number, e.birth_date))
+                   FROM (SELECT jt.contact_id, jt.name, jt.phone_number, jt.birth_date, c.owner_id,
+                                COALESCE((SELECT same.id
+                                          FROM contacts AS same
+                                          WHERE same.owner_id = owner_id
+                                            AND same.name = jt.name
+                                            AND same.phone_norm = normalize_phone_number(jt.phone_number)
+                                            AND same.birth_date = jt.birth_date
+                                            AND same.id <> jt.contact_id
+                                          LIMIT 1),
+                                         NULLIF(FIRST_VALUE(jt.contact_id) OVER (
+                                             PARTITION BY jt.name, normalize_phone_number(jt.phone_number),
+                                                 jt.birth_date
+                                             ORDER BY jt.ordinal), jt.contact_id)) AS same_data_contact_id
+                         FROM JSON_TABLE(contacts_json, '$[*]'
+                                         COLUMNS (ordinal FOR ORDINALITY,
+                                                  contact_id INT PATH '$[0]',
+                                                  -- compared & partitioned by the way the unique key does
+                                                  name VARCHAR(255) COLLATE utf8mb4_unicode_ci PATH '$[1]',
+                                                  phone_number VARCHAR(15) PATH '$[2]',
+                                                  birth_date DATE PATH '$[3]')) AS jt
+                                  LEFT JOIN contacts AS c ON c.id = jt.contact_id) AS e);
+    UPDATE contacts AS c
+        JOIN JSON_TABLE(results, '$[*]'
+                        COLUMNS (contact_id INT PATH '$[0]',
+                                 result VARCHAR(255) PATH '$[1]',
+                                 name VARCHAR(255) PATH '$[3]',
+                                 phone_number VARCHAR(15) PATH '$[4]',
+                                 birth_date DATE PATH '$[5]')) AS r
+        ON c.id = r.contact_id
+    SET c.name         = r.name,
+        c.phone_number = r.phone_number,
+        c.birth_date   = r.birth_date
+    WHERE r.result = 'edited_successfully';
+    COMMIT;
+
+    SELECT r.contact_id, r.result, r.same_data_contact_id
+    FROM JSON_TABLE(results, '$[*]'
+                    COLUMNS (contact_id INT PATH '$[0]',
+                             result VARCHAR(255) PATH '$[1]',
+                             same_data_contact_id INT PATH '$[2]')) AS r;
+END;
+//
+
+CREATE PROCEDURE merge_contacts(merges_json LONGTEXT)
+    NOT DETERMINISTIC
+    MODIFIES SQL DATA
+    COMMENT 'merge contacts of a JSON array of [kept_id, [merged_ids], name, phone_number, birth_date] in a transaction'
+main:
+BEGIN
+    DECLARE owner_id INT;
+    DECLARE results LONGTEXT;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+        BEGIN
+            ROLLBACK;
+            RESIGNAL;
+        END;
+    SET owner_id = (SELECT user_id FROM live_session_bindings WHERE connection_id = CONNECTION_ID());
+    IF owner_id IS NULL THEN
+        SELECT NULL AS contact_id, 'invalid_session_key' AS result, NULL AS same_data_contact_id;
+        LEAVE main;
+    END IF;
+
+    START TRANSACTION;
+    -- The kept contact gets the given data & the merged ones are deleted unless some contact of the merge can't be
+    -- changed or the data is of a contact out of the merge or is given to an earlier merge too, so a batch is never
+    -- aborted by the unique key. Merges are not to share contacts.
+    SET results = (WITH members AS (SELECT jt.ordinal, jt.kept_id AS contact_id
+                                    FROM JSON_TABLE(merges_json, '$[*]'
+                                                    COLUMNS (ordinal FOR ORDINALITY,
+                                                             kept_id INT PATH '$[0]')) AS jt
+                                    UNION ALL
+                                    SELECT jt.ordinal, jt.merged_id
+                                    FROM JSON_TABLE(merges_json, '$[*]'
+                                                    COLUMNS (ordinal FOR ORDINALITY,
+                                                             NESTED PATH '$[1][*]'
+                                                                 COLUMNS (merged_id INT PATH '$'))) AS jt
+                                    WHERE jt.merged_id IS NOT NULL)
+                   SELECT JSON_ARRAYAGG(JSON_ARRAY(m.kept_id,
+                                                   CASE
+                                                       WHEN m.missing_count > 0 THEN 'given_contact_doesnt_exist'
+                                                       WHEN m.foreign_count > 0
+                                                           THEN 'no_authority_to_edit_given_contact'
+                                                       WHEN m.same_data_contact_id IS NOT NULL
+                                                           THEN 'same_data_contact_already_exists'
+                                                       ELSE 'merged_successfully'
+                                                       END,
+                                                   m.same_data_contact_id, m.ordinal, m.name, m.phone_number,
+                                                   m.birth_date))
+                   FROM (SELECT jm.ordinal, jm.kept_id, jm.name, jm.phone_number, jm.birth_date,
+                                (SELECT COUNT(*)
+                                 FROM members AS mb
+                                          LEFT JOIN contacts AS c ON c.id = mb.contact_id
+                                 WHERE mb.ordinal = jm.ordinal
+                                   AND c.id IS NULL) AS missing_count,
+                                (SELECT COUNT(*)
+                                 FROM members AS mb
+                                          JOIN contacts AS c ON c.id = mb.contact_id
+                                 WHERE mb.ordinal = jm.ordinal
+                                   AND c.owner_id <> owner_id) AS foreign_count,
+                                -- the data of a contact out of the merge or of an earlier merge's kept contact
+                                COALESCE((SELECT same.id
+                                          FROM contacts AS same
+                                          WHERE same.owner_id = owner_id
+                                            AND same.name = jm.name
+                                            AND same.phone_norm = normalize_phone_number(jm.phone_number)
+                                            AND same.birth_date = jm.birth_date
+                                            AND same.id NOT IN (SELECT mb.contact_id
+                                                                FROM members AS mb
+                                                                WHERE mb.ordinal = jm.ordinal)
+                                          LIMIT 1),
+                                         NULLIF(FIRST_VALUE(jm.kept_id) OVER (
+                                             PARTITION BY jm.name, normalize_phone_number(jm.phone_number),
+                                                 jm.birth_date
+                                             ORDER BY jm.ordinal), jm.kept_id)) AS same_data_contact_id
+                         FROM JSON_TABLE(merges_json, '$[*]'
+                                         COLUMNS (ordinal FOR ORDINALITY,
+                                                  kept_id INT PATH '$[0]',
+                                                  -- compared & partitioned by the way the unique key does
+                                                  name VARCHAR(255) COLLATE utf8mb4_unicode_ci PATH '$[2]',
+                                                  phone_number VARCHAR(15) PATH '$[3]',
+                                                  birth_date DATE PATH '$[4]')) AS jm) AS m);
+    -- the merged contacts go first, as the kept one may get the data of one of them
+    DELETE c
+    FROM contacts AS c
+             JOIN JSON_TABLE(merges_json, '$[*]'
+                             COLUMNS (ordinal FOR ORDINALITY,
+                                      kept_id INT PATH '$[0]',
+                                      NESTED PATH '$[1][*]' COLUMNS (merged_id INT PATH '$'))) AS jm
+                  ON c.id = jm.merged_id AND c.id <> jm.kept_id
+             JOIN JSON_TABLE(results, '$[*]'
+                             COLUMNS (result VARCHAR(255) PATH '$[1]',
+                                      ordinal INT PATH '$[3]')) AS r
+                  ON r.ordinal = jm.ordinal
+    WHERE r.result = 'merged_successfully';
+    UPDATE contacts AS c
+        JOIN JSON_TABLE(results, '$[*]'
+                        COLUMNS (kept_id INT PATH '$[0]',
+                                 result VARCHAR(255) PATH '$[1]',
+                                 name VARCHAR(255) PATH '$[4]',
+                                 phone_number VARCHAR(15) PATH '$[5]',
+                                 birth_date DATE PATH '$[6]')) AS r
+        ON c.id = r.kept_id
+    SET c.name         = r.name,
+        c.phone_number = r.phone_number,
+        c.birth_date   = r.birth_date
+    WHERE r.result = 'merged_successfully';
+    COMMIT;
+
+    SELECT r.contact_id, r.result, r.same_data_contact_id
+    FROM JSON_TABLE(results, '$[*]'
+                    COLUMNS (contact_id INT PATH '$[0]',
+                             result VARCHAR(255) PATH '$[1]',
+                             same_data_contact_id INT PATH '$[2]')) AS r;
+END;
+//
+
+CREATE PROCEDURE get_contacts_having_birthday_in_range(days INT)
     NOT DETERMINISTIC
     READS SQL DATA
-    COMMENT 'get contacts whose birthday is coming in `seconds` seconds'
+    COMMENT 'get contacts whose birthday is today or in the next `days` - 1 days, the nearest first'
+BEGIN
+    DECLARE owner_id INT;
+    DECLARE last_day DATE DEFAULT CURRENT_DATE + INTERVAL GREATEST(days, 1) - 1 DAY;
+    DECLARE today_md SMALLINT DEFAULT MONTH(CURRENT_DATE) * 100 + DAYOFMONTH(CURRENT_DATE);
+    DECLARE last_day_md SMALLINT DEFAULT MONTH(last_day) * 100 + DAYOFMONTH(last_day);
+    -- At most two ranges of `birth_md`: a range crossing New Year is split in Dec & Jan parts
+    DECLARE first_from SMALLINT DEFAULT today_md;
+    DECLARE first_to SMALLINT DEFAULT 1231;
+    DECLARE second_from SMALLINT DEFAULT 101;
+    DECLARE second_to SMALLINT DEFAULT last_day_md;
+    -- Feb 29 birthdays are celebrated on Mar 1 in common years (the 60th day is Feb 29 in leap ones)
+    DECLARE this_year_mar_1 DATE DEFAULT MAKEDATE(YEAR(CURRENT_DATE), 60);
+    DECLARE next_year_mar_1 DATE DEFAULT MAKEDATE(YEAR(CURRENT_DATE) + 1, 60);
+    DECLARE is_feb_29_in_range BOOL DEFAULT
+            (DAYOFMONTH(this_year_mar_1) = 1 AND this_year_mar_1 BETWEEN CURRENT_DATE AND last_day)
+            OR (DAYOFMONTH(next_year_mar_1) = 1 AND next_year_mar_1 BETWEEN CURRENT_DATE AND last_day);
+    SET owner_id = (SELECT user_id FROM live_session_bindings WHERE connection_id = CONNECTION_ID());
+    IF days <= 0 THEN
+        SET first_from = 1, first_to = 0, second_from = 1, second_to = 0, is_feb_29_in_range = FALSE;
+    ELSEIF days >= 366 THEN
+        SET first_from = 101, second_from = 1, second_to = 0;
+    ELSEIF YEAR(last_day) = YEAR(CURRENT_DATE) THEN
+        SET first_to = last_day_md, second_from = 1, second_to = 0;
+    END IF;
+    SELECT c.id, c.name, c.phone_number, c.birth_date
+    FROM contacts AS c
+    WHERE c.owner_id = owner_id
+      AND (c.birth_md BETWEEN first_from AND first_to
+        OR c.birth_md BETWEEN second_from AND second_to
+        OR (c.birth_md = 229 AND is_feb_29_in_range))
+    ORDER BY c.birth_md < today_md, c.birth_md, c.name;
+END;
+//
+
+CREATE PROCEDURE count_contacts()
+    NOT DETERMINISTIC
+    READS SQL DATA
+    COMMENT 'select the number of user\'s contacts'
+SELECT COUNT(*)
+FROM contacts
+WHERE owner_id = (SELECT user_id FROM live_session_bindings WHERE connection_id = CONNECTION_ID());
+//
+
+-- Keyset pagination: a page starts right after the (name, id) of the last row of the previous one,
+-- so it costs the same wherever it is unlike OFFSET
+CREATE PROCEDURE get_contacts_page(bucket TINYINT, after_name VARCHAR(255), after_id INT, page_limit INT)
+    NOT DETERMINISTIC
+    READS SQL DATA
+    COMMENT 'select up to `page_limit` user\'s contacts of a page following the given one or from the beginning'
+SELECT id, name, phone_number, birth_date
+FROM contacts
+WHERE owner_id = (SELECT user_id FROM live_session_bindings WHERE connection_id = CONNECTION_ID())
+  AND name_bucket = bucket
+  AND (after_id IS NULL OR (name, id) > (after_name, after_id))
+ORDER BY name, id
+LIMIT page_limit;
+//
+
+CREATE PROCEDURE get_contacts_page_before(bucket TINYINT, before_name VARCHAR(255), before_id INT, page_limit INT)
+    NOT DETERMINISTIC
+    READS SQL DATA
+    COMMENT 'select up to `page_limit` user\'s contacts of a page preceding the given one'
+SELECT id, name, phone_number, birth_date
+FROM (SELECT id, name, phone_number, birth_date
+      FROM contacts
+      WHERE owner_id = (SELECT user_id FROM live_session_bindings WHERE connection_id = CONNECTION_ID())
+        AND name_bucket = bucket
+        AND (name, id) < (before_name, before_id)
+      ORDER BY name DESC, id DESC
+      LIMIT page_limit) AS page
+ORDER BY name, id;
+//
+
+-- Export: all user's contacts are read by chunks, so neither the server nor the client holds them all at once
+CREATE PROCEDURE get_contacts_chunk(after_name VARCHAR(255), after_id INT, chunk_size INT)
+    NOT DETERMINISTIC
+    READS SQL DATA
+    COMMENT 'select up to `chunk_size` user\'s contacts following the given one or from the beginning'
 SELECT id, name, phone_number, birth_date
 FROM contacts
-WHERE owner_id = (SELECT user_id FROM sessions WHERE sessions.session_key = session_key LIMIT 1)
-  AND seconds_to_next_birthday(contacts.birth_date) < seconds;
+WHERE owner_id = (SELECT user_id FROM live_session_bindings WHERE connection_id = CONNECTION_ID())
+  AND (after_id IS NULL OR (name, id) > (after_name, after_id))
+ORDER BY name, id
+LIMIT chunk_size;
+//
+
+-- Search: names starting with a query are a range of `contact_owner_name`, as the collation ignores case & "ё" vs "е".
+-- Both parts stop at `result_limit` rows, so a one letter query is as cheap as a whole name
+CREATE PROCEDURE search_contacts(query VARCHAR(255), result_limit INT)
+    NOT DETERMINISTIC
+    READS SQL DATA
+    COMMENT 'select up to `result_limit` user\'s contacts whose names start with the query, exact matches first'
+SELECT id, name, phone_number, birth_date
+FROM ((SELECT id, name, phone_number, birth_date, 0 AS match_rank
+       FROM contacts
+       WHERE owner_id = (SELECT user_id FROM live_session_bindings WHERE connection_id = CONNECTION_ID())
+         AND name = query
+       ORDER BY id
+       LIMIT result_limit)
+      UNION ALL
+      (SELECT id, name, phone_number, birth_date, 1 AS match_rank
+       FROM contacts
+       WHERE owner_id = (SELECT user_id FROM live_session_bindings WHERE connection_id = CONNECTION_ID())
+         AND name LIKE CONCAT(REPLACE(REPLACE(REPLACE(query, '\\', '\\\\'), '%', '\\%'), '_', '\\_'), '%')
+         AND name <> query
+       ORDER BY name, id
+       LIMIT result_limit)) AS found
+ORDER BY match_rank, name, id
+LIMIT result_limit;
+//
+
+-- Reverse lookup: a number with the country code, i.e. starting with "+", is a prefix of `phone_norm` (a whole number
+-- as `normalize_phone_number()` gives it is the shortest match, so it goes first), the last digits of a number are a
+-- prefix of `phone_rev`
+CREATE PROCEDURE lookup_by_phone(number VARCHAR(33), result_limit INT)
+    NOT DETERMINISTIC
+    READS SQL DATA
+    COMMENT 'select up to `result_limit` user\'s contacts having a number starting with a "+" one or ending with it'
+BEGIN
+    DECLARE owner_id INT;
+    SET owner_id = (SELECT user_id FROM live_session_bindings WHERE connection_id = CONNECTION_ID());
+    IF LEFT(number, 1) = '+' THEN
+        SELECT c.id, c.name, c.phone_number, c.birth_date
+        FROM contacts AS c
+        WHERE c.owner_id = owner_id
+          AND c.phone_norm LIKE CONCAT('+', REGEXP_REPLACE(number, '[^0-9]', ''), '%')
+        ORDER BY c.phone_norm, c.id
+        LIMIT result_limit;
+    ELSE
+        SELECT c.id, c.name, c.phone_number, c.birth_date
+        FROM contacts AS c
+        WHERE c.owner_id = owner_id
+          AND c.phone_rev LIKE CONCAT(REVERSE(REGEXP_REPLACE(number, '[^0-9]', '')), '%')
+        ORDER BY c.phone_rev, c.id
+        LIMIT result_limit;
+    END IF;
+END;
+//
+
+-- A user's versions are committed in their order (see `next_contact_row_version()`), so nothing is committed
+-- later with a version the client has passed. A version the user hasn't reached yet is of another database or
+-- of the former global counter: contacts are loaded anew then too
+CREATE PROCEDURE get_contacts_changed_since(since_row_version BIGINT)
+    NOT DETERMINISTIC
+    READS SQL DATA
+    COMMENT 'select user\'s contacts changed & ids of deleted ones after the given row version'
+BEGIN
+    DECLARE owner_id INT;
+    DECLARE last_row_version BIGINT;
+    DECLARE purged_row_version BIGINT;
+    SET owner_id = (SELECT user_id FROM live_session_bindings WHERE connection_id = CONNECTION_ID());
+    SET last_row_version =
+            COALESCE((SELECT v.row_version FROM contact_row_versions AS v WHERE v.owner_id = owner_id), 0);
+    SET purged_row_version =
+            COALESCE((SELECT v.tombstones_horizon FROM contact_row_versions AS v WHERE v.owner_id = owner_id), 0);
+    IF since_row_version > 0 AND (since_row_version < purged_row_version OR since_row_version > last_row_version) THEN
+        SIGNAL SQLSTATE '45000' SET MYSQL_ERRNO = 30001,
+            MESSAGE_TEXT = 'tombstones after the row version are purged, load contacts anew';
+    END IF;
+    SELECT c.id, c.name, c.phone_number, c.birth_date, c.row_version, FALSE AS is_deleted
+    FROM contacts AS c
+    WHERE c.owner_id = owner_id
+      AND c.row_version > since_row_version
+    UNION ALL
+    SELECT d.contact_id, NULL, NULL, NULL, d.row_version, TRUE
+    FROM deleted_contacts AS d
+    WHERE d.owner_id = owner_id
+      AND d.row_version > since_row_version
+    ORDER BY row_version;
+END;
+//
+
+-- Result-set returning variants of the procedures with OUT parameters:
+-- a client gets the outcome in the same round trip instead of sending an extra `SELECT @out_param`
+CREATE PROCEDURE check_session_rs(session_key CHAR(32))
+    NOT DETERMINISTIC
+    MODIFIES SQL DATA
+    COMMENT 'check whether a session exists prolonging it & select the result'
+BEGIN
+    DECLARE session_exists BOOL;
+    CALL check_session(session_key, session_exists);
+    SELECT session_exists;
+END;
+//
+
+CREATE PROCEDURE register_rs(username VARCHAR(255), email VARCHAR(255), birth_date DATE)
+    NOT DETERMINISTIC
+    MODIFIES SQL DATA
+    COMMENT 'create a new user & select the result and a password'
+BEGIN
+    DECLARE result VARCHAR(255);
+    DECLARE password CHAR(8);
+    CALL register(username, email, birth_date, result, password);
+    SELECT result, password;
+END;
+//
+
+CREATE PROCEDURE log_in_rs(username_or_email VARCHAR(255), password VARCHAR(255))
+    NOT DETERMINISTIC
+    MODIFIES SQL DATA
+    COMMENT 'create a new session & select its key'
+BEGIN
+    DECLARE session_key CHAR(32);
+    CALL log_in(username_or_email, password, session_key);
+    SELECT session_key;
+END;
+//
+
+CREATE PROCEDURE get_user_info_rs(session_key CHAR(32))
+    NOT DETERMINISTIC
+    READS SQL DATA
+    COMMENT 'select an username & an e-mail'
+BEGIN
+    DECLARE username VARCHAR(255);
+    DECLARE email VARCHAR(255);
+    CALL get_user_info(session_key, username, email);
+    SELECT username, email;
+END;
+//
+
+CREATE PROCEDURE add_contact_rs(name VARCHAR(255), phone_number VARCHAR(15), birth_date DATE)
+    NOT DETERMINISTIC
+    MODIFIES SQL DATA
+    COMMENT 'create a new contact & select the result and the contact id'
+BEGIN
+    DECLARE result VARCHAR(255);
+    DECLARE contact_id INT;
+    CALL add_contact(name, phone_number, birth_date, result, contact_id);
+    SELECT result, contact_id;
+END;
+//
+
+CREATE PROCEDURE edit_contact_rs(contact_id INT, name VARCHAR(255), phone_number VARCHAR(15), birth_date DATE)
+    NOT DETERMINISTIC
+    MODIFIES SQL DATA
+    COMMENT 'edit the given contact & select the result and existed contact\'s id with the same data'
+BEGIN
+    DECLARE result VARCHAR(255);
+    DECLARE same_data_contact_id INT;
+    CALL edit_contact(contact_id, name, phone_number, birth_date, result, same_data_contact_id);
+    SELECT result, same_data_contact_id;
+END;
+//
+
+CREATE PROCEDURE delete_contact_rs(contact_id INT)
+    NOT DETERMINISTIC
+    MODIFIES SQL DATA
+    COMMENT 'delete the given contact & select the result'
+BEGIN
+    DECLARE result VARCHAR(255);
+    CALL delete_contact(contact_id, result);
+    SELECT result;
+END;
+//
+
+-- Expired sessions are left by clients never logging out; the `purge_expired_sessions` event deletes them
+CREATE PROCEDURE purge_expired_sessions(batch_size INT)
+    NOT DETERMINISTIC
+    MODIFIES SQL DATA
+    COMMENT 'delete expired sessions by batches not to lock the table for long & their bindings; select the number'
+BEGIN
+    DECLARE deleted_total INT DEFAULT 0;
+    DECLARE deleted INT;
+    -- `deleted < batch_size` would never be true for 0
+    IF batch_size IS NULL OR batch_size < 1 THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'batch_size must be 1 or greater';
+    END IF;
+    REPEAT
+        DELETE
+        FROM sessions
+        WHERE expires_at <= NOW()
+        ORDER BY expires_at
+        LIMIT batch_size;
+        SET deleted = ROW_COUNT();
+        SET deleted_total = deleted_total + deleted;
+    UNTIL deleted < batch_size END REPEAT;
+    -- bindings of the deleted sessions. Ones of closed connections are left till their sessions go: the processlist
+    -- shows other users' connections only with the PROCESS privilege, & a connection id isn't given out again till
+    -- the server restarts (emptying the table), so a left binding is never used by another connection
+    DELETE b
+    FROM session_bindings AS b
+             LEFT JOIN sessions AS s ON s.id = b.session_id
+    WHERE s.id IS NULL;
+    SELECT deleted_total;
+END;
+//
+
+-- Tombstones are needed only by replicas not synced yet; ones older than `max_age_days` are deleted & replicas
+-- synced before them are loaded anew (see `get_contacts_changed_since`)
+CREATE PROCEDURE purge_contact_tombstones(max_age_days INT, batch_size INT)
+    NOT DETERMINISTIC
+    MODIFIES SQL DATA
+    COMMENT 'delete tombstones older than `max_age_days` by batches & move the horizon; select the number'
+BEGIN
+    DECLARE deleted_total INT DEFAULT 0;
+    DECLARE deleted INT;
+    DECLARE purged_at DATETIME;
+    IF batch_size IS NULL OR batch_size < 1 THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'batch_size must be 1 or greater';
+    END IF;
+    SET purged_at = NOW() - INTERVAL max_age_days DAY;
+    IF EXISTS(SELECT 1 FROM deleted_contacts WHERE deleted_at <= purged_at) THEN
+        -- horizons are moved first, so no replica misses a deletion whatever batch the purge stops at
+        UPDATE contact_row_versions AS v
+            JOIN (SELECT d.owner_id, MAX(d.row_version) AS horizon
+                  FROM deleted_contacts AS d
+                  WHERE d.deleted_at <= purged_at
+                  GROUP BY d.owner_id) AS p ON p.owner_id = v.owner_id
+        SET v.tombstones_horizon = GREATEST(v.tombstones_horizon, p.horizon);
+        REPEAT
+            DELETE
+            FROM deleted_contacts
+            WHERE deleted_at <= purged_at
+            ORDER BY deleted_at
+            LIMIT batch_size;
+            SET deleted = ROW_COUNT();
+            SET deleted_total = deleted_total + deleted;
+        UNTIL deleted < batch_size END REPEAT;
+    END IF;
+    SELECT deleted_total;
+END;
 //
 
 DELIMITER ;
 
 
+-- *** Events ***
+-- the event scheduler must be on: `SET GLOBAL event_scheduler = ON` or `event_scheduler = ON` in the server's config;
+-- otherwise call `purge_expired_sessions()` periodically by other means, e.g. cron
+CREATE EVENT purge_expired_sessions
+    ON SCHEDULE EVERY 1 HOUR
+    COMMENT 'delete expired sessions'
+    DO CALL purge_expired_sessions(1000);
+
+CREATE EVENT purge_contact_tombstones
+    ON SCHEDULE EVERY 1 DAY
+    COMMENT 'delete tombstones of contacts deleted more than 90 days ago'
+    DO CALL purge_contact_tombstones(90, 1000);
+
+
 -- *** User ***
 CREATE USER vista_phone_book_user IDENTIFIED by 'public_password';
 
 GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.check_session TO 'vista_phone_book_user';
+GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.bind_session TO 'vista_phone_book_user';
 GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.register TO 'vista_phone_book_user';
 GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.log_in TO 'vista_phone_book_user';
 GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.log_out TO 'vista_phone_book_user';
@@ -310,6 +1091,24 @@ GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.get_user_info TO 'vista_ph
 GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.get_all_contacts TO 'vista_phone_book_user';
 GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.get_contacts TO 'vista_phone_book_user';
 GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.add_contact TO 'vista_phone_book_user';
+GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.add_contacts TO 'vista_phone_book_user';
 GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.edit_contact TO 'vista_phone_book_user';
 GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.delete_contact TO 'vista_phone_book_user';
+GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.delete_contacts TO 'vista_phone_book_user';
+GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.edit_contacts TO 'vista_phone_book_user';
+GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.merge_contacts TO 'vista_phone_book_user';
 GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.get_contacts_having_birthday_in_range TO 'vista_phone_book_user';
+GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.check_session_rs TO 'vista_phone_book_user';
+GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.register_rs TO 'vista_phone_book_user';
+GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.log_in_rs TO 'vista_phone_book_user';
+GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.get_user_info_rs TO 'vista_phone_book_user';
+GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.add_contact_rs TO 'vista_phone_book_user';
+GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.edit_contact_rs TO 'vista_phone_book_user';
+GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.delete_contact_rs TO 'vista_phone_book_user';
+GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.count_contacts TO 'vista_phone_book_user';
+GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.get_contacts_page TO 'vista_phone_book_user';
+GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.get_contacts_page_before TO 'vista_phone_book_user';
+GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.get_contacts_changed_since TO 'vista_phone_book_user';
+GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.get_contacts_chunk TO 'vista_phone_book_user';
+GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.search_contacts TO 'vista_phone_book_user';
+GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.lookup_by_phone TO 'vista_phone_book_user';
@@ -0,0 +1,96 @@
+-- Adds normalized phone numbers & the lookup by them to a database created before `contacts.phone_norm` existed.
+-- `create_database.sql` is for new databases only; this script can be run again if it stops half way.
+-- Afterwards the contact procedures comparing `phone_norm` are to be re-created from `create_database.sql`.
+
+USE vista_test_task_phone_book;
+
+
+DELIMITER //
+
+-- The same as in `create_database.sql`
+CREATE OR REPLACE FUNCTION normalize_phone_number(phone_number VARCHAR(32)) RETURNS VARCHAR(33)
+    DETERMINISTIC
+    NO SQL
+    COMMENT 'E.164 form of a phone number'
+    RETURN CASE
+               WHEN REGEXP_REPLACE(phone_number, '[^0-9]', '') REGEXP '^[78][0-9]{10}$'
+                   THEN CONCAT('+7', RIGHT(REGEXP_REPLACE(phone_number, '[^0-9]', ''), 10))
+               WHEN REGEXP_REPLACE(phone_number, '[^0-9]', '') REGEXP '^[0-9]{10}$'
+                   THEN CONCAT('+7', REGEXP_REPLACE(phone_number, '[^0-9]', ''))
+               ELSE CONCAT('+', REGEXP_REPLACE(phone_number, '[^0-9]', ''))
+        END;
+//
+
+DELIMITER ;
+
+
+-- Persistent columns are computed for the existing rows right away
+ALTER TABLE contacts
+    ADD COLUMN IF NOT EXISTS phone_norm VARCHAR(16) AS (CASE
+                                 WHEN REGEXP_REPLACE(phone_number, '[^0-9]', '') REGEXP '^[78][0-9]{10}$'
+                                     THEN CONCAT('+7', RIGHT(REGEXP_REPLACE(phone_number, '[^0-9]', ''), 10))
+                                 WHEN REGEXP_REPLACE(phone_number, '[^0-9]', '') REGEXP '^[0-9]{10}$'
+                                     THEN CONCAT('+7', REGEXP_REPLACE(phone_number, '[^0-9]', ''))
+                                 ELSE CONCAT('+', REGEXP_REPLACE(phone_number, '[^0-9]', ''))
+                             END) PERSISTENT,
+    ADD COLUMN IF NOT EXISTS phone_rev VARCHAR(15) AS (REVERSE(SUBSTRING(phone_norm, 2))) PERSISTENT;
+
+-- Contacts differing only in the way the number is written become duplicates under the new unique key. They are
+-- left to their owners to be merged (e.g. with the "Дубликаты" button of the client) instead of being deleted here:
+--     SELECT owner_id, name, phone_norm, birth_date, GROUP_CONCAT(id) AS ids
+--     FROM contacts
+--     GROUP BY owner_id, name, phone_norm, birth_date
+--     HAVING COUNT(*) > 1;
+DELIMITER //
+
+BEGIN NOT ATOMIC
+    IF EXISTS(SELECT 1
+              FROM contacts
+              GROUP BY owner_id, name, phone_norm, birth_date
+              HAVING COUNT(*) > 1) THEN
+        SIGNAL SQLSTATE '45000'
+            SET MESSAGE_TEXT = 'contacts differing only in the way numbers are written exist, merge them & run again';
+    END IF;
+END;
+//
+
+DELIMITER ;
+
+ALTER TABLE contacts
+    DROP INDEX contact_uniq_within_user_data,
+    ADD UNIQUE INDEX contact_uniq_within_user_data (name, phone_norm, birth_date, owner_id),
+    ADD INDEX IF NOT EXISTS contact_owner_phone_norm (owner_id, phone_norm),
+    ADD INDEX IF NOT EXISTS contact_owner_phone_rev (owner_id, phone_rev);
+
+
+DELIMITER //
+
+-- The same as in `create_database.sql`
+CREATE OR REPLACE PROCEDURE lookup_by_phone(number VARCHAR(33), result_limit INT)
+    NOT DETERMINISTIC
+    READS SQL DATA
+    COMMENT 'select up to `result_limit` user\'s contacts having a number starting with a "+" one or ending with it'
+BEGIN
+    DECLARE owner_id INT;
+    SET owner_id = (SELECT user_id FROM live_session_bindings WHERE connection_id = CONNECTION_ID());
+    IF LEFT(number, 1) = '+' THEN
+        SELECT c.id, c.name, c.phone_number, c.birth_date
+        FROM contacts AS c
+        WHERE c.owner_id = owner_id
+          AND c.phone_norm LIKE CONCAT('+', REGEXP_REPLACE(number, '[^0-9]', ''), '%')
+        ORDER BY c.phone_norm, c.id
+        LIMIT result_limit;
+    ELSE
+        SELECT c.id, c.name, c.phone_number, c.birth_date
+        FROM contacts AS c
+        WHERE c.owner_id = owner_id
+          AND c.phone_rev LIKE CONCAT(REVERSE(REGEXP_REPLACE(number, '[^0-9]', '')), '%')
+        ORDER BY c.phone_rev, c.id
+        LIMIT result_limit;
+    END IF;
+END;
+//
+
+DELIMITER ;
+
+GRANT EXECUTE ON PROCEDURE vista_test_task_phone_book.lookup_by_phone TO 'vista_phone_book_user';
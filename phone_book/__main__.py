@@ -1,13 +1,42 @@
+from time import perf_counter
+
+_started_at = perf_counter()
+
+import argparse
 import logging.handlers
 import sys
 
-from PyQt5.QtWidgets import QApplication, QMessageBox
-
-from .main_win import MainWindow
+from .startup_profile import StartupProfile
 
 logger = logging.getLogger("phone_book.__main__")
 
 if __name__ == "__main__":
+    if getattr(sys, "frozen", False):
+        # a frozen build is started again by the processes finding duplicates, they are to run the pool's code only
+        import multiprocessing
+
+        multiprocessing.freeze_support()
+    parser = argparse.ArgumentParser(prog="python -m phone_book")
+    parser.add_argument("--watch-stalls", action="store_true",
+                        help="log stalls of the GUI event loop with the stack of the main thread")
+    parser.add_argument("--stall-threshold-ms", type=int, default=500)
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="log times of startup stages up to the first paint & import times of modules")
+    # the rest are Qt's arguments
+    args, qt_args = parser.parse_known_args()
+
+    profile = None
+    if args.profile_startup:
+        profile = StartupProfile(_started_at)
+        profile.start()
+    # imported after profiling is started to be timed
+    from PyQt5.QtWidgets import QApplication, QMessageBox
+
+    from .main_win import MainWindow
+
+    if profile is not None:
+        profile.mark("imports")
+
     # TODO: parse args to set a logger config for debug purposes
     logging.basicConfig()
     parent_logger = logging.getLogger("phone_book")
@@ -31,7 +60,26 @@ if __name__ == "__main__":
 
     sys.excepthook = exception_hook
 
-    app = QApplication(sys.argv)
-    win = MainWindow()
+    app = QApplication(sys.argv[:1] + qt_args)
+    watchdog = None
+    if args.watch_stalls:
+        from .stall_watchdog import StallWatchdog
+
+        watchdog = StallWatchdog(args.stall_threshold_ms, (MainWindow,))
+        watchdog.start()
+    if profile is not None:
+        profile.mark("QApplication")
+    # the session is resumed & the first data is fetched while the window is being built
+    startup = MainWindow.start_startup_pipeline()
+    win = MainWindow(startup=startup)
+    if profile is not None:
+        profile.mark("MainWindow()")
+        profile.watch_first_paint(win, lambda: logger.info(profile.report()))
     win.show()
-    sys.exit(app.exec())
+    if profile is not None:
+        profile.mark("MainWindow.show()")
+    exit_code = app.exec()
+    if watchdog is not None:
+        watchdog.stop()
+        logger.info(watchdog.summary())
+    sys.exit(exit_code)
@@ -0,0 +1,32 @@
+"""The application's settings & the setup of programs without GUI; kept apart from the window, so they don't need
+QtWidgets."""
+import os.path
+import sys
+from contextlib import contextmanager
+from typing import Iterator, Tuple
+
+from PyQt5.QtCore import QCoreApplication, QSettings
+
+from . import database as db
+
+
+def get_settings():
+    """(user's settings, default ones)"""
+    settings = QSettings(QSettings.IniFormat, QSettings.UserScope, "vista", "phone_book")
+    def_settings_path = os.path.join(os.path.dirname(__file__), "phone_book_defaults.ini")
+    default_settings = QSettings(def_settings_path, QSettings.IniFormat)
+    return settings, default_settings
+
+
+@contextmanager
+def headless_application() -> Iterator[Tuple[QSettings, QSettings]]:
+    """an application object & the database set up with the application's settings for a program without GUI;
+    yields the settings & closes the connection on exit"""
+    app = QCoreApplication(sys.argv)  # QtSql drivers are loaded as plugins which requires an application object
+    settings, default_settings = get_settings()
+    db.setup_db(settings, default_settings)
+    try:
+        yield settings, default_settings
+    finally:
+        db.close_db()
+        del app
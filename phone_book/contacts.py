@@ -1,59 +1,259 @@
+import re
+from bisect import bisect_left, insort
+from concurrent.futures import Future
+from functools import partial
 from types import SimpleNamespace
-from typing import Callable
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
 
-from PyQt5.QtCore import Qt, pyqtSignal
-from PyQt5.QtWidgets import QApplication, QDialog, QDialogButtonBox, QStyle, QWidget
+from PyQt5.QtCore import QModelIndex, Qt, pyqtSignal
+from PyQt5.QtWidgets import QDialog, QHeaderView, QStyle, QTreeWidgetItem, QWidget
 
 from . import database as db
+from . import ui
+from .contacts_dedup import ContactsDuplicates, DuplicatesGroup
 from .msg_dialogs import show_db_conn_err_msg, show_invalid_input_warning
-from .ui import Ui_ContactDataForm, Ui_ContactsPage, Ui_DeleteContactDialog, Ui_UpcomingBirthdaysDialog
 
 
 class ContactsPage(QWidget):
+    """a page of contacts; its view is created when the page is shown first, as most pages aren't opened at all"""
     contact_selection_changed = pyqtSignal()
 
-    def __init__(self, model: db.ContactsPageReadWriteModel, parent=None):
+    def __init__(self, model: Union[db.ContactsPageReadWriteModel, db.ContactsBucketModel], parent=None):
         super().__init__(parent)
-        self.ui = Ui_ContactsPage()
+        self.ui = None
+        self.model = model
+
+    def setup_ui(self):
+        if self.ui is not None:
+            return
+        self.ui = ui.Ui_ContactsPage()
         self.ui.setupUi(self)
+        # children added to a widget being shown aren't shown along with it
+        for child in self.findChildren(QWidget, options=Qt.FindDirectChildrenOnly):
+            child.show()
+        self.view.verticalScrollBar().valueChanged.connect(self.handle_scrolled)
+
+        model, self.model = self.model, None
+        self.set_model(model)
 
+    def showEvent(self, event):
+        self.setup_ui()
+        super().showEvent(event)
+
+    def set_model(self, model: Union[db.ContactsPageReadWriteModel, db.ContactsBucketModel]):
+        if model is self.model:
+            return
+        if self.ui is None:
+            self.model = model
+            return
+        if self.model is not None:
+            self.model.modelReset.disconnect(self.hide_primary_key_column)
+            if isinstance(self.model, db.ContactsBucketModel):
+                self.model.window_shifted.disconnect(self.handle_window_shifted)
         self.model = model
         self.view.setModel(model)
+        # a selection model is replaced along with a model
         self.view.selectionModel().selectionChanged.connect(self.contact_selection_changed.emit)
-        self.is_data_fetched = False
+        # a model reset (i.e. a refresh of contacts) shows hidden columns again
+        model.modelReset.connect(self.hide_primary_key_column)
+        if isinstance(model, db.ContactsBucketModel):
+            model.window_shifted.connect(self.handle_window_shifted)
+        self.hide_primary_key_column()
+        self.contact_selection_changed.emit()
+
+    def handle_scrolled(self, value):
+        if isinstance(self.model, db.ContactsBucketModel) and value < self.model.page_size // 4:
+            self.model.fetch_previous()
+
+    def handle_window_shifted(self, rows_count):
+        # keep the same rows in sight when rows are loaded or dropped above them (the view scrolls per item)
+        scroll_bar = self.view.verticalScrollBar()
+        scroll_bar.setValue(scroll_bar.value() + rows_count)
 
     @property
     def view(self):
         return self.ui.tableView
 
     def is_selection_empty(self):
-        return not self.view.selectionModel().hasSelection()
-
-    def refresh_data(self, session_key):
-        self.view.selectionModel().clearSelection()
-        self.model.refresh(session_key)
-        self.view.hideColumn(0)
-
-    def fetch_data_first_time(self, session_key):
-        self.refresh_data(session_key)
-        self.is_data_fetched = True
-
-    def clear_data(self):
-        self.view.selectionModel().clearSelection()
-        self.model.clear()
-        self.is_data_fetched = False
+        return self.ui is None or not self.view.selectionModel().hasSelection()
+
+    def get_selected_row_idxs(self) -> List[int]:
+        if self.ui is None:
+            return []
+        return sorted(idx.row() for idx in self.view.selectionModel().selectedRows())
+
+    def select_contact(self, contact_id) -> bool:
+        """select the contact's row & scroll to it unless the row isn't loaded"""
+        self.setup_ui()
+        matches = self.model.match(self.model.index(0, self.model.Columns.primary_key.value), Qt.DisplayRole,
+                                   contact_id, 1, Qt.MatchExactly)
+        if not matches:
+            return False
+        self.view.selectRow(matches[0].row())
+        self.view.scrollTo(self.model.index(matches[0].row(), self.model.Columns.name.value))
+        return True
+
+    def hide_primary_key_column(self):
+        self.view.hideColumn(self.model.Columns.primary_key.value)
+
+
+class ContactsNameIndex:
+    """names of contacts kept sorted for prefix lookups by bisection
+
+    Words after the first one are indexed too, so that "петр" finds "Иван Петров".
+    Names are compared like the server's collation does, i.e. ignoring case & "ё" vs "е".
+    """
+    _word_separators = re.compile(r"[\s\-.,()]+")
+
+    def __init__(self):
+        self._names: List[Tuple[str, int]] = []  # (normalized name, contact id)
+        self._words: List[Tuple[str, int]] = []  # (normalized word, contact id)
+        self._names_by_id: Dict[int, str] = {}
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return text.casefold().replace("ё", "е")
+
+    def _keys(self, contact_id, name) -> Tuple[Tuple[str, int], List[Tuple[str, int]]]:
+        normalized = self.normalize(name)
+        words = set(self._word_separators.split(normalized)[1:])
+        return (normalized, contact_id), [(word, contact_id) for word in words if word]
+
+    def rebuild(self, contacts: Iterable[Tuple[int, str]]):
+        """index (id, name) contacts from scratch"""
+        self._names_by_id = dict(contacts)
+        self._names, self._words = [], []
+        for contact_id, name in self._names_by_id.items():
+            name_key, word_keys = self._keys(contact_id, name)
+            self._names.append(name_key)
+            self._words.extend(word_keys)
+        self._names.sort()
+        self._words.sort()
+
+    def add(self, contact_id, name):
+        """index a new contact or the new name of an indexed one"""
+        self.remove(contact_id)
+        self._names_by_id[contact_id] = name
+        name_key, word_keys = self._keys(contact_id, name)
+        insort(self._names, name_key)
+        for word_key in word_keys:
+            insort(self._words, word_key)
+
+    def remove(self, contact_id):
+        name = self._names_by_id.pop(contact_id, None)
+        if name is None:
+            return
+        name_key, word_keys = self._keys(contact_id, name)
+        for keys, key in [(self._names, name_key)] + [(self._words, word_key) for word_key in word_keys]:
+            idx = bisect_left(keys, key)
+            if idx < len(keys) and keys[idx] == key:
+                del keys[idx]
+
+    @staticmethod
+    def _prefix_range(keys: List[Tuple[str, int]], prefix: str) -> Tuple[int, int]:
+        return bisect_left(keys, (prefix,)), bisect_left(keys, (prefix + "\U0010ffff",))
+
+    def find(self, query: str, limit: Optional[int] = None) -> List[int]:
+        """ids of contacts whose names start with the query in name order, then of ones having a word starting so"""
+        prefix = self.normalize(query)
+        if not prefix:
+            return []
+        first, last = self._prefix_range(self._names, prefix)
+        if limit is not None:
+            last = min(last, first + limit)
+        contact_ids = [contact_id for _, contact_id in self._names[first:last]]
+        if limit is None or len(contact_ids) < limit:
+            found = set(contact_ids)
+            first, last = self._prefix_range(self._words, prefix)
+            for idx in range(first, last):
+                contact_id = self._words[idx][1]
+                if contact_id not in found:
+                    found.add(contact_id)
+                    contact_ids.append(contact_id)
+                    if len(contact_ids) == limit:
+                        break
+        return contact_ids
+
+
+class ContactsFilterModel(db.ContactsTableModel):
+    """contacts of the snapshot matching a query, found without the server by an index kept in step with the snapshot
+
+    Its `search()` is the one of `db.ContactsSearchModel` used when contacts are fetched by pages instead.
+    """
+    def __init__(self, source_model: db.ContactsReadWriteModel, limit=1000, parent=None):
+        super().__init__(parent)
+        self.source_model = source_model
+        self.limit = limit
+        self.query = ""
+        self.name_index = ContactsNameIndex()
+        self._rows_by_id: Dict[int, List] = {}
+        source_model.modelReset.connect(self._rebuild)
+        source_model.rowsInserted.connect(self._on_source_rows_inserted)
+        source_model.rowsAboutToBeRemoved.connect(self._on_source_rows_about_to_be_removed)
+        source_model.dataChanged.connect(self._on_source_data_changed)
+        self._rebuild()
+
+    def _source_rows(self, first: int, last: int) -> List[List]:
+        return [self.source_model.get_row(row_idx) for row_idx in range(first, last + 1)]
+
+    def _rebuild(self):
+        primary_key, name = self.Columns.primary_key.value, self.Columns.name.value
+        self._rows_by_id = {row[primary_key]: row for row in self._source_rows(0, self.source_model.rowCount() - 1)}
+        self.name_index.rebuild((contact_id, row[name]) for contact_id, row in self._rows_by_id.items())
+        self._apply_query()
+
+    def _add_source_rows(self, first: int, last: int):
+        primary_key, name = self.Columns.primary_key.value, self.Columns.name.value
+        for row in self._source_rows(first, last):
+            self._rows_by_id[row[primary_key]] = row
+            self.name_index.add(row[primary_key], row[name])
+        self._apply_query()
+
+    def _on_source_rows_inserted(self, parent: QModelIndex, first: int, last: int):
+        self._add_source_rows(first, last)
+
+    def _on_source_data_changed(self, top_left: QModelIndex, bottom_right: QModelIndex):
+        self._add_source_rows(top_left.row(), bottom_right.row())
+
+    def _on_source_rows_about_to_be_removed(self, parent: QModelIndex, first: int, last: int):
+        primary_key = self.Columns.primary_key.value
+        for row in self._source_rows(first, last):
+            self._rows_by_id.pop(row[primary_key], None)
+            self.name_index.remove(row[primary_key])
+        # the rows are still in the source model, so they are dropped from the results right away
+        self._apply_query()
+
+    def _apply_query(self):
+        if self.query or self._rows:
+            self.set_rows([self._rows_by_id[contact_id] for contact_id in self.name_index.find(self.query, self.limit)])
+
+    def search(self, query: str):
+        self.query = query
+        self._apply_query()
 
 
 class ContactDataForm(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent, Qt.FramelessWindowHint)
-        self.ui = Ui_ContactDataForm()
+        self.ui = ui.Ui_ContactDataForm()
         self.ui.setupUi(self)
         self.ui.button_box.rejected.connect(self.reject)
 
+    def wait_for_db_call(self, waiting: bool):
+        self.ui.button_box.setDisabled(waiting)
+
+    def on_db_call_failed(self, exc: Exception):
+        if not isinstance(exc, db.DatabaseConnectionError):
+            raise exc
+        if not self.isVisible():
+            return
+        self.wait_for_db_call(False)
+        show_db_conn_err_msg(details=str(exc), parent=self)
+        self.close()  # Unfortunately, a user will have to fill a form again
+
 
 class AddContactForm(ContactDataForm):
-    def __init__(self, add_contact_cb: Callable, parent=None):
+    def __init__(self, add_contact_cb: Callable[..., Future], parent=None):
         super().__init__(parent)
         self.ui.button_box.accepted.connect(self.handle_ok_btn_clicked)
 
@@ -70,22 +270,21 @@ class AddContactForm(ContactDataForm):
             show_invalid_input_warning(invalid_input_fields, highlighted=True, parent=self)
             return
 
-        self.ui.button_box.button(QDialogButtonBox.Ok).setDisabled(True)
-        QApplication.processEvents()
-        try:
-            self.result.code, self.result.contact_id = self.add_contact_cb(name, phone_number, birth_date)
-        except db.DatabaseConnectionError as exc:
-            show_db_conn_err_msg(details=str(exc), parent=self)
-            self.close()
-        else:
-            self.result.contact_name = name
-            self.accept()
-        finally:
-            self.ui.button_box.button(QDialogButtonBox.Ok).setEnabled(True)
+        self.wait_for_db_call(True)
+        self.add_contact_cb(name, phone_number, birth_date,
+                            on_success=partial(self.on_contact_added, name), on_error=self.on_db_call_failed)
+
+    def on_contact_added(self, name, result):
+        if not self.isVisible():
+            return
+        self.wait_for_db_call(False)
+        self.result.code, self.result.contact_id = result
+        self.result.contact_name = name
+        self.accept()
 
 
 class EditContactForm(ContactDataForm):
-    def __init__(self, edit_contact_cb: Callable, name, phone_number, birth_date, parent=None):
+    def __init__(self, edit_contact_cb: Callable[..., Future], name, phone_number, birth_date, parent=None):
         super().__init__(parent)
         self.ui.button_box.accepted.connect(self.handle_ok_btn_clicked)
         self.ui.name_ln_edt.setText(name)
@@ -111,24 +310,80 @@ class EditContactForm(ContactDataForm):
             return
 
         birth_date = birth_date.toString("yyyy.MM.dd")
-        self.ui.button_box.button(QDialogButtonBox.Ok).setDisabled(True)
-        QApplication.processEvents()
-        try:
-            self.result.code, self.result.same_data_contact_id = self.edit_contact_cb(name, phone_number, birth_date)
-        except db.DatabaseConnectionError as exc:
-            show_db_conn_err_msg(details=str(exc), parent=self)
-            self.close()  # Unfortunately, a user will have to fill a form again
-        else:
-            self.result.contact_new_name = name
-            self.accept()
-        finally:
-            self.ui.button_box.button(QDialogButtonBox.Ok).setEnabled(True)
+        self.wait_for_db_call(True)
+        self.edit_contact_cb(name, phone_number, birth_date,
+                             on_success=partial(self.on_contact_edited, name), on_error=self.on_db_call_failed)
+
+    def on_contact_edited(self, name, result):
+        if not self.isVisible():
+            return
+        self.wait_for_db_call(False)
+        self.result.code, self.result.same_data_contact_id = result
+        self.result.contact_new_name = name
+        self.accept()
+
+
+class EditContactsForm(ContactDataForm):
+    """edits several contacts at once: fields changed by a user are set to all of them, the rest are kept"""
+    def __init__(self, edit_contacts_cb: Callable[..., Future], contacts: List[db.ContactData], parent=None):
+        super().__init__(parent)
+        self.ui.button_box.accepted.connect(self.handle_ok_btn_clicked)
+        self.ui.label.setText("Данные контактов: {}".format(len(contacts)))
+        # the fields show the first contact's data just to have valid initial values
+        self.ui.name_ln_edt.setText(contacts[0].name)
+        self.ui.phone_number_ln_edt.setText(contacts[0].phone_number)
+        if contacts[0].birth_date is not None:
+            self.ui.birth_date_dt_edt.setDate(contacts[0].birth_date)
+        # a field touched by a user is set to all contacts even if it ends up equal to the first contact's data
+        self.changed_fields = set()
+        self.ui.name_ln_edt.textEdited.connect(lambda _: self.changed_fields.add("name"))
+        self.ui.phone_number_ln_edt.textEdited.connect(lambda _: self.changed_fields.add("phone_number"))
+        self.ui.birth_date_dt_edt.dateChanged.connect(lambda _: self.changed_fields.add("birth_date"))
+
+        self.contacts = contacts
+        self.edit_contacts_cb = edit_contacts_cb
+        self.result = SimpleNamespace(code=None)  # results by contact id
+
+    def handle_ok_btn_clicked(self):
+        name = self.ui.name_ln_edt.text()
+        phone_number = self.ui.phone_number_ln_edt.text()
+        birth_date = self.ui.birth_date_dt_edt.date()
+
+        invalid_input_fields = self.ui.validate_and_highlight_all()
+        if invalid_input_fields:
+            show_invalid_input_warning(invalid_input_fields, highlighted=True, parent=self)
+            return
+
+        is_name_changed = "name" in self.changed_fields
+        is_phone_number_changed = "phone_number" in self.changed_fields
+        is_birth_date_changed = "birth_date" in self.changed_fields
+        if not (is_name_changed or is_phone_number_changed or is_birth_date_changed):
+            self.reject()
+            return
+
+        birth_date = birth_date.toString("yyyy.MM.dd")
+        # a contact without a birth date keeps having none unless the date is edited
+        contacts = [(name if is_name_changed else contact.name,
+                     phone_number if is_phone_number_changed else contact.phone_number,
+                     birth_date if is_birth_date_changed
+                     else None if contact.birth_date is None or not contact.birth_date.isValid()
+                     else contact.birth_date.toString("yyyy.MM.dd"))
+                    for contact in self.contacts]
+        self.wait_for_db_call(True)
+        self.edit_contacts_cb(contacts, on_success=self.on_contacts_edited, on_error=self.on_db_call_failed)
+
+    def on_contacts_edited(self, results):
+        if not self.isVisible():
+            return
+        self.wait_for_db_call(False)
+        self.result.code = results
+        self.accept()
 
 
 class DeleteContactDialog(QDialog):
-    def __init__(self, delete_contact_cb: Callable, parent=None):
+    def __init__(self, delete_contact_cb: Callable[..., Future], parent=None):
         super().__init__(parent, Qt.FramelessWindowHint)
-        self.ui = Ui_DeleteContactDialog()
+        self.ui = ui.Ui_DeleteContactDialog()
         self.ui.setupUi(self)
         self.ui.button_box.rejected.connect(self.reject)
         self.ui.button_box.accepted.connect(self.handle_ok_btn_clicked)
@@ -137,22 +392,157 @@ class DeleteContactDialog(QDialog):
         self.result = SimpleNamespace(code=None)
 
     def handle_ok_btn_clicked(self):
-        try:
-            self.ui.button_box.button(QDialogButtonBox.Ok).setDisabled(True)
-            self.result.code = self.delete_contact_cb()
-        except db.DatabaseConnectionError as exc:
-            show_db_conn_err_msg(details=str(exc), parent=self)
-            self.close()
-        else:
-            self.accept()
-        finally:
-            self.ui.button_box.button(QDialogButtonBox.Ok).setEnabled(True)
+        self.ui.button_box.setDisabled(True)
+        self.delete_contact_cb(on_success=self.on_contact_deleted, on_error=self.on_db_call_failed)
+
+    def on_contact_deleted(self, res_code):
+        if not self.isVisible():
+            return
+        self.ui.button_box.setEnabled(True)
+        self.result.code = res_code
+        self.accept()
+
+    def on_db_call_failed(self, exc: Exception):
+        if not isinstance(exc, db.DatabaseConnectionError):
+            raise exc
+        if not self.isVisible():
+            return
+        self.ui.button_box.setEnabled(True)
+        show_db_conn_err_msg(details=str(exc), parent=self)
+        self.close()
+
+
+class DeleteContactsDialog(DeleteContactDialog):
+    """confirms deletion of several contacts; `result.code` is results by contact id"""
+    def __init__(self, delete_contacts_cb: Callable[..., Future], contacts_count: int, parent=None):
+        super().__init__(delete_contacts_cb, parent)
+        self.ui.label.setText("Подтвердить удаление контактов: {}".format(contacts_count))
+
+
+class MergeContactsDialog(QDialog):
+    """offers groups of probable duplicates to merge; `result.code` is results by kept contact id
+
+    A checked group is merged into its bold contact which keeps its data, but a missing birth date is taken
+    from the others. Contacts are scored against the bold one: only those similar enough are checked beforehand.
+    """
+    max_shown_groups = 1000
+    checked_contact_min_score = 0.9
+
+    def __init__(self, merge_contacts_cb: Callable[..., Future], duplicates: ContactsDuplicates, parent=None):
+        super().__init__(parent, Qt.FramelessWindowHint)
+        self.ui = ui.Ui_MergeContactsDialog()
+        self.ui.setupUi(self)
+        self.ui.button_box.rejected.connect(self.reject)
+        self.ui.button_box.accepted.connect(self.handle_ok_btn_clicked)
+        self.ui.groups_tree.itemDoubleClicked.connect(self.handle_item_double_clicked)
+
+        self.merge_contacts_cb = merge_contacts_cb
+        self.contacts = duplicates.contacts
+        self.result = SimpleNamespace(code=None)
+
+        self.groups = duplicates.groups[:self.max_shown_groups]  # by the index of a group's item
+        if len(self.groups) < len(duplicates.groups):
+            # the rest are found again once these are merged
+            self.ui.label.setText("Похожие контакты: {} групп из {}".format(len(self.groups), len(duplicates.groups)))
+        self.ui.groups_tree.addTopLevelItems([self._make_group_item(group) for group in self.groups])
+        self.ui.groups_tree.expandAll()
+        self.ui.groups_tree.header().setSectionResizeMode(QHeaderView.ResizeToContents)
+
+    def _make_group_item(self, group: DuplicatesGroup) -> QTreeWidgetItem:
+        group_item = QTreeWidgetItem(["Сходство: {:.0%}".format(group.score)])
+        group_item.setFlags(group_item.flags() | Qt.ItemIsUserCheckable)
+        for contact_id in group.contact_ids:
+            _, name, phone_number, birth_date = self.contacts[contact_id]
+            item = QTreeWidgetItem(group_item, [name, phone_number, "" if birth_date is None
+                                                else birth_date.toString("dd.MM.yyyy")])
+            item.setData(0, Qt.UserRole, contact_id)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+        # the others are similar to the center for sure, not necessarily to each other
+        kept_child_idx = group.contact_ids.index(group.center_id)
+        self._set_kept_item(group_item, group, kept_child_idx)
+        is_checked = any(group_item.child(child_idx).checkState(0) == Qt.Checked
+                         for child_idx in range(group_item.childCount()) if child_idx != kept_child_idx)
+        group_item.setCheckState(0, Qt.Checked if is_checked else Qt.Unchecked)
+        return group_item
+
+    def _set_kept_item(self, group_item: QTreeWidgetItem, group: DuplicatesGroup, kept_child_idx: int):
+        """make the contact bold & score the others against it, checking those similar enough"""
+        kept_id = group_item.child(kept_child_idx).data(0, Qt.UserRole)
+        for child_idx in range(group_item.childCount()):
+            item = group_item.child(child_idx)
+            font = item.font(0)
+            font.setBold(child_idx == kept_child_idx)
+            for column in range(item.columnCount()):
+                item.setFont(column, font)
+            if child_idx == kept_child_idx:
+                item.setText(3, "")
+                item.setCheckState(0, Qt.Checked)
+                continue
+            score = group.get_score(kept_id, item.data(0, Qt.UserRole))
+            # a pair below the finder's threshold isn't scored
+            item.setText(3, "{:.0%}".format(score) if score else "—")
+            item.setCheckState(0, Qt.Checked if score >= self.checked_contact_min_score else Qt.Unchecked)
+        group_item.setData(0, Qt.UserRole, kept_id)
+
+    def handle_item_double_clicked(self, item: QTreeWidgetItem, column: int):
+        group_item = item.parent()
+        if group_item is None:
+            return
+        group = self.groups[self.ui.groups_tree.indexOfTopLevelItem(group_item)]
+        self._set_kept_item(group_item, group, group_item.indexOfChild(item))
+
+    def _get_merge(self, kept_id: int, merged_ids: List[int]) -> Tuple[int, List[int], str, str, Optional[str]]:
+        _, name, phone_number, birth_date = self.contacts[kept_id]
+        birth_dates = [self.contacts[contact_id][3] for contact_id in [kept_id] + merged_ids]
+        birth_date = next((birth_date for birth_date in birth_dates if birth_date is not None and birth_date.isValid()),
+                          None)
+        return kept_id, merged_ids, name, phone_number, None if birth_date is None else birth_date.toString(Qt.ISODate)
+
+    def get_merges(self) -> List[Tuple[int, List[int], str, str, Optional[str]]]:
+        """merges of checked groups having the kept contact & another one checked at least"""
+        merges = []
+        for group_idx in range(self.ui.groups_tree.topLevelItemCount()):
+            group_item = self.ui.groups_tree.topLevelItem(group_idx)
+            if group_item.checkState(0) != Qt.Checked:
+                continue
+            kept_id = group_item.data(0, Qt.UserRole)
+            checked_ids = [group_item.child(child_idx).data(0, Qt.UserRole)
+                           for child_idx in range(group_item.childCount())
+                           if group_item.child(child_idx).checkState(0) == Qt.Checked]
+            if kept_id in checked_ids and len(checked_ids) > 1:
+                checked_ids.remove(kept_id)
+                merges.append(self._get_merge(kept_id, checked_ids))
+        return merges
+
+    def handle_ok_btn_clicked(self):
+        merges = self.get_merges()
+        if not merges:
+            self.reject()
+            return
+        self.ui.button_box.setDisabled(True)
+        self.merge_contacts_cb(merges, on_success=self.on_contacts_merged, on_error=self.on_db_call_failed)
+
+    def on_contacts_merged(self, results):
+        if not self.isVisible():
+            return
+        self.ui.button_box.setEnabled(True)
+        self.result.code = results
+        self.accept()
+
+    def on_db_call_failed(self, exc: Exception):
+        if not isinstance(exc, db.DatabaseConnectionError):
+            raise exc
+        if not self.isVisible():
+            return
+        self.ui.button_box.setEnabled(True)
+        show_db_conn_err_msg(details=str(exc), parent=self)
+        self.close()
 
 
 class UpcomingBirthdaysDialog(QDialog):
     def __init__(self, model: db.UpcomingBirthdaysReadModel, parent=None):
         super().__init__(parent, Qt.FramelessWindowHint)
-        self.ui = Ui_UpcomingBirthdaysDialog()
+        self.ui = ui.Ui_UpcomingBirthdaysDialog()
         self.ui.setupUi(self)
         self.ui.button_box.rejected.connect(self.reject)
         self.ui.button_box.accepted.connect(self.accept)
@@ -175,6 +565,16 @@ class UpcomingBirthdaysDialog(QDialog):
     def view(self):
         return self.ui.tableView
 
-    def refresh_data(self, session_key):
-        self.model.refresh(session_key)
+    def set_data(self, rows: List[List]):
+        """show rows fetched beforehand"""
+        self.model.set_rows(rows)
         self.view.hideColumn(0)
+
+    def refresh_data(self, on_success: Optional[Callable] = None,
+                     on_error: Optional[Callable[[Exception], None]] = None) -> Future:
+        def on_refreshed(rows):
+            self.view.hideColumn(0)
+            if on_success is not None:
+                on_success(rows)
+
+        return self.model.refresh_async(on_success=on_refreshed, on_error=on_error)
@@ -0,0 +1,265 @@
+"""Finds groups of probable duplicate contacts, e.g. "Иванов Иван" & "Иван Иванов" or a number written two ways.
+
+Contacts are compared only within blocks sharing a key: the normalized phone number, the sorted name words or the birth
+date together with the name's initials. So the work depends on the sizes of blocks rather than grows as O(n²).
+Keys & pair scores of a large address book are computed by a process pool.
+"""
+import gc
+import os
+import re
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from difflib import SequenceMatcher
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from . import database as db
+from .contacts_export import iter_contacts_chunks
+from .input_validation import normalize_phone_number
+
+# (id, name, phone number, Julian birth day or None)
+Contact = Tuple[int, str, str, Optional[int]]
+# (id, words of a name with case & "ё" aside sorted & joined by spaces, normalized phone number, Julian birth day);
+# plain tuples are passed between processes several times faster than named ones
+ContactKeys = Tuple[int, str, str, Optional[int]]
+
+_word_rx = re.compile(r"\w+")
+
+
+@contextmanager
+def _gc_paused():
+    """millions of tuples & lists created make the cyclic garbage collector run again & again for nothing"""
+    is_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if is_enabled:
+            gc.enable()
+
+
+class DuplicatesGroup(NamedTuple):
+    contact_ids: List[int]  # ascending
+    score: float  # the highest score of the group's pairs, from 0 to 1
+    center_id: int  # the contact every other one scores the threshold at least against
+    pair_scores: Dict[Tuple[int, int], float]  # of the group's pairs scoring the threshold at least, by ascending ids
+
+    def get_score(self, first_id: int, second_id: int) -> float:
+        """the score of a pair of the group's contacts; 0 if it is below the threshold"""
+        pair = (first_id, second_id) if first_id < second_id else (second_id, first_id)
+        return self.pair_scores.get(pair, 0.0)
+
+
+def get_name_key(name: str) -> str:
+    return " ".join(sorted(_word_rx.findall(name.casefold().replace("ё", "е"))))
+
+
+def _blocking_key(text: str) -> int:
+    # a checksum is passed between processes cheaper than a string; blocks merged by a collision just have some
+    # more pairs to score
+    return zlib.crc32(text.encode())
+
+
+def get_contact_keys(contact: Contact) -> Tuple[ContactKeys, Tuple[int, ...]]:
+    """keys to compare a contact by & keys of blocks it goes to"""
+    contact_id, name, phone_number, birth_day = contact
+    name_key = get_name_key(name)
+    phone_key = normalize_phone_number(phone_number)
+    blocking_keys = [_blocking_key(phone_key)]
+    if name_key:
+        blocking_keys.append(_blocking_key("n" + name_key))
+    if birth_day is not None:
+        # a birth date alone is shared by every few thousandth contact of a large address book
+        initials = "".join(word[0] for word in name_key.split())
+        blocking_keys.append(_blocking_key("b{}:{}".format(birth_day, initials)))
+    return (contact_id, name_key, phone_key, birth_day), tuple(blocking_keys)
+
+
+def get_contacts_keys(contacts: List[Contact]) -> Tuple[List[ContactKeys], List[Tuple[int, ...]]]:
+    with _gc_paused():
+        keys, blocking_keys = [], []
+        for contact in contacts:
+            contact_keys, contact_blocking_keys = get_contact_keys(contact)
+            keys.append(contact_keys)
+            blocking_keys.append(contact_blocking_keys)
+        return keys, blocking_keys
+
+
+# weights of matching parts of a pair's score
+NAME_WEIGHT = 0.5
+PHONE_WEIGHT = 0.3
+BIRTH_DATE_WEIGHT = 0.2
+
+
+def score_pair(first: ContactKeys, second: ContactKeys, threshold=0.0) -> float:
+    """a score from 0 to 1; 0 if it would be below `threshold` surely"""
+    _, first_name_key, first_phone_key, first_birth_day = first
+    _, second_name_key, second_phone_key, second_birth_day = second
+    score = 0.0
+    if first_phone_key == second_phone_key:
+        score += PHONE_WEIGHT
+    if first_birth_day is not None and first_birth_day == second_birth_day:
+        score += BIRTH_DATE_WEIGHT
+    if first_name_key == second_name_key:
+        return score + NAME_WEIGHT
+    if score + NAME_WEIGHT < threshold:
+        return 0.0
+    # the cheap upper bounds of the similarity are checked before the similarity itself
+    min_name_score = (threshold - score) / NAME_WEIGHT
+    matcher = SequenceMatcher(None, first_name_key, second_name_key, autojunk=False)
+    if matcher.real_quick_ratio() < min_name_score or matcher.quick_ratio() < min_name_score:
+        return 0.0
+    return score + NAME_WEIGHT * matcher.ratio()
+
+
+def score_blocks(blocks: List[List[ContactKeys]], threshold: float) -> List[Tuple[int, int, float]]:
+    """(first id, second id, score) of pairs within blocks scoring `threshold` at least"""
+    with _gc_paused():
+        scores: Dict[Tuple[int, int], float] = {}
+        for block in blocks:
+            for idx, first in enumerate(block):
+                for second in block[idx + 1:]:
+                    pair = (first[0], second[0]) if first[0] < second[0] else (second[0], first[0])
+                    # a pair sharing several keys is met in several blocks
+                    if pair not in scores:
+                        scores[pair] = score_pair(first, second, threshold)
+        return [(first_id, second_id, score) for (first_id, second_id), score in scores.items()
+                if score >= threshold]
+
+
+def _chunks(items: List, chunk_size: int) -> Iterator[List]:
+    for idx in range(0, len(items), chunk_size):
+        yield items[idx:idx + chunk_size]
+
+
+def group_pairs(pairs: Iterable[Tuple[int, int, float]]) -> List[DuplicatesGroup]:
+    """group contacts around centers, the most probable duplicates first
+
+    Pairs aren't joined transitively, as "Иван Петров" ~ "Иван Петрова" ~ "Анна Петрова" would make Анна a duplicate
+    of Иван. Every member scores the threshold at least against the center of its group: the contacts of the best
+    pairs are taken for centers first. A contact similar only to members of other groups is found once they are merged.
+    """
+    neighbours: Dict[int, Dict[int, float]] = {}
+    for first_id, second_id, score in pairs:
+        neighbours.setdefault(first_id, {})[second_id] = score
+        neighbours.setdefault(second_id, {})[first_id] = score
+    centers = sorted(neighbours, key=lambda contact_id: (-max(neighbours[contact_id].values()),
+                                                         -len(neighbours[contact_id]), contact_id))
+    grouped = set()
+    groups = []
+    for center_id in centers:
+        if center_id in grouped:
+            continue
+        member_ids = [contact_id for contact_id in neighbours[center_id] if contact_id not in grouped]
+        if not member_ids:
+            continue
+        contact_ids = sorted([center_id] + member_ids)
+        grouped.update(contact_ids)
+        pair_scores = {(first_id, second_id): neighbours[first_id][second_id]
+                       for idx, first_id in enumerate(contact_ids) for second_id in contact_ids[idx + 1:]
+                       if second_id in neighbours[first_id]}
+        groups.append(DuplicatesGroup(contact_ids, max(pair_scores.values()), center_id, pair_scores))
+    groups.sort(key=lambda group: (-group.score, group.contact_ids[0]))
+    return groups
+
+
+class DuplicatesFinder:
+    """groups contacts by blocking keys & scores pairs within blocks
+
+    Blocks larger than `max_block_size`, e.g. of an office number shared by many contacts, are skipped:
+    their pairs are still compared when they share another key.
+    A process pool is used for `parallel_threshold` contacts at least, as starting processes takes a while.
+    """
+    threshold = 0.7
+    max_block_size = 50
+    parallel_threshold = 20000
+    chunk_size = 20000
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers  # the number of processors if None
+
+    def find(self, contacts: List[Contact]) -> List[DuplicatesGroup]:
+        workers = self.workers if self.workers is not None else os.cpu_count() or 1
+        with _gc_paused():
+            if len(contacts) < self.parallel_threshold or workers == 1:
+                return self._find(contacts, map)
+            # multiprocessing takes a while to import, so it is imported only when needed
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # workers are started afresh instead of being forked from a process running Qt's & the database's threads;
+            # they import this module for `get_contacts_keys()` & `score_blocks()`
+            with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+                return self._find(contacts, executor.map)
+
+    def _find(self, contacts: List[Contact], map_fn: Callable) -> List[DuplicatesGroup]:
+        blocks: Dict[int, List[ContactKeys]] = {}
+        for chunk_keys, chunk_blocking_keys in map_fn(get_contacts_keys, _chunks(contacts, self.chunk_size)):
+            for keys, blocking_keys in zip(chunk_keys, chunk_blocking_keys):
+                for blocking_key in blocking_keys:
+                    blocks.setdefault(blocking_key, []).append(keys)
+        # chunks of about `chunk_size` pairs each
+        chunks, chunk, chunk_pairs = [], [], 0
+        for block in blocks.values():
+            if 1 < len(block) <= self.max_block_size:
+                chunk.append(block)
+                chunk_pairs += len(block) * (len(block) - 1) // 2
+                if chunk_pairs >= self.chunk_size:
+                    chunks.append(chunk)
+                    chunk, chunk_pairs = [], 0
+        if chunk:
+            chunks.append(chunk)
+        pairs = []
+        for chunk_pairs in map_fn(score_blocks, chunks, [self.threshold] * len(chunks)):
+            pairs += chunk_pairs
+        return group_pairs(pairs)
+
+
+class ContactsDuplicates(NamedTuple):
+    groups: List[DuplicatesGroup]
+    contacts: Dict[int, List]  # rows of the grouped contacts by id
+
+
+class ContactsDuplicatesSearch(QObject):
+    """fetches all user's contacts by chunks & finds duplicates among them
+
+    Only the contacts are fetched in the database thread: the CPU-bound search runs in a thread of its own (see
+    `run_async()`), so other database calls, e.g. of the merge, go on meanwhile.
+    """
+    progressed = pyqtSignal(int)  # contacts fetched
+    chunk_size = 5000
+
+    def __init__(self, finder: Optional[DuplicatesFinder] = None, parent=None):
+        super().__init__(parent)
+        self.finder = finder if finder is not None else DuplicatesFinder()
+
+    def fetch_contacts(self) -> Tuple[Dict[int, List], List[Contact]]:
+        """runs in the database thread; (rows by id, contacts to compare)"""
+        rows_by_id: Dict[int, List] = {}
+        contacts = []
+        for rows in iter_contacts_chunks(self.chunk_size):
+            for row in rows:
+                contact_id, name, phone_number, birth_date = row
+                rows_by_id[contact_id] = row
+                contacts.append((contact_id, name, phone_number,
+                                 None if birth_date is None or not birth_date.isValid() else birth_date.toJulianDay()))
+            self.progressed.emit(len(contacts))
+        return rows_by_id, contacts
+
+    def run(self) -> ContactsDuplicates:
+        """runs in any thread but the database one, as it waits for the contacts to be fetched there"""
+        rows_by_id, contacts = db.run_async(self.fetch_contacts).result()
+        groups = self.finder.find(contacts)
+        return ContactsDuplicates(groups, {contact_id: rows_by_id[contact_id]
+                                           for group in groups for contact_id in group.contact_ids})
+
+    def run_async(self, on_success: Optional[Callable[[ContactsDuplicates], None]] = None,
+                  on_error: Optional[Callable[[Exception], None]] = None) -> Future:
+        pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="phone_book_dedup")
+        future = pool.submit(self.run)
+        # the worker exits once the search is done
+        pool.shutdown(wait=False)
+        db.add_callbacks(future, on_success=on_success, on_error=on_error)
+        return future
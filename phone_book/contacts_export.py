@@ -0,0 +1,219 @@
+"""Exports the user's contacts to CSV, vCard or JSON Lines.
+
+The headless entry point uses the application's settings & the remembered session unless an account is given:
+
+    python -m phone_book.contacts_export OUTPUT [--format csv|vcard|jsonl] [--username ... --password ...]
+"""
+import argparse
+import contextlib
+import csv
+import json
+import os
+import os.path
+import sys
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterator, List, NamedTuple, Optional, TextIO
+
+from PyQt5.QtCore import QDate, QObject, Qt, pyqtSignal
+
+from . import database as db
+from .app_settings import headless_application
+from .contacts_import import VCARD_EXTENSIONS
+
+JSON_LINES_EXTENSIONS = (".jsonl", ".ndjson")
+EXPORT_FORMATS = ("csv", "vcard", "jsonl")
+
+
+def format_of_path(path) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    if extension in VCARD_EXTENSIONS:
+        return "vcard"
+    if extension in JSON_LINES_EXTENSIONS:
+        return "jsonl"
+    return "csv"
+
+
+def _iso_date(birth_date: Optional[QDate]) -> str:
+    return "" if birth_date is None or not birth_date.isValid() else birth_date.toString(Qt.ISODate)
+
+
+class _CsvWriter:
+    encoding = "utf-8-sig"  # Excel recognizes UTF-8 by the BOM
+
+    def __init__(self, file: TextIO):
+        self._writer = csv.writer(file)
+        # the names are recognized by the import
+        self._writer.writerow(("name", "phone_number", "birth_date"))
+
+    def write_rows(self, rows: List[List]):
+        self._writer.writerows((name, phone_number, _iso_date(birth_date))
+                               for _, name, phone_number, birth_date in rows)
+
+
+class _VCardWriter:
+    encoding = "utf-8"
+
+    def __init__(self, file: TextIO):
+        self._file = file
+
+    @staticmethod
+    def _escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace(",", "\\,").replace(";", "\\;").replace("\n", "\\n")
+
+    @staticmethod
+    def _fold(line: str) -> str:
+        """split a line into ones of at most 75 octets, continued ones start with a space"""
+        parts, part, part_size = [], [], 0
+        for char in line:
+            char_size = len(char.encode())
+            if part_size + char_size > 75:
+                parts.append("".join(part))
+                part, part_size = [" "], 1
+            part.append(char)
+            part_size += char_size
+        parts.append("".join(part))
+        return "\r\n".join(parts)
+
+    def write_rows(self, rows: List[List]):
+        lines = []
+        for _, name, phone_number, birth_date in rows:
+            name = self._escape(name)
+            lines += ["BEGIN:VCARD", "VERSION:3.0", self._fold("FN:" + name), self._fold("N:{};;;;".format(name)),
+                      "TEL;TYPE=CELL:" + phone_number]
+            if birth_date is not None and birth_date.isValid():
+                lines.append("BDAY:" + _iso_date(birth_date))
+            lines.append("END:VCARD")
+        self._file.write("\r\n".join(lines) + "\r\n")
+
+
+class _JsonLinesWriter:
+    encoding = "utf-8"
+
+    def __init__(self, file: TextIO):
+        self._file = file
+
+    def write_rows(self, rows: List[List]):
+        self._file.writelines(
+            json.dumps({"name": name, "phone_number": phone_number, "birth_date": _iso_date(birth_date) or None},
+                       ensure_ascii=False) + "\n"
+            for _, name, phone_number, birth_date in rows)
+
+
+_writers = {"csv": _CsvWriter, "vcard": _VCardWriter, "jsonl": _JsonLinesWriter}
+
+
+def iter_contacts_chunks(chunk_size: int) -> Iterator[List[List]]:
+    """get all user's contacts by chunks of keyset pages"""
+    after_name = after_id = None
+    while True:
+        rows = db.get_contacts_chunk(after_name, after_id, chunk_size)
+        if rows:
+            yield rows
+        if len(rows) < chunk_size:
+            return
+        after_id, after_name = rows[-1][0], rows[-1][1]
+
+
+class ContactsExportResult(NamedTuple):
+    written_count: int
+    is_cancelled: bool = False
+
+
+class ContactsExporter(QObject):
+    """writes contacts fetched chunk by chunk, so the memory used doesn't depend on the number of contacts
+
+    `run()` is to be called in a thread having a connection, e.g. a headless program's one; `run_async()` runs it in
+    a thread of its own, so the database thread isn't held by the export & other calls go on meanwhile.
+    The file is written under a temporary name & replaces the target one only when the export is finished.
+    """
+    progressed = pyqtSignal(int, int)  # contacts written, contacts total
+    chunk_size = 5000
+
+    def __init__(self, path, export_format: Optional[str] = None, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.export_format = export_format if export_format is not None else format_of_path(path)
+        if self.export_format not in _writers:
+            raise ValueError("unknown export format: {}".format(self.export_format))
+        self._is_cancelled = False
+
+    def cancel(self):
+        self._is_cancelled = True
+
+    def run(self) -> ContactsExportResult:
+        total = db.count_contacts()
+        written_count = 0
+        writer_cls = _writers[self.export_format]
+        temp_path = self.path + ".part"
+        try:
+            with open(temp_path, "w", encoding=writer_cls.encoding, newline="") as file:
+                writer = writer_cls(file)
+                self.progressed.emit(written_count, total)
+                for rows in iter_contacts_chunks(self.chunk_size):
+                    writer.write_rows(rows)
+                    written_count += len(rows)
+                    self.progressed.emit(written_count, max(total, written_count))
+                    if self._is_cancelled:
+                        break
+        except BaseException:
+            # `open()` itself may have failed
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(temp_path)
+            raise
+        if self._is_cancelled:
+            os.remove(temp_path)
+            return ContactsExportResult(written_count, is_cancelled=True)
+        os.replace(temp_path, self.path)
+        return ContactsExportResult(written_count)
+
+    def run_async(self, on_success: Optional[Callable[[ContactsExportResult], None]] = None,
+                  on_error: Optional[Callable[[Exception], None]] = None) -> Future:
+        pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="phone_book_export")
+        future = pool.submit(self._run_and_close_db)
+        # the worker exits once the export is done
+        pool.shutdown(wait=False)
+        db.add_callbacks(future, on_success=on_success, on_error=on_error)
+        return future
+
+    def _run_and_close_db(self) -> ContactsExportResult:
+        """runs in the export thread; its connection is opened (& the session bound) by the first call"""
+        try:
+            return self.run()
+        finally:
+            db.close_db(remove=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, help="by the output's extension if omitted")
+    parser.add_argument("--username", help="a username or an e-mail to log in with instead of the remembered session")
+    parser.add_argument("--password", default="")
+    args = parser.parse_args()
+
+    with headless_application() as (settings, _):
+        session_key = None
+        try:
+            if args.username is not None:
+                session_key = db.log_in(args.username, args.password)
+                if not session_key:
+                    sys.exit("Wrong username or password")
+            else:
+                session_key = settings.value("session_key")
+                if not session_key or not db.check_session_exists(session_key):
+                    sys.exit("No remembered session, log in with the application or pass --username & --password")
+            db.bind_session(session_key)
+
+            exporter = ContactsExporter(args.output, args.format)
+            exporter.progressed.connect(
+                lambda written, total: print("\r{} / {}".format(written, total), end="", file=sys.stderr))
+            result = exporter.run()
+            print(file=sys.stderr)
+            print("{} contacts exported to {}".format(result.written_count, args.output))
+        finally:
+            if args.username is not None and session_key:
+                db.log_out(session_key)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+import codecs
+import csv
+import io
+import os.path
+from concurrent.futures import Future
+from time import monotonic
+from typing import BinaryIO, Callable, Iterator, List, NamedTuple, Optional, TextIO, Tuple
+
+from PyQt5.QtCore import QDate, QObject, pyqtSignal
+
+from . import database as db
+from .input_validation import (CONTACT_NAME_PATTERN, PHONE_NUMBER_MAX_LENGTH, PHONE_NUMBER_PATTERN,
+                               make_regular_expression)
+
+VCARD_EXTENSIONS = (".vcf", ".vcard")
+
+
+class ContactRecord(NamedTuple):
+    """a contact as it is read from a file, i.e. not validated yet"""
+    line: int  # the first line of the record
+    name: str
+    phone_numbers: List[str]  # a vCard may have several, the first valid one is imported
+    birth_date: str
+
+
+class RowError(NamedTuple):
+    line: int
+    message: str
+
+
+class ContactsImportProgress(NamedTuple):
+    bytes_read: int
+    bytes_total: int
+    rows_read: int
+    added_count: int
+
+
+class ContactsImportReport(NamedTuple):
+    rows_read: int
+    added_count: int
+    duplicates_count: int
+    errors_count: int
+    errors: List[RowError]  # the first `ContactsImporter.max_reported_errors` ones
+    is_cancelled: bool = False
+    is_session_invalid: bool = False
+    server_error: Optional[str] = None  # the import is stopped by a batch the server has failed to add
+
+
+def detect_encoding(file: BinaryIO, sample_size=64 * 1024) -> str:
+    """UTF-8 (with or without BOM) or, failing that, Windows-1251 which Excel saves Russian CSV files in"""
+    sample = file.read(sample_size)
+    file.seek(0)
+    try:
+        # an incremental decoder doesn't fail on a character cut off at the end of the sample
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+    except UnicodeDecodeError:
+        return "cp1251"
+    return "utf-8-sig"
+
+
+_csv_headers = {
+    "name": ("name", "full name", "имя", "фио"),
+    "phone_number": ("phone_number", "phone", "телефон", "номер телефона"),
+    "birth_date": ("birth_date", "birthday", "дата рождения", "день рождения"),
+}
+
+
+def _csv_columns(header: List[str]) -> Optional[Tuple[int, int, int]]:
+    """indexes of name, phone number & birth date columns if the row is a header"""
+    names = [value.strip().casefold() for value in header]
+    columns = []
+    for aliases in _csv_headers.values():
+        idx = next((idx for idx, name in enumerate(names) if name in aliases), None)
+        if idx is None:
+            return None
+        columns.append(idx)
+    return tuple(columns)
+
+
+def read_csv(file: TextIO) -> Iterator[ContactRecord]:
+    """read rows of name, phone number & birth date columns; they go in this order unless there is a header"""
+    sample = file.read(64 * 1024)
+    file.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(file, dialect)
+    columns = (0, 1, 2)
+    line = 1
+    for row_idx, row in enumerate(reader):
+        if row_idx == 0:
+            header_columns = _csv_columns(row)
+            if header_columns is not None:
+                columns = header_columns
+                line = reader.line_num + 1
+                continue
+        if any(value.strip() for value in row):
+            name, phone_number, birth_date = (row[idx] if idx < len(row) else "" for idx in columns)
+            yield ContactRecord(line, name, [phone_number], birth_date)
+        line = reader.line_num + 1
+
+
+def _unfold_lines(file: TextIO) -> Iterator[Tuple[int, str]]:
+    """join folded lines of a vCard, i.e. ones continued on the next lines starting with a space or a tab"""
+    pending, pending_line = None, 0
+    for line_no, line in enumerate(file, 1):
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and pending is not None:
+            pending += line[1:]
+            continue
+        if pending is not None:
+            yield pending_line, pending
+        pending, pending_line = line, line_no
+    if pending is not None:
+        yield pending_line, pending
+
+
+def _unescape_vcard_value(value: str) -> List[str]:
+    """split a structured value by unescaped semicolons & unescape its components"""
+    components, chars = [], []
+    chars_iter = iter(value)
+    for char in chars_iter:
+        if char == "\\":
+            char = next(chars_iter, "")
+            chars.append("\n" if char in ("n", "N") else char)
+        elif char == ";":
+            components.append("".join(chars))
+            chars = []
+        else:
+            chars.append(char)
+    components.append("".join(chars))
+    return components
+
+
+def _vcard_birth_date(value: str) -> str:
+    # vCard 3 has YYYY-MM-DD or YYYYMMDD, possibly with a time; vCard 4 may omit a year: --MMDD
+    value = value.partition("T")[0].strip()
+    if len(value) == 8 and value.isdigit():
+        value = "{}-{}-{}".format(value[:4], value[4:6], value[6:])
+    return value
+
+
+def read_vcard(file: TextIO) -> Iterator[ContactRecord]:
+    """read cards of vCard 3.0 & 4.0 files: FN (or N), TEL & BDAY properties"""
+    card = None
+    for line_no, line in _unfold_lines(file):
+        name_and_params, _, value = line.partition(":")
+        name = name_and_params.split(";", 1)[0].rpartition(".")[2].upper()  # without a group, e.g. item1.TEL
+        if name == "BEGIN" and value.strip().upper() == "VCARD":
+            card = {"line": line_no, "FN": "", "N": "", "TEL": [], "BDAY": ""}
+        elif card is None:
+            continue
+        elif name == "END" and value.strip().upper() == "VCARD":
+            full_name = card["FN"]
+            if not full_name.strip() and card["N"]:
+                # family; given; additional; prefixes; suffixes
+                family, given, additional, *_ = _unescape_vcard_value(card["N"]) + ["", "", ""]
+                full_name = " ".join(part for part in (given, additional, family) if part.strip())
+            yield ContactRecord(card["line"], full_name, card["TEL"], card["BDAY"])
+            card = None
+        elif name == "FN" and not card["FN"]:
+            card["FN"] = ";".join(_unescape_vcard_value(value))
+        elif name == "N" and not card["N"]:
+            card["N"] = value
+        elif name == "BDAY" and not card["BDAY"]:
+            card["BDAY"] = _vcard_birth_date(value)
+        elif name == "TEL":
+            # vCard 4 may give a phone number as an URI: tel:+7...
+            value = value.strip()
+            card["TEL"].append(value[4:] if value.lower().startswith("tel:") else value)
+
+
+_name_rx = make_regular_expression(CONTACT_NAME_PATTERN, anchored=True)
+_phone_number_rx = make_regular_expression(PHONE_NUMBER_PATTERN, anchored=True)
+# a no-break space is written by spreadsheets formatting numbers
+_phone_number_separators = str.maketrans("", "", " \u00a0-().")
+_birth_date_formats = ("yyyy.MM.dd", "yyyy-MM-dd", "dd.MM.yyyy", "yyyyMMdd")
+# the range of the contact form's date field
+_min_birth_date = QDate(1900, 1, 1)
+
+
+def _is_valid_phone_number(phone_number: str) -> bool:
+    return len(phone_number) <= PHONE_NUMBER_MAX_LENGTH and _phone_number_rx.match(phone_number).hasMatch()
+
+
+def validate_contact(record: ContactRecord) -> Tuple[Optional[Tuple[str, str, str]], Optional[str]]:
+    """check a contact by the rules of the contact form; get (name, phone number, ISO birth date) or an error"""
+    name = record.name.strip()
+    if not _name_rx.match(name).hasMatch():
+        return None, "Имя должно быть строкой от 1 до 255 символов"
+
+    phone_numbers = [phone_number.translate(_phone_number_separators) for phone_number in record.phone_numbers]
+    phone_number = next((phone_number for phone_number in phone_numbers if _is_valid_phone_number(phone_number)),
+                        None)
+    if phone_number is None:
+        if not any(phone_numbers):
+            return None, "Не указан номер телефона"
+        return None, "Неверный номер телефона: {}".format(record.phone_numbers[0])
+
+    birth_date_text = record.birth_date.strip()
+    if not birth_date_text:
+        return None, "Не указана дата рождения"
+    if birth_date_text.startswith("--"):
+        return None, "В дате рождения не указан год: {}".format(birth_date_text)
+    birth_date = QDate()
+    for date_format in _birth_date_formats:
+        birth_date = QDate.fromString(birth_date_text, date_format)
+        if birth_date.isValid():
+            break
+    if not birth_date.isValid():
+        return None, "Неверная дата рождения: {}".format(birth_date_text)
+    if not _min_birth_date <= birth_date <= QDate.currentDate():
+        return None, "Дата рождения вне допустимого диапазона: {}".format(birth_date_text)
+    return (name, phone_number, birth_date.toString("yyyy-MM-dd")), None
+
+
+class _CountingReader(io.RawIOBase):
+    """a file wrapper counting bytes read, so that progress is known while a text file is being iterated"""
+    def __init__(self, file: BinaryIO):
+        super().__init__()
+        self.file = file
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        position = self.bytes_read = self.file.seek(offset, whence)
+        return position
+
+    def readinto(self, buffer):
+        size = self.file.readinto(buffer)
+        self.bytes_read += size
+        return size
+
+
+class ContactsImporter(QObject):
+    """imports contacts of a CSV or vCard file in the database thread, sending them by batches
+
+    Contacts are validated like the contact form does; duplicates of existing contacts are skipped by the server.
+    """
+    progressed = pyqtSignal(object)  # ContactsImportProgress, emitted in the database thread
+    max_reported_errors = 1000
+    progress_interval = 0.1  # seconds
+
+    def __init__(self, path, batch_size=1000, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.batch_size = batch_size
+        self._is_cancelled = False
+
+    def cancel(self):
+        """stop after the batch being sent; records read but not sent yet are not imported"""
+        self._is_cancelled = True
+
+    def is_vcard(self) -> bool:
+        return os.path.splitext(self.path)[1].lower() in VCARD_EXTENSIONS
+
+    def run(self) -> ContactsImportReport:
+        rows_read = sent_count = added_count = errors_count = 0
+        errors: List[RowError] = []
+        batch: List[Tuple[str, str, str]] = []
+        bytes_total = os.path.getsize(self.path)
+        with open(self.path, "rb") as raw_file:
+            counting_file = _CountingReader(raw_file)
+            text_file = io.TextIOWrapper(io.BufferedReader(counting_file), encoding=detect_encoding(counting_file),
+                                         newline="")
+            records = read_vcard(text_file) if self.is_vcard() else read_csv(text_file)
+            progressed_at = monotonic()
+            while not self._is_cancelled:
+                record = next(records, None)
+                if record is not None:
+                    rows_read += 1
+                    contact, error = validate_contact(record)
+                    if error is None:
+                        batch.append(contact)
+                    else:
+                        errors_count += 1
+                        if len(errors) < self.max_reported_errors:
+                            errors.append(RowError(record.line, error))
+                if len(batch) >= self.batch_size or (record is None and batch):
+                    try:
+                        result, added = db.add_contacts(batch)
+                    except db.DatabaseStatementError as exc:
+                        return ContactsImportReport(rows_read, added_count, sent_count - added_count, errors_count,
+                                                    errors, server_error=str(exc))
+                    if result is db.AddContactResult.INVALID_SESSION:
+                        return ContactsImportReport(rows_read, added_count, sent_count - added_count, errors_count,
+                                                    errors, is_session_invalid=True)
+                    sent_count += len(batch)
+                    added_count += added
+                    batch = []
+                if record is None or monotonic() - progressed_at >= self.progress_interval:
+                    progressed_at = monotonic()
+                    self.progressed.emit(ContactsImportProgress(counting_file.bytes_read, bytes_total, rows_read,
+                                                                added_count))
+                if record is None:
+                    break
+        return ContactsImportReport(rows_read, added_count, sent_count - added_count, errors_count, errors,
+                                    is_cancelled=self._is_cancelled)
+
+    def run_async(self, on_success: Optional[Callable[[ContactsImportReport], None]] = None,
+                  on_error: Optional[Callable[[Exception], None]] = None) -> Future:
+        return db.run_async(self.run, on_success=on_success, on_error=on_error)
+
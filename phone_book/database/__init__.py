@@ -4,4 +4,7 @@ logger = logging.getLogger(__name__)
 
 from .config import *
 from .errors import *
+from .executor import *
+from .metrics import *
+from .replica import *
 from .stored_procedures import *
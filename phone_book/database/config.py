@@ -1,42 +1,253 @@
-from typing import NamedTuple
+import threading
+from contextlib import contextmanager
+from time import monotonic, perf_counter
+from typing import Callable, List, NamedTuple, Optional, Tuple
 
-from PyQt5.QtSql import QSqlDatabase
+from PyQt5.QtSql import QSqlDatabase, QSqlQuery
 
-from .errors import process_error
+from . import logger
+from .errors import DatabaseError, process_error
+from .metrics import current_span
+from .statements import StatementCache
 
 
-def setup_db(settings, default_settings):
+class ConnectionParams(NamedTuple):
+    qsql_driver: str
+    host_name: str
+    port: int
+    database_name: str
+    username: str
+    password: str
+
+
+# Set by `setup_db()`; every thread opens its own connection with them since a connection is bound to a thread
+_connection_params: Optional[ConnectionParams] = None
+_connection_params_version = 0
+_connect_hooks: List[Callable[[QSqlDatabase], None]] = []
+# (session key, version) set by `bind_session()`; every connection binds the key on its next use & after each
+# reconnect. A single tuple is read at once, so a key is never bound with the version of another one
+_session: Tuple[Optional[str], int] = (None, 0)
+_session_lock = threading.Lock()
+
+
+def add_connect_hook(hook: Callable[[QSqlDatabase], None]):
+    """`hook` is called with every freshly opened connection after each (re)connect in any thread"""
+    _connect_hooks.append(hook)
+
+
+def remove_connect_hook(hook: Callable[[QSqlDatabase], None]):
+    _connect_hooks.remove(hook)
+
+
+class ConnectionStats(NamedTuple):
+    connects: int = 0
+    reuses: int = 0
+    reconnects: int = 0
+    health_checks: int = 0
+
+
+class ConnectionManager:
+    """keeps a connection opened between calls; an idle (or failed) one is pinged before reuse & reopened if lost"""
+    health_check_idle_interval = 30  # seconds
+
+    def __init__(self, connection_name="main_database"):
+        self.connection_name = connection_name
+        self.connects_count = 0
+        self.reuses_count = 0
+        self.reconnects_count = 0
+        self.health_checks_count = 0
+        self._last_used_at: Optional[float] = None
+        self.statement_cache: Optional[StatementCache] = None
+        self._connection_params_version = None
+        self._session_key_version = None
+
+    def add_database(self) -> QSqlDatabase:
+        """(re)create the connection with the current parameters if they are changed since the last call"""
+        if _connection_params is None:
+            raise RuntimeError("You must call `setup_db()` at first")
+        if self._connection_params_version == _connection_params_version:
+            return QSqlDatabase.database(connectionName=self.connection_name, open=False)
+        self.close()
+        params = _connection_params
+        db = QSqlDatabase.addDatabase(params.qsql_driver, connectionName=self.connection_name)
+        if not db.isValid():
+            raise RuntimeError("database driver improperly configured")
+        for val, method in zip(params[1:], (db.setHostName, db.setPort, db.setDatabaseName, db.setUserName,
+                                            db.setPassword)):
+            method(val)
+        self._connection_params_version = _connection_params_version
+        return db
+
+    def get_db(self) -> QSqlDatabase:
+        db = self.add_database()
+        if db.isOpen():
+            if self._is_healthy(db):
+                self.reuses_count += 1
+                self._last_used_at = monotonic()
+                self._bind_session()
+                return db
+            logger.info("Connection `%s` is lost, reconnecting", self.connection_name)
+            db.close()
+            self.reconnects_count += 1
+        self._open(db)
+        self._bind_session()
+        return db
+
+    def _open(self, db: QSqlDatabase):
+        db.open()
+        if db.isOpenError():
+            self._last_used_at = None
+            process_error(db)
+        self.connects_count += 1
+        self._last_used_at = monotonic()
+        # statements are bound to the connection they were created for
+        self.statement_cache = StatementCache(db, on_connection_lost=self.reconnect)
+        # so is a session
+        self._session_key_version = None
+        for hook in _connect_hooks:
+            hook(db)
+
+    def reconnect(self):
+        """reopen the connection lost unnoticed by the health check & bind the session again"""
+        logger.info("Connection `%s` is lost, reconnecting", self.connection_name)
+        db = QSqlDatabase.database(connectionName=self.connection_name, open=False)
+        db.close()
+        self.reconnects_count += 1
+        self._open(db)
+        self._bind_session()
+
+    def _bind_session(self):
+        session_key, version = _session
+        if self._session_key_version == version:
+            return
+        statement = self.statement_cache.get("CALL bind_session(:session_key)")
+        statement.bind_value(":session_key", session_key)
+        statement.exec()
+        self._session_key_version = version
+
+    def _is_healthy(self, db: QSqlDatabase):
+        if self._last_used_at is not None and monotonic() - self._last_used_at < self.health_check_idle_interval:
+            return True
+        self.health_checks_count += 1
+        span = current_span()
+        if span is not None:
+            span.round_trips += 1
+        # `DO` evaluates an expression without producing a result set, so it is the cheapest possible ping
+        return QSqlQuery(db).exec("DO 1")
+
+    def invalidate(self):
+        """force a health check before the connection is reused next time"""
+        self._last_used_at = None
+
+    def close(self, remove=False):
+        """`remove` also drops the connection from Qt's registry, e.g. when its thread is exiting"""
+        if QSqlDatabase.contains(connectionName=self.connection_name):
+            QSqlDatabase.database(connectionName=self.connection_name, open=False).close()
+        self._last_used_at = None
+        logger.debug("Connection `%s` closed; %s; %s", self.connection_name, self.stats(),
+                     self.statement_cache and self.statement_cache.stats())
+        # cached statements refer to the connection, so they have to go before it is removed
+        self.statement_cache = None
+        if remove and QSqlDatabase.contains(connectionName=self.connection_name):
+            QSqlDatabase.removeDatabase(self.connection_name)
+            self._connection_params_version = None
+
+    def stats(self) -> ConnectionStats:
+        return ConnectionStats(self.connects_count, self.reuses_count, self.reconnects_count,
+                               self.health_checks_count)
+
+
+_thread_local = threading.local()
+
+
+def get_connection_manager() -> ConnectionManager:
+    """get the manager of the current thread's connection"""
+    manager = getattr(_thread_local, "connection_manager", None)
+    if manager is None:
+        if threading.current_thread() is threading.main_thread():
+            connection_name = "main_database"
+        else:
+            connection_name = "main_database_{}".format(threading.get_ident())
+        manager = _thread_local.connection_manager = ConnectionManager(connection_name)
+    return manager
+
+
+def setup_db(settings, default_settings, force=False):
+    """take connection parameters from the settings; `force` makes every connection reopen on its next use even if
+    they are the same, e.g. when a user saves the settings"""
+    global _connection_params, _connection_params_version
+    values = []
     try:
         settings.beginGroup("database")
         if default_settings is not settings:
             default_settings.beginGroup("database")
-        qsql_driver = settings.value("qsql_driver")
-        if qsql_driver is None:
-            qsql_driver = default_settings.value("qsql_driver")
-        db = QSqlDatabase.addDatabase(qsql_driver, connectionName="main_database")
-        if not db.isValid():
-            raise RuntimeError("database driver improperly configured")
-        for key, method in zip(("host_name", "port", "database_name", "username", "password"),
-                               (db.setHostName, db.setPort, db.setDatabaseName, db.setUserName, db.setPassword)):
+        for key in ConnectionParams._fields:
             val = settings.value(key)
             if val is None:
                 val = default_settings.value(key)
             if key == "port":
                 val = int(val)
-            method(val)
+            values.append(val)
     finally:
         settings.endGroup()
         if default_settings is not settings:
             default_settings.endGroup()
+    params = ConnectionParams(*values)
+    if params == _connection_params and not force:
+        # open connections are kept, e.g. the one opened by the startup pipeline before the window is shown
+        return
+    _connection_params = params
+    _connection_params_version += 1
+    # connections of other threads are recreated on their next use
+    get_connection_manager().add_database()
+
+
+def bind_session(session_key: Optional[str]):
+    """make contact procedures act on behalf of the session's user; None unbinds the current session
+
+    The server resolves the user once per connection instead of looking the key up in every call.
+    """
+    global _session
+    # called from both the GUI thread & the database one, e.g. by the startup pipeline
+    with _session_lock:
+        if session_key == _session[0]:
+            return
+        _session = (session_key, _session[1] + 1)
 
 
 def get_opened_db():
-    if not QSqlDatabase.contains(connectionName="main_database"):
-        raise RuntimeError("You must call `setup_db()` at first")
-    db = QSqlDatabase.database(connectionName="main_database", open=True)
-    if db.isOpenError():
-        process_error(db)
-    return db
+    return get_connection_manager().get_db()
+
+
+@contextmanager
+def opened_db():
+    manager = get_connection_manager()
+    span = current_span()
+    started_at = perf_counter() if span is not None else 0.0
+    try:
+        db = manager.get_db()
+    finally:
+        if span is not None:
+            span.add_phase("connect", perf_counter() - started_at)
+    try:
+        yield db
+    except DatabaseError:
+        manager.invalidate()
+        raise
+
+
+@contextmanager
+def cached_statement(sql):
+    with opened_db():
+        yield get_connection_manager().statement_cache.get(sql)
+
+
+def close_db(remove=False):
+    """close the current thread's connection; `remove` also forgets it & its manager, so a thread about to exit
+    leaves nothing behind"""
+    get_connection_manager().close(remove=remove)
+    if remove:
+        del _thread_local.connection_manager
 
 
 class CheckDBConnectionSettingsResult(NamedTuple):
@@ -21,6 +21,8 @@ class DatabaseError(Exception):
             exc_cls = err_type_to_exc_cls[error.type()]
         except KeyError:
             raise RuntimeError("unknown value {} of {}".format(error.type(), QSqlError.ErrorType))
+        # errors signalled by procedures with codes of their own
+        exc_cls = _native_code_to_exc_cls.get(error.nativeErrorCode(), exc_cls)
         return None if exc_cls is None else exc_cls(
             "[{}] {}; {}".format(error.nativeErrorCode(), error.databaseText(), error.driverText()), error)
 
@@ -44,6 +46,21 @@ class DatabaseUnknownError(DatabaseError):
     pass
 
 
+class DatabaseConnectionLostError(DatabaseConnectionError):
+    """the server closed the connection, e.g. on restart or after `wait_timeout`; it is worth reopening"""
+
+
+class ContactsChangesPurgedError(DatabaseStatementError):
+    """tombstones after the row version asked for are purged, so contacts are to be loaded anew"""
+
+
+_native_code_to_exc_cls = {
+    "2006": DatabaseConnectionLostError,  # server has gone away
+    "2013": DatabaseConnectionLostError,  # lost connection during query
+    "30001": ContactsChangesPurgedError,
+}
+
+
 def process_error(value: Union[QSqlError, QSqlQuery, QSqlDatabase],
                   raise_exc=True, log=True, show_msg_if_not_conn_err=False) -> Optional[DatabaseError]:
     error = value.lastError() if isinstance(value, (QSqlQuery, QSqlDatabase)) else value
@@ -0,0 +1,93 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import wraps
+from typing import Callable, Optional
+
+from PyQt5.QtCore import QObject, Qt, pyqtSignal
+
+from .config import check_db_connection_settings, close_db
+
+
+class DatabaseExecutor(QObject):
+    """runs database calls one by one in a worker thread having its own connection
+
+    Results (or exceptions) are passed to callbacks in the thread the executor was created in, i.e. the GUI one.
+    """
+    _call_finished = pyqtSignal(object, object, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # a single worker keeps calls ordered, e.g. a contact is added before contacts are fetched again
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="phone_book_db")
+        # queued even when a call is already done by the time its callbacks are attached in the GUI thread
+        self._call_finished.connect(self._handle_call_finished, Qt.QueuedConnection)
+
+    def submit(self, fn: Callable, *args, on_success: Optional[Callable] = None,
+               on_error: Optional[Callable[[Exception], None]] = None, **kwargs) -> Future:
+        future = self._pool.submit(fn, *args, **kwargs)
+        self.add_callbacks(future, on_success=on_success, on_error=on_error)
+        return future
+
+    def add_callbacks(self, future: Future, on_success: Optional[Callable] = None,
+                      on_error: Optional[Callable[[Exception], None]] = None):
+        """attach callbacks to a call submitted earlier, e.g. before the one to get its result was created"""
+        if on_success is not None or on_error is not None:
+            future.add_done_callback(lambda f: self._call_finished.emit(f, on_success, on_error))
+
+    @staticmethod
+    def _handle_call_finished(future: Future, on_success, on_error):
+        if future.cancelled():
+            return
+        exc = future.exception()
+        if exc is None:
+            if on_success is not None:
+                on_success(future.result())
+        elif on_error is not None:
+            on_error(exc)
+        else:
+            raise exc
+
+    def shutdown(self):
+        """wait for submitted calls & close the worker's connection"""
+        self._pool.submit(close_db, remove=True)
+        self._pool.shutdown(wait=True)
+
+
+_executor: Optional[DatabaseExecutor] = None
+
+
+def get_executor() -> DatabaseExecutor:
+    global _executor
+    if _executor is None:
+        _executor = DatabaseExecutor()
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+
+
+def run_async(fn: Callable, *args, on_success: Optional[Callable] = None,
+              on_error: Optional[Callable[[Exception], None]] = None, **kwargs) -> Future:
+    return get_executor().submit(fn, *args, on_success=on_success, on_error=on_error, **kwargs)
+
+
+def add_callbacks(future: Future, on_success: Optional[Callable] = None,
+                  on_error: Optional[Callable[[Exception], None]] = None):
+    get_executor().add_callbacks(future, on_success=on_success, on_error=on_error)
+
+
+def async_variant(fn: Callable) -> Callable[..., Future]:
+    """make a function submitting `fn` to the database thread; it takes `on_success` & `on_error` callbacks"""
+    @wraps(fn)
+    def wrapper(*args, on_success: Optional[Callable] = None,
+                on_error: Optional[Callable[[Exception], None]] = None, **kwargs) -> Future:
+        return run_async(fn, *args, on_success=on_success, on_error=on_error, **kwargs)
+
+    wrapper.__name__ = wrapper.__qualname__ = fn.__name__ + "_async"
+    return wrapper
+
+
+check_db_connection_settings_async = async_variant(check_db_connection_settings)
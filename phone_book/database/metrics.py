@@ -0,0 +1,283 @@
+"""Wall time, round trips & rows of database calls aggregated into in-memory histograms.
+
+Procedure calls & model refreshes are measured only while metrics are enabled (see `enable_metrics()`),
+otherwise measuring them costs a check of a global per call.
+Time of a procedure call is split into phases: getting the connection (incl. a reconnect or a ping), executing
+the statement & fetching its rows.
+"""
+import bisect
+import json
+import math
+import os
+import threading
+from contextlib import nullcontext
+from time import perf_counter
+from typing import Callable, Dict, Optional, Tuple
+
+from PyQt5.QtCore import QObject, QTimer
+
+from . import logger
+
+PHASES = ("total", "connect", "execute", "fetch")
+# upper bounds of histogram buckets, seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+
+
+class _ThreadLocal(threading.local):
+    span: Optional["CallSpan"] = None  # a default is much cheaper than a missing attribute
+
+
+_thread_local = _ThreadLocal()
+_no_span = nullcontext()  # reusable, unlike spans
+
+
+class CallSpan:
+    """a call being measured; the code doing its phases adds their time & round trips
+
+    As a context manager it is the current span of the thread, see `current_span()`.
+    """
+    __slots__ = ("registry", "name", "started_at", "phases", "round_trips", "rows", "_previous")
+
+    def __init__(self, registry: "MetricsRegistry", name: str):
+        self.registry = registry
+        self.name = name
+        self.started_at = perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.round_trips = 0
+        self.rows = 0
+        self._previous: Optional[CallSpan] = None
+
+    def add_phase(self, phase: str, seconds: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def finish(self, is_error=False):
+        self.registry.record(self, perf_counter() - self.started_at, is_error)
+
+    def __enter__(self):
+        self._previous = _thread_local.span
+        _thread_local.span = self
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _thread_local.span = self._previous
+        self.finish(exc_type is not None)
+
+
+class CallStats:
+    __slots__ = ("count", "errors", "round_trips", "rows", "max_seconds", "phase_counts", "sums", "buckets")
+
+    def __init__(self):
+        self.count = self.errors = self.round_trips = self.rows = 0
+        self.max_seconds = 0.0
+        # a refresh of a model has no phases but the total one
+        self.phase_counts = dict.fromkeys(PHASES, 0)
+        self.sums = dict.fromkeys(PHASES, 0.0)
+        self.buckets = {phase: [0] * len(BUCKETS) for phase in PHASES}  # non-cumulative counts
+
+    def copy(self) -> "CallStats":
+        stats = CallStats()
+        stats.count, stats.errors, stats.round_trips, stats.rows = self.count, self.errors, self.round_trips, self.rows
+        stats.max_seconds = self.max_seconds
+        stats.phase_counts = dict(self.phase_counts)
+        stats.sums = dict(self.sums)
+        stats.buckets = {phase: counts[:] for phase, counts in self.buckets.items()}
+        return stats
+
+    def mean(self, phase="total") -> float:
+        return self.sums[phase] / self.phase_counts[phase] if self.phase_counts[phase] else 0.0
+
+    def percentile(self, percent: float, phase="total") -> float:
+        """estimated by linear interpolation within the bucket; the maximum bounds the last one"""
+        counts = self.buckets[phase]
+        rank = percent / 100 * sum(counts)
+        seen = 0
+        for idx, count in enumerate(counts):
+            if count and seen + count >= rank:
+                lower = BUCKETS[idx - 1] if idx else 0.0
+                upper = min(BUCKETS[idx], self.max_seconds) if phase == "total" else BUCKETS[idx]
+                if math.isinf(upper):
+                    return lower
+                return lower + (upper - lower) * max(rank - seen, 0) / count
+            seen += count
+        return 0.0
+
+
+class MetricsRegistry:
+    def __init__(self, slow_call_threshold: Optional[float] = None):
+        self.slow_call_threshold = slow_call_threshold  # seconds; calls at least that long are logged
+        self._lock = threading.Lock()
+        self._stats: Dict[str, CallStats] = {}
+
+    def record(self, span: CallSpan, total: float, is_error: bool):
+        phases = dict(span.phases, total=total)
+        with self._lock:
+            stats = self._stats.get(span.name)
+            if stats is None:
+                stats = self._stats[span.name] = CallStats()
+            stats.count += 1
+            stats.errors += is_error
+            stats.round_trips += span.round_trips
+            stats.rows += span.rows
+            stats.max_seconds = max(stats.max_seconds, total)
+            for phase, seconds in phases.items():
+                stats.phase_counts[phase] += 1
+                stats.sums[phase] += seconds
+                stats.buckets[phase][bisect.bisect_left(BUCKETS, seconds)] += 1
+        if self.slow_call_threshold is not None and total >= self.slow_call_threshold:
+            logger.warning("Slow database call `%s`: %.0f ms (connect %.0f, execute %.0f, fetch %.0f), "
+                           "%d round trip(s), %d row(s)%s", span.name, total * 1000,
+                           phases.get("connect", 0.0) * 1000, phases.get("execute", 0.0) * 1000,
+                           phases.get("fetch", 0.0) * 1000, span.round_trips, span.rows,
+                           ", failed" if is_error else "")
+
+    def snapshot(self) -> Dict[str, CallStats]:
+        with self._lock:
+            return {name: stats.copy() for name, stats in self._stats.items()}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def to_dict(self) -> dict:
+        calls = {}
+        for name, stats in sorted(self.snapshot().items()):
+            calls[name] = {
+                "count": stats.count,
+                "errors": stats.errors,
+                "round_trips": stats.round_trips,
+                "rows": stats.rows,
+                "max_ms": stats.max_seconds * 1000,
+                "p50_ms": stats.percentile(50) * 1000,
+                "p95_ms": stats.percentile(95) * 1000,
+                "p99_ms": stats.percentile(99) * 1000,
+                "mean_ms": {phase: stats.mean(phase) * 1000 for phase in PHASES if stats.phase_counts[phase]},
+                "buckets": {phase: counts for phase, counts in stats.buckets.items() if stats.phase_counts[phase]},
+            }
+        return {"buckets_upper_bounds_s": [None if math.isinf(bound) else bound for bound in BUCKETS], "calls": calls}
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """the text exposition format: a histogram of seconds by call & phase and counters by call"""
+        snapshot = sorted(self.snapshot().items())
+        lines = ["# HELP phone_book_db_call_seconds Wall time of database calls by phase.",
+                 "# TYPE phone_book_db_call_seconds histogram"]
+        for name, stats in snapshot:
+            for phase in PHASES:
+                if not stats.phase_counts[phase]:
+                    continue
+                labels = 'call="{}",phase="{}"'.format(name, phase)
+                cumulative = 0
+                for bound, count in zip(BUCKETS, stats.buckets[phase]):
+                    cumulative += count
+                    lines.append('phone_book_db_call_seconds_bucket{{{},le="{}"}} {}'.format(
+                        labels, "+Inf" if math.isinf(bound) else bound, cumulative))
+                lines.append("phone_book_db_call_seconds_sum{{{}}} {}".format(labels, stats.sums[phase]))
+                lines.append("phone_book_db_call_seconds_count{{{}}} {}".format(labels, stats.phase_counts[phase]))
+        for metric, attr, help_text in (("errors", "errors", "Failed database calls."),
+                                        ("round_trips", "round_trips", "Statements sent to the server by calls."),
+                                        ("rows", "rows", "Rows returned by calls.")):
+            lines.append("# HELP phone_book_db_call_{}_total {}".format(metric, help_text))
+            lines.append("# TYPE phone_book_db_call_{}_total counter".format(metric))
+            for name, stats in snapshot:
+                lines.append('phone_book_db_call_{}_total{{call="{}"}} {}'.format(metric, name, getattr(stats, attr)))
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str):
+        """write Prometheus text or, for a *.json file, JSON; the file is replaced at once"""
+        text = self.to_json() if path.lower().endswith(".json") else self.to_prometheus()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            file.write(text)
+        os.replace(tmp_path, path)
+
+
+_registry: Optional[MetricsRegistry] = None
+
+
+def enable_metrics(slow_call_threshold: Optional[float] = None) -> MetricsRegistry:
+    """start measuring calls; stats gathered already are kept"""
+    global _registry
+    if _registry is None:
+        _registry = MetricsRegistry()
+    _registry.slow_call_threshold = slow_call_threshold
+    return _registry
+
+
+def disable_metrics():
+    global _registry
+    _registry = None
+
+
+def get_metrics() -> Optional[MetricsRegistry]:
+    return _registry
+
+
+def start_span(name: str) -> Optional[CallSpan]:
+    registry = _registry
+    return None if registry is None else CallSpan(registry, name)
+
+
+def call_span(name: str):
+    """a context of a measured call giving its span or None if metrics are disabled"""
+    registry = _registry
+    return _no_span if registry is None else CallSpan(registry, name)
+
+
+def current_span() -> Optional[CallSpan]:
+    return _thread_local.span
+
+
+def traced_callbacks(name: str, on_success: Optional[Callable] = None,
+                     on_error: Optional[Callable[[Exception], None]] = None
+                     ) -> Tuple[Optional[Callable], Optional[Callable[[Exception], None]]]:
+    """callbacks of an asynchronous call finishing its span, i.e. the call is measured with its wait in the queue
+    & the callback; the given ones if metrics are disabled"""
+    span = start_span(name)
+    if span is None:
+        return on_success, on_error
+
+    def on_traced_success(result):
+        if isinstance(result, list):
+            span.rows = len(result)
+        try:
+            if on_success is not None:
+                on_success(result)
+        finally:
+            span.finish()
+
+    def on_traced_error(exc: Exception):
+        span.finish(is_error=True)
+        if on_error is None:
+            raise exc
+        on_error(exc)
+
+    return on_traced_success, on_traced_error
+
+
+class MetricsExporter(QObject):
+    """writes the metrics to a file periodically & once more when stopped"""
+    def __init__(self, path: str, interval_s=60, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self._timer = QTimer(self)
+        self._timer.setInterval(int(interval_s * 1000))
+        self._timer.timeout.connect(self.export)
+
+    def start(self):
+        self._timer.start()
+
+    def stop(self):
+        self._timer.stop()
+        self.export()
+
+    def export(self):
+        registry = _registry
+        if registry is None:
+            return
+        try:
+            registry.export(self.path)
+        except OSError as exc:
+            logger.warning("Can't export database metrics to %s: %s", self.path, exc)
+
@@ -0,0 +1,147 @@
+import hashlib
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple
+
+from PyQt5.QtCore import QDate, Qt
+from PyQt5.QtSql import QSqlDatabase, QSqlQuery
+
+from . import logger
+from .errors import process_error
+from .executor import DatabaseExecutor
+
+
+class ContactsReplica:
+    """an on-disk SQLite copy of users' contacts for instant startup & reads while a server is unreachable
+
+    Contacts are kept per owner, i.e. a user of a particular server, along with the greatest row version seen,
+    so only contacts changed after it are fetched from the server (see `get_contacts_changed_since()`).
+    The file is accessed only from the replica's own thread: use `run_async()` to call the methods.
+    """
+    connection_name = "contacts_replica"
+    _schema = (
+        "CREATE TABLE IF NOT EXISTS owners (owner TEXT PRIMARY KEY, username TEXT NOT NULL, "
+        "row_version INTEGER NOT NULL DEFAULT 0)",
+        "CREATE TABLE IF NOT EXISTS contacts (owner TEXT NOT NULL, id INTEGER NOT NULL, name TEXT NOT NULL, "
+        "phone_number TEXT NOT NULL, birth_date TEXT, PRIMARY KEY (owner, id))",
+        # only hashes of session keys are stored: they let find the owner of a remembered session but not log in
+        "CREATE TABLE IF NOT EXISTS sessions (session_hash TEXT PRIMARY KEY, owner TEXT NOT NULL)",
+    )
+
+    def __init__(self, path):
+        self.path = path
+        self._executor = DatabaseExecutor()
+
+    def run_async(self, fn: Callable, *args, on_success: Optional[Callable] = None,
+                  on_error: Optional[Callable[[Exception], None]] = None, **kwargs) -> Future:
+        return self._executor.submit(fn, *args, on_success=on_success, on_error=on_error, **kwargs)
+
+    def _get_db(self) -> QSqlDatabase:
+        if QSqlDatabase.contains(self.connection_name):
+            return QSqlDatabase.database(self.connection_name)
+        db = QSqlDatabase.addDatabase("QSQLITE", self.connection_name)
+        db.setDatabaseName(self.path)
+        if not db.open():
+            process_error(db)
+        for sql in self._schema:
+            self._exec(sql, db=db)
+        return db
+
+    def _prepare(self, sql, db: Optional[QSqlDatabase] = None) -> QSqlQuery:
+        query = QSqlQuery(db if db is not None else self._get_db())
+        query.setForwardOnly(True)
+        if not query.prepare(sql):
+            process_error(query)
+        return query
+
+    @staticmethod
+    def _exec_prepared(query: QSqlQuery, **values) -> QSqlQuery:
+        for name, value in values.items():
+            query.bindValue(":" + name, value)
+        if not query.exec():
+            process_error(query)
+        return query
+
+    def _exec(self, sql, db: Optional[QSqlDatabase] = None, **values) -> QSqlQuery:
+        return self._exec_prepared(self._prepare(sql, db), **values)
+
+    @staticmethod
+    def _hash(session_key) -> str:
+        return hashlib.sha256(session_key.encode()).hexdigest()
+
+    def load(self, owner) -> Tuple[int, List[List]]:
+        """get the greatest row version seen & contacts of the owner"""
+        query = self._exec("SELECT row_version FROM owners WHERE owner = :owner", owner=owner)
+        row_version = query.value(0) if query.next() else 0
+        query = self._exec("SELECT id, name, phone_number, birth_date FROM contacts WHERE owner = :owner",
+                           owner=owner)
+        rows = []
+        while query.next():
+            birth_date = None if query.isNull(3) else QDate.fromString(query.value(3), Qt.ISODate)
+            rows.append([query.value(0), query.value(1), query.value(2), birth_date])
+        return row_version, rows
+
+    def apply_changes(self, owner, username, changes: List[List]) -> int:
+        """save rows of `get_contacts_changed_since()` & return the greatest row version seen"""
+        db = self._get_db()
+        db.transaction()
+        try:
+            self._exec("INSERT OR IGNORE INTO owners (owner, username) VALUES (:owner, :username)",
+                       owner=owner, username=username)
+            delete_query = self._prepare("DELETE FROM contacts WHERE owner = :owner AND id = :id", db)
+            upsert_query = self._prepare(
+                "INSERT OR REPLACE INTO contacts (owner, id, name, phone_number, birth_date) "
+                "VALUES (:owner, :id, :name, :phone_number, :birth_date)", db)
+            for contact_id, name, phone_number, birth_date, row_version, is_deleted in changes:
+                if is_deleted:
+                    self._exec_prepared(delete_query, owner=owner, id=contact_id)
+                else:
+                    self._exec_prepared(upsert_query, owner=owner, id=contact_id, name=name,
+                                        phone_number=phone_number,
+                                        birth_date=None if birth_date is None else birth_date.toString(Qt.ISODate))
+            if changes:
+                self._exec("UPDATE owners SET row_version = MAX(row_version, :row_version) WHERE owner = :owner",
+                           owner=owner, row_version=changes[-1][4])
+        except Exception:
+            db.rollback()
+            raise
+        if not db.commit():
+            process_error(db)
+        query = self._exec("SELECT row_version FROM owners WHERE owner = :owner", owner=owner)
+        return query.value(0) if query.next() else 0
+
+    def forget_contacts(self, owner):
+        """drop contacts of the owner to be loaded anew"""
+        db = self._get_db()
+        db.transaction()
+        try:
+            self._exec("DELETE FROM contacts WHERE owner = :owner", owner=owner)
+            self._exec("UPDATE owners SET row_version = 0 WHERE owner = :owner", owner=owner)
+        except Exception:
+            db.rollback()
+            raise
+        if not db.commit():
+            process_error(db)
+
+    def remember_session(self, owner, session_key):
+        self._exec("INSERT OR REPLACE INTO sessions (session_hash, owner) VALUES (:session_hash, :owner)",
+                   session_hash=self._hash(session_key), owner=owner)
+
+    def forget_session(self, session_key):
+        self._exec("DELETE FROM sessions WHERE session_hash = :session_hash", session_hash=self._hash(session_key))
+
+    def get_session_owner(self, session_key) -> Optional[Tuple[str, str]]:
+        """get the owner & the username of a remembered session"""
+        query = self._exec("SELECT o.owner, o.username FROM sessions AS s JOIN owners AS o ON o.owner = s.owner "
+                           "WHERE s.session_hash = :session_hash", session_hash=self._hash(session_key))
+        return (query.value(0), query.value(1)) if query.next() else None
+
+    def _close(self):
+        if QSqlDatabase.contains(self.connection_name):
+            QSqlDatabase.database(self.connection_name, open=False).close()
+            QSqlDatabase.removeDatabase(self.connection_name)
+        logger.debug("Contacts replica `%s` closed", self.path)
+
+    def close(self):
+        """wait for submitted calls & close the file"""
+        self._executor.submit(self._close)
+        self._executor.shutdown()
@@ -0,0 +1,126 @@
+import re
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from PyQt5.QtCore import QDate, QVariant
+from PyQt5.QtSql import QSqlDatabase, QSqlField, QSqlQuery
+
+from .errors import DatabaseConnectionLostError, process_error
+from .metrics import current_span
+
+_PY_TYPE_TO_FIELD_TYPE = {bool: QVariant.Bool, int: QVariant.LongLong, float: QVariant.Double, str: QVariant.String,
+                          QDate: QVariant.Date}
+
+
+def _field_value(value) -> Tuple[int, object]:
+    """(field type, value of a type the driver can format)"""
+    if value is None:
+        return QVariant.String, None
+    if isinstance(value, Decimal):
+        # a string literal is converted by the server without a loss of precision
+        return QVariant.String, str(value)
+    # subclasses, e.g. IntEnum members, are bound as their base type
+    for cls in type(value).__mro__:
+        field_type = _PY_TYPE_TO_FIELD_TYPE.get(cls)
+        if field_type is not None:
+            return field_type, value if type(value) is cls else cls(value)
+    raise TypeError("can't bind a value of type {}".format(type(value).__name__))
+
+
+class ParsedStatement:
+    """a statement with `:name` placeholders parsed once & then re-bound and executed any number of times
+
+    It isn't prepared on the server: a result set of a CALL executed as a server-side prepared statement can't be
+    fetched with QMYSQL (`isSelect()` is False for it), so bound values are escaped by the connection's driver
+    and the statement is sent as a plain text query, i.e. in a single round trip.
+    Every placeholder has to be bound again before each execution.
+    If the connection turns out to be lost, `on_connection_lost` (if any) is to reopen it & the statement is sent once
+    more: the server drops an idle connection between health checks unnoticed.
+    """
+    _placeholder_rx = re.compile(r":([A-Za-z_][A-Za-z0-9_]*)")
+
+    def __init__(self, db: QSqlDatabase, sql: str, on_connection_lost: Optional[Callable[[], None]] = None):
+        self.db = db
+        self.sql = sql
+        self.on_connection_lost = on_connection_lost
+        self._chunks: List[str] = self._placeholder_rx.split(sql)  # literal text & placeholder names alternate
+        self._fields: Dict[str, QSqlField] = {name: QSqlField(name) for name in self._chunks[1::2]}
+        self._bound: Set[str] = set()
+
+    def bind_value(self, placeholder: str, value):
+        name = placeholder.lstrip(":")
+        field = self._fields[name]
+        field_type, value = _field_value(value)
+        field.setType(field_type)
+        field.setValue(value)
+        self._bound.add(name)
+
+    def bind_values(self, **values):
+        for name, value in values.items():
+            self.bind_value(name, value)
+
+    def exec(self) -> QSqlQuery:
+        if len(self._bound) != len(self._fields):
+            unbound = sorted(self._fields.keys() - self._bound)
+            raise ValueError("unbound placeholders: {}".format(", ".join(unbound)))
+        driver = self.db.driver()
+        chunks = self._chunks[:]
+        for idx in range(1, len(chunks), 2):
+            chunks[idx] = driver.formatValue(self._fields[chunks[idx]])
+        # values of a call aren't reused by the next one by mistake
+        self._bound.clear()
+        sql = "".join(chunks)
+        try:
+            return self._exec_sql(sql)
+        except DatabaseConnectionLostError:
+            if self.on_connection_lost is None:
+                raise
+        self.on_connection_lost()
+        return self._exec_sql(sql)
+
+    def _exec_sql(self, sql: str) -> QSqlQuery:
+        query = QSqlQuery(self.db)
+        query.setForwardOnly(True)
+        span = current_span()
+        if span is not None:
+            span.round_trips += 1
+        if not query.exec(sql):
+            process_error(query)
+        return query
+
+
+class StatementCacheStats(NamedTuple):
+    size: int = 0
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+class StatementCache:
+    """per-connection LRU cache of parsed statements keyed by SQL text"""
+    def __init__(self, db: QSqlDatabase, max_size=64, on_connection_lost: Optional[Callable[[], None]] = None):
+        self.db = db
+        self.max_size = max_size
+        self.on_connection_lost = on_connection_lost
+        self.hits = self.misses = self.evictions = 0
+        self._statements: "OrderedDict[str, ParsedStatement]" = OrderedDict()
+
+    def get(self, sql: str) -> ParsedStatement:
+        statement = self._statements.get(sql)
+        if statement is not None:
+            self.hits += 1
+            self._statements.move_to_end(sql)
+            return statement
+        self.misses += 1
+        statement = self._statements[sql] = ParsedStatement(self.db, sql, self.on_connection_lost)
+        if len(self._statements) > self.max_size:
+            self._statements.popitem(last=False)
+            self.evictions += 1
+        return statement
+
+    def clear(self):
+        self._statements.clear()
+
+    def stats(self) -> StatementCacheStats:
+        return StatementCacheStats(len(self._statements), self.hits, self.misses, self.evictions)
@@ -1,29 +1,79 @@
+import json
+import re
+from concurrent.futures import Future
 from enum import Enum
-from typing import NamedTuple, Optional, Tuple, Union
+from functools import lru_cache, partial
+from time import perf_counter
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple, Union
 
-from PyQt5.QtCore import QDate, Qt
-from PyQt5.QtSql import QSqlQuery, QSqlQueryModel
+from PyQt5.QtCore import QAbstractTableModel, QDate, QModelIndex, QObject, QSortFilterProxyModel, Qt, pyqtSignal
+from PyQt5.QtSql import QSqlQuery
 
-from .config import get_opened_db
+from . import logger
+from .config import cached_statement
 from .errors import process_error
+from .executor import async_variant, run_async
+from .metrics import CallSpan, call_span, traced_callbacks
+from .statements import ParsedStatement
 
+_procedure_name_rx = re.compile(r"CALL\s+(\w+)")
 
-def check_session_exists(session_key):
-    db = get_opened_db()
+
+@lru_cache(maxsize=None)
+def _procedure_name(sql: str) -> str:
+    """a call's name in metrics"""
+    match = _procedure_name_rx.match(sql)
+    return match.group(1) if match else sql
+
+
+def _row_values(query: QSqlQuery, column_count: int) -> List:
+    return [None if query.isNull(idx) else query.value(idx) for idx in range(column_count)]
+
+
+def _exec(statement: ParsedStatement, span: Optional[CallSpan]) -> QSqlQuery:
+    if span is None:
+        return statement.exec()
+    started_at = perf_counter()
     try:
-        query = QSqlQuery(db)
-        query.prepare("CALL check_session(:session_key, @session_exists)")
-        query.bindValue(":session_key", session_key)
-        if not query.exec():
-            process_error(query)
-        if not query.exec("SELECT @session_exists"):
-            process_error(query)
+        return statement.exec()
+    finally:
+        span.add_phase("execute", perf_counter() - started_at)
+
+
+def _call_returning_row(sql: str, **values) -> List:
+    """call a procedure selecting a single row; NULLs are returned as None"""
+    with call_span(_procedure_name(sql)) as span, cached_statement(sql) as statement:
+        statement.bind_values(**values)
+        query = _exec(statement, span)
+        started_at = perf_counter() if span is not None else 0.0
         if not query.next():
             process_error(query)
         else:
-            return bool(query.value(0))
-    finally:
-        db.close()
+            row = _row_values(query, query.record().count())
+            if span is not None:
+                span.add_phase("fetch", perf_counter() - started_at)
+                span.rows = 1
+            return row
+
+
+def _call_returning_rows(sql: str, **values) -> List[List]:
+    with call_span(_procedure_name(sql)) as span, cached_statement(sql) as statement:
+        statement.bind_values(**values)
+        query = _exec(statement, span)
+        started_at = perf_counter() if span is not None else 0.0
+        column_count = query.record().count()
+        rows = []
+        while query.next():
+            rows.append(_row_values(query, column_count))
+        if span is not None:
+            span.add_phase("fetch", perf_counter() - started_at)
+            span.rows = len(rows)
+        return rows
+
+
+def check_session_exists(session_key):
+    session_exists, = _call_returning_row("CALL check_session_rs(:session_key)", session_key=session_key)
+    return bool(session_exists)
 
 
 class RegisterResult(Enum):
@@ -34,102 +84,82 @@ class RegisterResult(Enum):
 
 
 def register(username, email, birth_date):
-    db = get_opened_db()
-    try:
-        query = QSqlQuery(db)
-        query.prepare("CALL register(:username, :email, :birth_date, @result_msg, @password)")
-        query.bindValue(":username", username)
-        query.bindValue(":email", email)
-        query.bindValue(":birth_date", birth_date)
-        if not query.exec():
-            process_error(query)
-        if not query.exec("SELECT @result_msg, @password"):
-            process_error(query)
-        if not query.next():
-            process_error(query)
-        else:
-            return RegisterResult(query.value(0)), query.value(1)
-    finally:
-        db.close()
+    result_msg, password = _call_returning_row("CALL register_rs(:username, :email, :birth_date)",
+                                               username=username, email=email, birth_date=birth_date)
+    return RegisterResult(result_msg), password
 
 
 def log_in(username_or_email, password):
-    db = get_opened_db()
-    try:
-        query = QSqlQuery(db)
-        query.prepare("CALL log_in(:username_or_email, :password, @session_key)")
-        query.bindValue(":username_or_email", username_or_email)
-        query.bindValue(":password", password)
-        if not query.exec():
-            process_error(query)
-        if not query.exec("SELECT @session_key"):
-            process_error(query)
-        if not query.next():
-            process_error(query)
-        else:
-            return query.value(0)
-    finally:
-        db.close()
+    session_key, = _call_returning_row("CALL log_in_rs(:username_or_email, :password)",
+                                       username_or_email=username_or_email, password=password)
+    return session_key
 
 
 def log_out(session_key):
-    db = get_opened_db()
-    try:
-        query = QSqlQuery(db)
-        query.prepare("CALL log_out(:session_key)")
-        query.bindValue(":session_key", session_key)
-        if not query.exec():
-            process_error(query)
-    finally:
-        db.close()
+    with call_span("log_out") as span, cached_statement("CALL log_out(:session_key)") as statement:
+        statement.bind_value(":session_key", session_key)
+        _exec(statement, span)
 
 
 def get_user_info(session_key):
-    db = get_opened_db()
-    try:
-        query = QSqlQuery(db)
-        query.prepare("CALL get_user_info(:session_key, @username, @email)")
-        query.bindValue(":session_key", session_key)
-        if not query.exec():
-            process_error(query)
-        if not query.exec("SELECT @username, @email"):
-            process_error(query)
-        if not query.next():
-            process_error(query)
-        else:
-            return query.value(0), query.value(1)
-    finally:
-        db.close()
+    username, email = _call_returning_row("CALL get_user_info_rs(:session_key)", session_key=session_key)
+    return username, email
 
 
-def get_all_contacts(session_key):
-    db = get_opened_db()
-    try:
-        query = QSqlQuery(db)
-        query.prepare("CALL get_all_contacts(:session_key)")
-        query.bindValue(":session_key", session_key)
-        if not query.exec():
-            process_error(query)
-        if not query.next():
-            process_error(query)
-    finally:
-        db.close()
+# Procedures below act on behalf of the user of the session bound with `bind_session()`
 
 
-def get_contacts(session_key, letter_set, exclude):
-    db = get_opened_db()
-    try:
-        query = QSqlQuery(db)
-        query.prepare("CALL get_contacts(:session_key, :letter_set, :exclude)")
-        query.bindValue(":session_key", session_key)
-        query.bindValue(":letter_set", letter_set)
-        query.bindValue(":exclude", exclude)
-        if not query.exec():
-            process_error(query)
-        if not query.next():
-            process_error(query)
-    finally:
-        db.close()
+def get_all_contacts() -> List[List]:
+    return _call_returning_rows("CALL get_all_contacts()")
+
+
+def get_contacts(bucket) -> List[List]:
+    """get contacts of a page (see `contacts.name_bucket` of the database)"""
+    return _call_returning_rows("CALL get_contacts(:bucket)", bucket=bucket)
+
+
+def count_contacts() -> int:
+    count, = _call_returning_row("CALL count_contacts()")
+    return int(count)
+
+
+def get_contacts_page(bucket, after_name=None, after_id=None, limit=500) -> List[List]:
+    """get contacts of a page (see `contacts.name_bucket` of the database) going after the given one or the first"""
+    return _call_returning_rows("CALL get_contacts_page(:bucket, :after_name, :after_id, :page_limit)",
+                                bucket=bucket, after_name=after_name, after_id=after_id, page_limit=limit)
+
+
+def get_contacts_page_before(bucket, before_name, before_id, limit=500) -> List[List]:
+    return _call_returning_rows("CALL get_contacts_page_before(:bucket, :before_name, :before_id, :page_limit)",
+                                bucket=bucket, before_name=before_name, before_id=before_id, page_limit=limit)
+
+
+def get_contacts_chunk(after_name=None, after_id=None, limit=5000) -> List[List]:
+    """get contacts of all pages in (name, id) order going after the given one or the first"""
+    return _call_returning_rows("CALL get_contacts_chunk(:after_name, :after_id, :chunk_size)",
+                                after_name=after_name, after_id=after_id, chunk_size=limit)
+
+
+def search_contacts(query, limit=50) -> List[List]:
+    """get contacts whose names start with the query ignoring case & "ё" vs "е", exact matches first"""
+    return _call_returning_rows("CALL search_contacts(:query, :result_limit)", query=query, result_limit=limit)
+
+
+def lookup_by_phone(number, limit=50) -> List[List]:
+    """get contacts having a number starting with the given one if it starts with "+" or ending with its digits
+
+    A whole number is to be normalized (see `get_phone_number_lookup_key()` of `phone_book.input_validation`).
+    """
+    return _call_returning_rows("CALL lookup_by_phone(:number, :result_limit)", number=number, result_limit=limit)
+
+
+def get_contacts_changed_since(row_version) -> List[List]:
+    """get rows (id, name, phone number, birth date, row version, is deleted) of contacts changed after the version;
+    name, phone number & birth date of deleted contacts are None"""
+    rows = _call_returning_rows("CALL get_contacts_changed_since(:row_version)", row_version=row_version)
+    for row in rows:
+        row[4], row[5] = int(row[4]), bool(row[5])
+    return rows
 
 
 class AddContactResult(Enum):
@@ -139,29 +169,22 @@ class AddContactResult(Enum):
     CONTACT_EXISTS = "contact_already_exists"
 
 
-def _add_contact(session_key, name, phone_number, birth_date) -> Tuple[AddContactResult, Optional[int]]:
-    db = get_opened_db()
-    try:
-        query = QSqlQuery(db)
-        query.prepare("CALL add_contact(:session_key, :name, :phone_number, :birth_date, @result_msg, @contact_id)")
-        query.bindValue(":session_key", session_key)
-        query.bindValue(":name", name)
-        query.bindValue(":phone_number", phone_number)
-        query.bindValue(":birth_date", birth_date)
-        if not query.exec():
-            process_error(query)
-        if not query.exec("SELECT @result_msg, @contact_id"):
-            process_error(query)
-        if not query.next():
-            process_error(query)
-        else:
-            result_type = AddContactResult(query.value(0))
-            contact_id = query.value(1)
-            if contact_id is not None:
-                contact_id = int(contact_id)
-            return result_type, contact_id
-    finally:
-        db.close()
+def _add_contact(name, phone_number, birth_date) -> Tuple[AddContactResult, Optional[int]]:
+    result_msg, contact_id = _call_returning_row("CALL add_contact_rs(:name, :phone_number, :birth_date)",
+                                                 name=name, phone_number=phone_number, birth_date=birth_date)
+    if contact_id is not None:
+        contact_id = int(contact_id)
+    return AddContactResult(result_msg), contact_id
+
+
+def add_contacts(contacts: List[Tuple[str, str, str]]) -> Tuple[AddContactResult, int]:
+    """add (name, phone number, ISO birth date) contacts at once skipping existing ones; get the number added
+
+    Contacts are not checked by the server, so they have to be validated like the contact form does.
+    """
+    result_msg, added_count = _call_returning_row("CALL add_contacts(:contacts_json)",
+                                                  contacts_json=json.dumps(contacts, ensure_ascii=False))
+    return AddContactResult(result_msg), int(added_count)
 
 
 class EditContactResult(Enum):
@@ -173,32 +196,27 @@ class EditContactResult(Enum):
     SAME_DATA_CONTACT_EXISTS = "same_data_contact_already_exists"
 
 
-def _edit_contact(session_key, contact_id, name, phone_number, birth_date) -> Tuple[EditContactResult, Optional[int]]:
-    db = get_opened_db()
-    try:
-        query = QSqlQuery(db)
-        query.prepare(
-            "CALL edit_contact(:session_key, :contact_id, :name, :phone_number, :birth_date, "
-            "@result_msg, @same_data_contact_id)")
-        query.bindValue(":session_key", session_key)
-        query.bindValue(":contact_id", contact_id)
-        query.bindValue(":name", name)
-        query.bindValue(":phone_number", phone_number)
-        query.bindValue(":birth_date", birth_date)
-        if not query.exec():
-            process_error(query)
-        if not query.exec("SELECT @result_msg, @same_data_contact_id"):
-            process_error(query)
-        if not query.next():
-            process_error(query)
-        else:
-            result_type = EditContactResult(query.value(0))
-            same_data_contact_id = query.value(1)
-            if same_data_contact_id is not None:
-                same_data_contact_id = int(same_data_contact_id)
-            return result_type, same_data_contact_id
-    finally:
-        db.close()
+def _edit_contact(contact_id, name, phone_number, birth_date) -> Tuple[EditContactResult, Optional[int]]:
+    result_msg, same_data_contact_id = _call_returning_row(
+        "CALL edit_contact_rs(:contact_id, :name, :phone_number, :birth_date)",
+        contact_id=contact_id, name=name, phone_number=phone_number, birth_date=birth_date)
+    if same_data_contact_id is not None:
+        same_data_contact_id = int(same_data_contact_id)
+    return EditContactResult(result_msg), same_data_contact_id
+
+
+def edit_contacts(contacts: List[Tuple[int, str, str, str]]) -> Dict[int, Tuple[EditContactResult, Optional[int]]]:
+    """edit (id, name, phone number, ISO birth date) contacts in a single transaction; get a result per id
+
+    A contact can't get the same data as another one, including one edited by the same call.
+    """
+    rows = _call_returning_rows("CALL edit_contacts(:contacts_json)",
+                                contacts_json=json.dumps(contacts, ensure_ascii=False))
+    if len(rows) == 1 and rows[0][0] is None:
+        return {contact[0]: (EditContactResult(rows[0][1]), None) for contact in contacts}
+    return {int(contact_id): (EditContactResult(result_msg),
+                              None if same_data_contact_id is None else int(same_data_contact_id))
+            for contact_id, result_msg, same_data_contact_id in rows}
 
 
 class DeleteContactResult(Enum):
@@ -209,23 +227,48 @@ class DeleteContactResult(Enum):
     NO_AUTHORITY_TO_DELETE_CONTACT = "no_authority_to_delete_given_contact"
 
 
-def _delete_contact(session_key, contact_id) -> DeleteContactResult:
-    db = get_opened_db()
-    try:
-        query = QSqlQuery(db)
-        query.prepare("CALL delete_contact(:session_key, :contact_id, @result_msg)")
-        query.bindValue(":session_key", session_key)
-        query.bindValue(":contact_id", contact_id)
-        if not query.exec():
-            process_error(query)
-        if not query.exec("SELECT @result_msg"):
-            process_error(query)
-        if not query.next():
-            process_error(query)
-        else:
-            return DeleteContactResult(query.value(0))
-    finally:
-        db.close()
+def _delete_contact(contact_id) -> DeleteContactResult:
+    result_msg, = _call_returning_row("CALL delete_contact_rs(:contact_id)", contact_id=contact_id)
+    return DeleteContactResult(result_msg)
+
+
+def delete_contacts(contact_ids: List[int]) -> Dict[int, DeleteContactResult]:
+    """delete contacts in a single transaction; get a result per id"""
+    rows = _call_returning_rows("CALL delete_contacts(:contact_ids_json)", contact_ids_json=json.dumps(contact_ids))
+    if len(rows) == 1 and rows[0][0] is None:
+        return dict.fromkeys(contact_ids, DeleteContactResult(rows[0][1]))
+    return {int(contact_id): DeleteContactResult(result_msg) for contact_id, result_msg in rows}
+
+
+class MergeContactsResult(Enum):
+    SUCCESS = "merged_successfully"
+    UNKNOWN_ERROR = "unknown_error"
+    INVALID_SESSION = "invalid_session_key"
+    CONTACT_DOESNT_EXIST = "given_contact_doesnt_exist"
+    NO_AUTHORITY_TO_EDIT_CONTACT = "no_authority_to_edit_given_contact"
+    SAME_DATA_CONTACT_EXISTS = "same_data_contact_already_exists"
+
+
+def merge_contacts(merges: List[Tuple[int, List[int], str, str, str]]
+                   ) -> Dict[int, Tuple[MergeContactsResult, Optional[int]]]:
+    """merge contacts in a single transaction; get a result per kept contact id
+
+    A merge is (kept id, merged ids, name, phone number, ISO birth date): the kept contact gets the data & the merged
+    ones are deleted. Merges are not to share contacts. A merge given the data of an earlier one is not done, its
+    result is `SAME_DATA_CONTACT_EXISTS` with the earlier merge's kept id.
+    """
+    rows = _call_returning_rows("CALL merge_contacts(:merges_json)",
+                                merges_json=json.dumps(merges, ensure_ascii=False))
+    if len(rows) == 1 and rows[0][0] is None:
+        return {merge[0]: (MergeContactsResult(rows[0][1]), None) for merge in merges}
+    return {int(contact_id): (MergeContactsResult(result_msg),
+                              None if same_data_contact_id is None else int(same_data_contact_id))
+            for contact_id, result_msg, same_data_contact_id in rows}
+
+
+def get_contacts_having_birthday_in_range(days) -> List[List]:
+    """get contacts whose birthday is today or in the next `days` - 1 days, the nearest first"""
+    return _call_returning_rows("CALL get_contacts_having_birthday_in_range(:days)", days=days)
 
 
 class ContactData(NamedTuple):
@@ -234,50 +277,722 @@ class ContactData(NamedTuple):
     birth_date: QDate
 
 
-class ContactsPageReadWriteModel(QSqlQueryModel):
+class ContactsTableModel(QAbstractTableModel):
+    # Rows are copied out of a result set so that no result is left pending on the shared connection
     class Columns(Enum):
         primary_key = 0
         name = 1
         phone_number = 2
         birth_date = 3
 
-    def __init__(self, letter_set, exclude=False, parent=None):
+    headers = ("id", "Имя", "Телефон", "Дата рождения")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows: List[List] = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        return self._rows[index.row()][index.column()]
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def get_row(self, row_idx: int) -> List:
+        return self._rows[row_idx]
+
+    def set_rows(self, rows: List[List]):
+        self.beginResetModel()
+        self._rows = rows
+        self.endResetModel()
+
+    def clear(self):
+        self.set_rows([])
+
+
+class ContactsReadWriteModel(ContactsTableModel):
+    # All user's contacts fetched at once; contacts pages are just filters over this single snapshot.
+    # Successful mutations are applied to the snapshot in place, it is re-fetched only when it turns out to be stale
+    _resync_edit_results = (EditContactResult.CONTACT_DOESNT_EXIST, EditContactResult.NO_AUTHORITY_TO_EDIT_CONTACT,
+                            EditContactResult.UNKNOWN_ERROR)
+    _resync_delete_results = (DeleteContactResult.CONTACT_DOESNT_EXIST,
+                              DeleteContactResult.NO_AUTHORITY_TO_DELETE_CONTACT, DeleteContactResult.UNKNOWN_ERROR)
+    in_place_changes_limit = 100
+
+    @classmethod
+    def fetch_rows(cls) -> List[List]:
+        rows = get_all_contacts()
+        # the server's collation order may slightly differ from the one of `_sort_key()` used for in place inserts
+        rows.sort(key=cls._sort_key)
+        return rows
+
+    def refresh(self):
+        with call_span("ContactsReadWriteModel.refresh") as span:
+            self.set_rows(self.fetch_rows())
+            if span is not None:
+                span.rows = len(self._rows)
+
+    def set_unsorted_rows(self, rows: List[List]):
+        rows.sort(key=self._sort_key)
+        self.set_rows(rows)
+
+    def refresh_async(self, on_success: Optional[Callable] = None,
+                      on_error: Optional[Callable[[Exception], None]] = None) -> Future:
+        def on_fetched(rows):
+            self.set_rows(rows)
+            if on_success is not None:
+                on_success(rows)
+
+        on_fetched, on_error = traced_callbacks("ContactsReadWriteModel.refresh", on_fetched, on_error)
+        return run_async(self.fetch_rows, on_success=on_fetched, on_error=on_error)
+
+    def _resync_async(self):
+        self.refresh_async(on_error=lambda exc: logger.warning("Can't re-fetch contacts: %s", exc))
+
+    def apply_changes(self, changes: List[List]):
+        """apply rows of `get_contacts_changed_since()`; a lot of them are applied by resetting the model"""
+        primary_key = self.Columns.primary_key.value
+        rows_by_id = {row[primary_key]: row for row in self._rows}
+        is_in_place = len(changes) <= self.in_place_changes_limit
+        for contact_id, name, phone_number, birth_date, _, is_deleted in changes:
+            row = rows_by_id.get(contact_id)
+            if row is not None and not is_deleted and row[1:] == [name, phone_number, birth_date]:
+                continue  # e.g. the change has been made by this client & applied in place already
+            rows_by_id.pop(contact_id, None)
+            if row is not None and is_in_place:
+                self._remove_row(row)
+            if not is_deleted:
+                row = rows_by_id[contact_id] = [contact_id, name, phone_number, birth_date]
+                if is_in_place:
+                    self._insert_row(row)
+        if not is_in_place:
+            self.set_rows(sorted(rows_by_id.values(), key=self._sort_key))
+
+    @classmethod
+    def _sort_key(cls, row: List):
+        # "ё" is sorted as "е" just like utf8mb4_unicode_ci does
+        return row[cls.Columns.name.value].casefold().replace("ё", "е"), row[cls.Columns.primary_key.value]
+
+    def _bisect(self, row: List) -> int:
+        key = self._sort_key(row)
+        low, high = 0, len(self._rows)
+        while low < high:
+            middle = (low + high) // 2
+            if self._sort_key(self._rows[middle]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _insert_row(self, row: List):
+        row_idx = self._bisect(row)
+        primary_key = self.Columns.primary_key.value
+        if row_idx < len(self._rows) and self._rows[row_idx][primary_key] == row[primary_key]:
+            # the snapshot has been re-fetched with this row already while the change was being made
+            self._rows[row_idx] = row
+            self.dataChanged.emit(self.index(row_idx, 0), self.index(row_idx, self.columnCount() - 1))
+            return
+        self.beginInsertRows(QModelIndex(), row_idx, row_idx)
+        self._rows.insert(row_idx, row)
+        self.endInsertRows()
+
+    def _remove_row(self, row: List):
+        """remove the row of `row`'s contact, even if the snapshot has been re-fetched since `row` was taken"""
+        primary_key = self.Columns.primary_key.value
+        contact_id = row[primary_key]
+        row_idx = self._bisect(row)
+        if row_idx == len(self._rows) or self._rows[row_idx][primary_key] != contact_id:
+            # a re-fetched snapshot may have the contact with other data, i.e. at another position
+            row_idx = next((idx for idx, other in enumerate(self._rows) if other[primary_key] == contact_id), None)
+            if row_idx is None:
+                return
+        self.beginRemoveRows(QModelIndex(), row_idx, row_idx)
+        del self._rows[row_idx]
+        self.endRemoveRows()
+
+    def _contains_contact(self, contact_id) -> bool:
+        return any(row[self.Columns.primary_key.value] == contact_id for row in self._rows)
+
+    def get_first_letter(self, row_idx: int) -> str:
+        return self._rows[row_idx][self.Columns.name.value][:1].upper()
+
+    def get_contact_data(self, row_idx: int) -> ContactData:
+        return ContactData(self.data(self.index(row_idx, self.Columns.name.value), role=Qt.EditRole),
+                           self.data(self.index(row_idx, self.Columns.phone_number.value), role=Qt.EditRole),
+                           self.data(self.index(row_idx, self.Columns.birth_date.value), role=Qt.EditRole))
+
+    @staticmethod
+    def _make_row(contact_id, name, phone_number, birth_date) -> List:
+        return [contact_id, name, phone_number, QDate.fromString(birth_date, "yyyy.MM.dd")]
+
+    def _apply_add_result(self, result: Tuple[AddContactResult, Optional[int]], row: List, resync: Callable):
+        res_code, contact_id = result
+        if res_code is AddContactResult.SUCCESS:
+            row[self.Columns.primary_key.value] = contact_id
+            self._insert_row(row)
+        elif res_code is AddContactResult.CONTACT_EXISTS:
+            if not self._contains_contact(contact_id):
+                resync()
+        elif res_code is AddContactResult.UNKNOWN_ERROR:
+            resync()
+
+    def _apply_edit_result(self, result: Tuple[EditContactResult, Optional[int]], old_row: List, new_row: List,
+                           resync: Callable):
+        res_code, same_data_contact_id = result
+        if res_code is EditContactResult.SUCCESS:
+            # the row is reinserted as the new name may change its position & even its page
+            self._remove_row(old_row)
+            self._insert_row(new_row)
+        elif res_code is EditContactResult.SAME_DATA_CONTACT_EXISTS:
+            if not self._contains_contact(same_data_contact_id):
+                resync()
+        elif res_code in self._resync_edit_results:
+            resync()
+
+    def _apply_delete_result(self, res_code: DeleteContactResult, row: List, resync: Callable):
+        if res_code is DeleteContactResult.SUCCESS:
+            self._remove_row(row)
+        elif res_code in self._resync_delete_results:
+            resync()
+
+    def _apply_edit_results(self, results: Dict[int, Tuple[EditContactResult, Optional[int]]], old_rows: List[List],
+                            new_rows: List[List], resync: Callable):
+        is_stale = []
+        for old_row, new_row in zip(old_rows, new_rows):
+            self._apply_edit_result(results[old_row[self.Columns.primary_key.value]], old_row, new_row,
+                                    partial(is_stale.append, True))
+        if is_stale:
+            resync()
+
+    def _apply_delete_results(self, results: Dict[int, DeleteContactResult], rows: List[List], resync: Callable):
+        primary_key = self.Columns.primary_key.value
+        if len(rows) <= self.in_place_changes_limit:
+            for row in rows:
+                self._apply_delete_result(results[row[primary_key]], row, lambda: None)
+        else:
+            deleted_ids = {contact_id for contact_id, res_code in results.items()
+                           if res_code is DeleteContactResult.SUCCESS}
+            self.set_rows([row for row in self._rows if row[primary_key] not in deleted_ids])
+        if any(res_code in self._resync_delete_results for res_code in results.values()):
+            resync()
+
+    def add_contact(self, name, phone_number, birth_date):
+        result = _add_contact(name, phone_number, birth_date)
+        self._apply_add_result(result, self._make_row(None, name, phone_number, birth_date), self.refresh)
+        return result
+
+    def add_contact_async(self, name, phone_number, birth_date, on_success: Optional[Callable] = None,
+                          on_error: Optional[Callable[[Exception], None]] = None) -> Future:
+        row = self._make_row(None, name, phone_number, birth_date)
+
+        def on_added(result):
+            self._apply_add_result(result, row, self._resync_async)
+            if on_success is not None:
+                on_success(result)
+
+        return _add_contact_async(name, phone_number, birth_date, on_success=on_added, on_error=on_error)
+
+    def edit_contact(self, row_idx, name, phone_number, birth_date):
+        row = self._rows[row_idx]
+        contact_id = row[self.Columns.primary_key.value]
+        result = _edit_contact(contact_id, name, phone_number, birth_date)
+        self._apply_edit_result(result, row, self._make_row(contact_id, name, phone_number, birth_date),
+                                self.refresh)
+        return result
+
+    def edit_contact_async(self, row_idx, name, phone_number, birth_date, on_success: Optional[Callable] = None,
+                           on_error: Optional[Callable[[Exception], None]] = None) -> Future:
+        row = self._rows[row_idx]
+        contact_id = row[self.Columns.primary_key.value]
+
+        def on_edited(result):
+            self._apply_edit_result(result, row, self._make_row(contact_id, name, phone_number, birth_date),
+                                    self._resync_async)
+            if on_success is not None:
+                on_success(result)
+
+        return _edit_contact_async(contact_id, name, phone_number, birth_date, on_success=on_edited,
+                                   on_error=on_error)
+
+    def delete_contact(self, row_idx):
+        row = self._rows[row_idx]
+        res_code = _delete_contact(row[self.Columns.primary_key.value])
+        self._apply_delete_result(res_code, row, self.refresh)
+        return res_code
+
+    def delete_contact_async(self, row_idx, on_success: Optional[Callable] = None,
+                             on_error: Optional[Callable[[Exception], None]] = None) -> Future:
+        row = self._rows[row_idx]
+
+        def on_deleted(res_code):
+            self._apply_delete_result(res_code, row, self._resync_async)
+            if on_success is not None:
+                on_success(res_code)
+
+        return _delete_contact_async(row[self.Columns.primary_key.value], on_success=on_deleted, on_error=on_error)
+
+    def _make_edited_rows(self, old_rows: List[List], contacts: List[Tuple[str, str, str]]) -> List[List]:
+        return [self._make_row(row[self.Columns.primary_key.value], name, phone_number, birth_date)
+                for row, (name, phone_number, birth_date) in zip(old_rows, contacts)]
+
+    def edit_contacts(self, row_idxs: List[int], contacts: List[Tuple[str, str, str]]):
+        """edit contacts of the rows with (name, phone number, birth date) of the same order at once"""
+        old_rows = [self._rows[row_idx] for row_idx in row_idxs]
+        new_rows = self._make_edited_rows(old_rows, contacts)
+        results = edit_contacts(_edited_contacts_values(new_rows))
+        self._apply_edit_results(results, old_rows, new_rows, self.refresh)
+        return results
+
+    def edit_contacts_async(self, row_idxs: List[int], contacts: List[Tuple[str, str, str]],
+                            on_success: Optional[Callable] = None,
+                            on_error: Optional[Callable[[Exception], None]] = None) -> Future:
+        old_rows = [self._rows[row_idx] for row_idx in row_idxs]
+        new_rows = self._make_edited_rows(old_rows, contacts)
+
+        def on_edited(results):
+            self._apply_edit_results(results, old_rows, new_rows, self._resync_async)
+            if on_success is not None:
+                on_success(results)
+
+        return edit_contacts_async(_edited_contacts_values(new_rows), on_success=on_edited, on_error=on_error)
+
+    def delete_contacts(self, row_idxs: List[int]):
+        rows = [self._rows[row_idx] for row_idx in row_idxs]
+        results = delete_contacts([row[self.Columns.primary_key.value] for row in rows])
+        self._apply_delete_results(results, rows, self.refresh)
+        return results
+
+    def delete_contacts_async(self, row_idxs: List[int], on_success: Optional[Callable] = None,
+                              on_error: Optional[Callable[[Exception], None]] = None) -> Future:
+        rows = [self._rows[row_idx] for row_idx in row_idxs]
+
+        def on_deleted(results):
+            self._apply_delete_results(results, rows, self._resync_async)
+            if on_success is not None:
+                on_success(results)
+
+        return delete_contacts_async([row[self.Columns.primary_key.value] for row in rows], on_success=on_deleted,
+                                     on_error=on_error)
+
+
+def _edited_contacts_values(rows: List[List]) -> List[Tuple[int, str, str, str]]:
+    return [(contact_id, name, phone_number, birth_date.toString("yyyy-MM-dd"))
+            for contact_id, name, phone_number, birth_date in rows]
+
+
+class ContactsPageReadWriteModel(QSortFilterProxyModel):
+    Columns = ContactsTableModel.Columns
+
+    def __init__(self, source_model: ContactsReadWriteModel, letter_set, exclude=False, parent=None):
         super().__init__(parent)
-        self.letter_set = letter_set
+        self.letter_set = letter_set.upper()
         self.exclude = exclude
+        self.setSourceModel(source_model)
 
-    def refresh(self, session_key):
-        query = QSqlQuery(get_opened_db())
-        # Have to manually format a string for exec()
-        # because using prepare(), bindValue() or addBindValue(), exec()
-        # with CALL that should return a SELECT result set doesn't work properly:
-        # query.isSelect() returns False and query.size() returns -1
-        if not query.exec("CALL get_contacts('{}', '{}', {})".format(session_key, self.letter_set, self.exclude)):
-            process_error(query)
-        self.setQuery(query)
-        for idx, value in enumerate(["Имя", "Телефон", "Дата рождения"], 1):
-            self.setHeaderData(idx, Qt.Horizontal, value)
+    def filterAcceptsRow(self, source_row, source_parent):
+        first_letter = self.sourceModel().get_first_letter(source_row)
+        return (bool(first_letter) and first_letter in self.letter_set) != self.exclude
+
+    def _get_source_row_idx(self, row_idx: int) -> int:
+        return self.mapToSource(self.index(row_idx, 0)).row()
+
+    def get_contact_data(self, row_idx: int) -> ContactData:
+        return self.sourceModel().get_contact_data(self._get_source_row_idx(row_idx))
+
+    def add_contact(self, name, phone_number, birth_date):
+        return self.sourceModel().add_contact(name, phone_number, birth_date)
+
+    def add_contact_async(self, name, phone_number, birth_date, **callbacks) -> Future:
+        return self.sourceModel().add_contact_async(name, phone_number, birth_date, **callbacks)
+
+    def edit_contact(self, row_idx, name, phone_number, birth_date):
+        return self.sourceModel().edit_contact(self._get_source_row_idx(row_idx), name, phone_number, birth_date)
+
+    def edit_contact_async(self, row_idx, name, phone_number, birth_date, **callbacks) -> Future:
+        return self.sourceModel().edit_contact_async(self._get_source_row_idx(row_idx), name, phone_number,
+                                                     birth_date, **callbacks)
+
+    def delete_contact(self, row_idx):
+        return self.sourceModel().delete_contact(self._get_source_row_idx(row_idx))
+
+    def delete_contact_async(self, row_idx, **callbacks) -> Future:
+        return self.sourceModel().delete_contact_async(self._get_source_row_idx(row_idx), **callbacks)
+
+    def edit_contacts(self, row_idxs: List[int], contacts: List[Tuple[str, str, str]]):
+        return self.sourceModel().edit_contacts([self._get_source_row_idx(row_idx) for row_idx in row_idxs], contacts)
+
+    def edit_contacts_async(self, row_idxs: List[int], contacts: List[Tuple[str, str, str]], **callbacks) -> Future:
+        return self.sourceModel().edit_contacts_async([self._get_source_row_idx(row_idx) for row_idx in row_idxs],
+                                                      contacts, **callbacks)
+
+    def delete_contacts(self, row_idxs: List[int]):
+        return self.sourceModel().delete_contacts([self._get_source_row_idx(row_idx) for row_idx in row_idxs])
+
+    def delete_contacts_async(self, row_idxs: List[int], **callbacks) -> Future:
+        return self.sourceModel().delete_contacts_async([self._get_source_row_idx(row_idx) for row_idx in row_idxs],
+                                                        **callbacks)
+
+
+class ContactsBucketModel(ContactsTableModel):
+    """a window of a contacts page loaded page by page as a view is scrolled in either direction
+
+    Rows go in the server's (name, id) order, so keyset cursors are just the first & the last rows fetched from it.
+    Rows inserted by the client are placed with its own collation which may slightly differ from the server's one,
+    so they are never taken as cursors & are replaced with their server's copies once those are fetched.
+    At most `window_size` rows are kept: rows on the opposite side are dropped when a new page is loaded.
+    """
+    window_shifted = pyqtSignal(int)  # rows inserted (> 0) or removed (< 0) at the top
+
+    def __init__(self, group: "ContactsBucketModels", bucket: int, page_size=500, window_size=5000, parent=None):
+        super().__init__(parent)
+        self.group = group
+        self.bucket = bucket
+        self.page_size = page_size
+        self.window_size = window_size
+        self._is_head_loaded = True
+        self._is_tail_loaded = True
+        self._is_fetching = False
+        self._generation = 0  # results of fetches started before the last reset are stale
+        self._local_ids: Set[int] = set()  # contacts inserted by the client rather than fetched
+
+    def reset(self):
+        self._generation += 1
+        self._local_ids.clear()
+        self._is_head_loaded = True
+        self._is_tail_loaded = not self.group.is_active
+        self._is_fetching = False
+        self.set_rows([])
+
+    def set_first_page(self, rows: List[List]):
+        """show the first page fetched beforehand, e.g. at startup, instead of fetching it"""
+        self.reset()
+        self._on_tail_fetched(self._generation, rows)
+
+    def _cursor(self, row: Optional[List]) -> dict:
+        if row is None:
+            return {"name": None, "id": None}
+        return {"name": row[self.Columns.name.value], "id": row[self.Columns.primary_key.value]}
+
+    def _fetched_row(self, from_end: bool) -> Optional[List]:
+        """the first or the last row fetched from the server"""
+        primary_key = self.Columns.primary_key.value
+        rows = reversed(self._rows) if from_end else iter(self._rows)
+        return next((row for row in rows if row[primary_key] not in self._local_ids), None)
+
+    def _drop_local_copies(self, rows: List[List]):
+        if not self._local_ids:
+            return
+        for row in rows:
+            if row[self.Columns.primary_key.value] in self._local_ids:
+                self._remove_contact(row[self.Columns.primary_key.value])
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._is_tail_loaded and not self._is_fetching
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        self._is_fetching = True
+        after = self._cursor(self._fetched_row(from_end=True))
+        on_success, on_error = traced_callbacks("ContactsBucketModel.fetchMore",
+                                                partial(self._on_tail_fetched, self._generation),
+                                                partial(self._on_fetch_failed, self._generation))
+        get_contacts_page_async(self.bucket, after["name"], after["id"], self.page_size, on_success=on_success,
+                                on_error=on_error)
+
+    def can_fetch_previous(self) -> bool:
+        return not self._is_head_loaded and not self._is_fetching
+
+    def fetch_previous(self):
+        row = self._fetched_row(from_end=False)
+        if not self.can_fetch_previous() or row is None:
+            return
+        self._is_fetching = True
+        before = self._cursor(row)
+        on_success, on_error = traced_callbacks("ContactsBucketModel.fetch_previous",
+                                                partial(self._on_head_fetched, self._generation),
+                                                partial(self._on_fetch_failed, self._generation))
+        get_contacts_page_before_async(self.bucket, before["name"], before["id"], self.page_size,
+                                       on_success=on_success, on_error=on_error)
+
+    def _on_tail_fetched(self, generation, rows: List[List]):
+        if generation != self._generation:
+            return
+        self._is_fetching = False
+        self._is_tail_loaded = len(rows) < self.page_size
+        self._drop_local_copies(rows)
+        if rows:
+            self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(rows) - 1)
+            self._rows.extend(rows)
+            self.endInsertRows()
+        excess = len(self._rows) - self.window_size
+        if excess > 0:
+            self.beginRemoveRows(QModelIndex(), 0, excess - 1)
+            del self._rows[:excess]
+            self.endRemoveRows()
+            self._is_head_loaded = False
+            self.window_shifted.emit(-excess)
+
+    def _on_head_fetched(self, generation, rows: List[List]):
+        if generation != self._generation:
+            return
+        self._is_fetching = False
+        self._is_head_loaded = len(rows) < self.page_size
+        self._drop_local_copies(rows)
+        if rows:
+            self.beginInsertRows(QModelIndex(), 0, len(rows) - 1)
+            self._rows[:0] = rows
+            self.endInsertRows()
+            self.window_shifted.emit(len(rows))
+        excess = len(self._rows) - self.window_size
+        if excess > 0:
+            self.beginRemoveRows(QModelIndex(), len(self._rows) - excess, len(self._rows) - 1)
+            del self._rows[-excess:]
+            self.endRemoveRows()
+            self._is_tail_loaded = False
+
+    def _on_fetch_failed(self, generation, exc: Exception):
+        if generation != self._generation:
+            return
+        self._is_fetching = False
+        self.group.fetch_failed.emit(exc)
+
+    def _row_idx_of(self, contact_id) -> Optional[int]:
+        for row_idx, row in enumerate(self._rows):
+            if row[self.Columns.primary_key.value] == contact_id:
+                return row_idx
+        return None
+
+    def _insert_row(self, row: List):
+        """insert a row if it falls within the loaded window; the position is found with the client's collation"""
+        key = ContactsReadWriteModel._sort_key(row)
+        if not self._is_head_loaded and key < ContactsReadWriteModel._sort_key(self._rows[0]):
+            return
+        # the row will be fetched with the rest if it goes after the loaded ones
+        if not self._is_tail_loaded and (not self._rows or key > ContactsReadWriteModel._sort_key(self._rows[-1])):
+            return
+        row_idx = 0
+        while row_idx < len(self._rows) and ContactsReadWriteModel._sort_key(self._rows[row_idx]) < key:
+            row_idx += 1
+        self.beginInsertRows(QModelIndex(), row_idx, row_idx)
+        self._rows.insert(row_idx, row)
+        self.endInsertRows()
+        self._local_ids.add(row[self.Columns.primary_key.value])
+
+    def _remove_contact(self, contact_id):
+        self._local_ids.discard(contact_id)
+        row_idx = self._row_idx_of(contact_id)
+        if row_idx is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row_idx, row_idx)
+        del self._rows[row_idx]
+        self.endRemoveRows()
 
     def get_contact_data(self, row_idx: int) -> ContactData:
         return ContactData(self.data(self.index(row_idx, self.Columns.name.value), role=Qt.EditRole),
                            self.data(self.index(row_idx, self.Columns.phone_number.value), role=Qt.EditRole),
                            self.data(self.index(row_idx, self.Columns.birth_date.value), role=Qt.EditRole))
 
-    def add_contact(self, session_key, name, phone_number, birth_date):
-        return _add_contact(session_key, name, phone_number, birth_date)
+    def add_contact_async(self, name, phone_number, birth_date, **callbacks) -> Future:
+        return self.group.add_contact_async(name, phone_number, birth_date, **callbacks)
+
+    def edit_contact_async(self, row_idx, name, phone_number, birth_date, **callbacks) -> Future:
+        return self.group.edit_contact_async(self._rows[row_idx][self.Columns.primary_key.value],
+                                             name, phone_number, birth_date, **callbacks)
+
+    def delete_contact_async(self, row_idx, **callbacks) -> Future:
+        return self.group.delete_contact_async(self._rows[row_idx][self.Columns.primary_key.value], **callbacks)
+
+    def edit_contacts_async(self, row_idxs: List[int], contacts: List[Tuple[str, str, str]], **callbacks) -> Future:
+        return self.group.edit_contacts_async([self._rows[row_idx][self.Columns.primary_key.value]
+                                               for row_idx in row_idxs], contacts, **callbacks)
+
+    def delete_contacts_async(self, row_idxs: List[int], **callbacks) -> Future:
+        return self.group.delete_contacts_async([self._rows[row_idx][self.Columns.primary_key.value]
+                                                 for row_idx in row_idxs], **callbacks)
+
+
+class ContactsBucketModels(QObject):
+    """lazily fetched contacts pages for address books too large to be loaded at once
+
+    Bucket numbers are the ones of `contacts.name_bucket` of the database:
+    1-based indexes of letter sets and 0 for the rest names.
+    """
+    fetch_failed = pyqtSignal(object)
+
+    def __init__(self, letter_sets, page_size=500, window_size=5000, parent=None):
+        super().__init__(parent)
+        self.letter_sets = tuple(letter_set.upper() for letter_set in letter_sets)
+        self.is_active = False  # i.e. there is a bound session to fetch contacts of
+        self.models = [ContactsBucketModel(self, bucket, page_size, window_size, parent=self)
+                       for bucket in range(len(self.letter_sets) + 1)]
 
-    def edit_contact(self, session_key, row_idx, name, phone_number, birth_date):
-        contact_id = self.data(self.index(row_idx, self.Columns.primary_key.value), role=Qt.EditRole)
-        return _edit_contact(session_key, contact_id, name, phone_number, birth_date)
+    def bucket_of(self, name: str) -> int:
+        first_letter = name[:1].upper()
+        for idx, letter_set in enumerate(self.letter_sets):
+            if first_letter and first_letter in letter_set:
+                return idx + 1
+        return 0
 
-    def delete_contact(self, session_key, row_idx):
-        contact_id = self.data(self.index(row_idx, self.Columns.primary_key.value), role=Qt.EditRole)
-        return _delete_contact(session_key, contact_id)
+    def model_of(self, name: str) -> ContactsBucketModel:
+        return self.models[self.bucket_of(name)]
 
+    def _reset(self, is_active: bool):
+        self.is_active = is_active
+        for model in self.models:
+            model.reset()
 
-class UpcomingBirthdaysReadModel(QSqlQueryModel):
+    def refresh(self):
+        """drop loaded rows; every page is fetched again when its view asks for rows"""
+        self._reset(True)
+
+    def clear(self):
+        self._reset(False)
+
+    def _remove_contact(self, contact_id):
+        for model in self.models:
+            model._remove_contact(contact_id)
+
+    def add_contact_async(self, name, phone_number, birth_date, on_success: Optional[Callable] = None,
+                          on_error: Optional[Callable[[Exception], None]] = None) -> Future:
+        def on_added(result):
+            res_code, contact_id = result
+            if res_code is AddContactResult.SUCCESS:
+                self.model_of(name)._insert_row(
+                    ContactsReadWriteModel._make_row(contact_id, name, phone_number, birth_date))
+            elif res_code is AddContactResult.UNKNOWN_ERROR:
+                self.refresh()
+            if on_success is not None:
+                on_success(result)
+
+        return _add_contact_async(name, phone_number, birth_date, on_success=on_added, on_error=on_error)
+
+    def edit_contact_async(self, contact_id, name, phone_number, birth_date, on_success: Optional[Callable] = None,
+                           on_error: Optional[Callable[[Exception], None]] = None) -> Future:
+        def on_edited(result):
+            res_code, _ = result
+            if res_code is EditContactResult.SUCCESS:
+                self._remove_contact(contact_id)
+                self.model_of(name)._insert_row(
+                    ContactsReadWriteModel._make_row(contact_id, name, phone_number, birth_date))
+            elif res_code in ContactsReadWriteModel._resync_edit_results:
+                self.refresh()
+            if on_success is not None:
+                on_success(result)
+
+        return _edit_contact_async(contact_id, name, phone_number, birth_date, on_success=on_edited,
+                                   on_error=on_error)
+
+    def delete_contact_async(self, contact_id, on_success: Optional[Callable] = None,
+                             on_error: Optional[Callable[[Exception], None]] = None) -> Future:
+        def on_deleted(res_code):
+            if res_code is DeleteContactResult.SUCCESS:
+                self._remove_contact(contact_id)
+            elif res_code in ContactsReadWriteModel._resync_delete_results:
+                self.refresh()
+            if on_success is not None:
+                on_success(res_code)
+
+        return _delete_contact_async(contact_id, on_success=on_deleted, on_error=on_error)
+
+    def edit_contacts_async(self, contact_ids: List[int], contacts: List[Tuple[str, str, str]],
+                            on_success: Optional[Callable] = None,
+                            on_error: Optional[Callable[[Exception], None]] = None) -> Future:
+        rows = [ContactsReadWriteModel._make_row(contact_id, name, phone_number, birth_date)
+                for contact_id, (name, phone_number, birth_date) in zip(contact_ids, contacts)]
+
+        def on_edited(results):
+            if any(res_code in ContactsReadWriteModel._resync_edit_results for res_code, _ in results.values()):
+                self.refresh()
+            else:
+                for contact_id, row, (name, _, _) in zip(contact_ids, rows, contacts):
+                    res_code, _ = results[contact_id]
+                    if res_code is EditContactResult.SUCCESS:
+                        self._remove_contact(contact_id)
+                        self.model_of(name)._insert_row(row)
+            if on_success is not None:
+                on_success(results)
+
+        return edit_contacts_async(_edited_contacts_values(rows), on_success=on_edited, on_error=on_error)
+
+    def delete_contacts_async(self, contact_ids: List[int], on_success: Optional[Callable] = None,
+                              on_error: Optional[Callable[[Exception], None]] = None) -> Future:
+        def on_deleted(results):
+            if any(res_code in ContactsReadWriteModel._resync_delete_results for res_code in results.values()):
+                self.refresh()
+            else:
+                for contact_id, res_code in results.items():
+                    if res_code is DeleteContactResult.SUCCESS:
+                        self._remove_contact(contact_id)
+            if on_success is not None:
+                on_success(results)
+
+        return delete_contacts_async(contact_ids, on_success=on_deleted, on_error=on_error)
+
+
+class ContactsSearchModel(ContactsTableModel):
+    """results of the latest search; searches superseded by a newer one are cancelled or, if running, ignored"""
+    search_failed = pyqtSignal(object)
+
+    def __init__(self, limit=50, parent=None):
+        super().__init__(parent)
+        self.limit = limit
+        self.query = ""
+        self._pending: Optional[Future] = None
+        self._generation = 0  # results of searches started before the last one are stale
+
+    def search(self, query: str, by_phone=False, fallback_name: Optional[str] = None):
+        """search by a name prefix or, if `by_phone`, by a phone number (see `lookup_by_phone()`) & then, if nothing
+        is found, by the `fallback_name` prefix, e.g. the typed text for a name made of digits"""
+        self._generation += 1
+        if self._pending is not None:
+            self._pending.cancel()  # only a search waiting in the database thread's queue is cancelled
+            self._pending = None
+        self.query = query
+        if not query:
+            self.clear()
+            return
+        if by_phone:
+            self._start_search(lookup_by_phone_async, query, fallback_name)
+        else:
+            self._start_search(search_contacts_async, query)
+
+    def _start_search(self, search_async, query: str, fallback_name: Optional[str] = None):
+        on_success, on_error = traced_callbacks("ContactsSearchModel.search",
+                                                partial(self._on_found, self._generation, fallback_name),
+                                                partial(self._on_search_failed, self._generation))
+        self._pending = search_async(query, self.limit, on_success=on_success, on_error=on_error)
+
+    def _on_found(self, generation, fallback_name: Optional[str], rows: List[List]):
+        if generation != self._generation:
+            return
+        self._pending = None
+        if not rows and fallback_name:
+            self._start_search(search_contacts_async, fallback_name)
+            return
+        self.set_rows(rows)
+
+    def _on_search_failed(self, generation, exc: Exception):
+        if generation != self._generation:
+            return
+        self._pending = None
+        self.search_failed.emit(exc)
+
+
+class UpcomingBirthdaysReadModel(ContactsTableModel):
     class RangeType(Enum):
         DAY = "day"
+        WEEK = "week"
+        MONTH = "month"
 
     def __init__(self, range_type: Union[RangeType, str], range_value: int, parent):
         super().__init__(parent)
@@ -285,15 +1000,60 @@ class UpcomingBirthdaysReadModel(QSqlQueryModel):
         self.range_type = self.RangeType(range_type)
         self.range_value = range_value
 
-        if self.range_type is self.RangeType.DAY:
-            self.seconds = self.range_value * 24 * 3600
+    @property
+    def days(self) -> int:
+        return self.range_days(self.range_type, self.range_value)
+
+    @classmethod
+    def range_days(cls, range_type: Union[RangeType, str], range_value: int) -> int:
+        range_type = cls.RangeType(range_type)
+        if range_type is cls.RangeType.DAY:
+            return range_value
+        elif range_type is cls.RangeType.WEEK:
+            return range_value * 7
+        elif range_type is cls.RangeType.MONTH:
+            # months differ in length, so it depends on today
+            today = QDate.currentDate()
+            return today.daysTo(today.addMonths(range_value))
         else:
-            raise RuntimeError("unknown member: {}".format(self.range_type))
+            raise RuntimeError("unknown member: {}".format(range_type))
 
-    def refresh(self, session_key):
-        query = QSqlQuery(get_opened_db())
-        if not query.exec("CALL get_contacts_having_birthday_in_range('{}', {})".format(session_key, self.seconds)):
-            process_error(query)
-        self.setQuery(query)
-        for idx, value in enumerate(["Имя", "Телефон", "Дата рождения"], 1):
-            self.setHeaderData(idx, Qt.Horizontal, value)
+    def refresh(self):
+        with call_span("UpcomingBirthdaysReadModel.refresh") as span:
+            self.set_rows(get_contacts_having_birthday_in_range(self.days))
+            if span is not None:
+                span.rows = len(self._rows)
+
+    def refresh_async(self, on_success: Optional[Callable] = None,
+                      on_error: Optional[Callable[[Exception], None]] = None) -> Future:
+        def on_fetched(rows):
+            self.set_rows(rows)
+            if on_success is not None:
+                on_success(rows)
+
+        on_fetched, on_error = traced_callbacks("UpcomingBirthdaysReadModel.refresh", on_fetched, on_error)
+        return get_contacts_having_birthday_in_range_async(self.days, on_success=on_fetched, on_error=on_error)
+
+
+check_session_exists_async = async_variant(check_session_exists)
+register_async = async_variant(register)
+log_in_async = async_variant(log_in)
+log_out_async = async_variant(log_out)
+get_user_info_async = async_variant(get_user_info)
+get_all_contacts_async = async_variant(get_all_contacts)
+get_contacts_async = async_variant(get_contacts)
+count_contacts_async = async_variant(count_contacts)
+get_contacts_changed_since_async = async_variant(get_contacts_changed_since)
+get_contacts_page_async = async_variant(get_contacts_page)
+get_contacts_page_before_async = async_variant(get_contacts_page_before)
+get_contacts_chunk_async = async_variant(get_contacts_chunk)
+search_contacts_async = async_variant(search_contacts)
+lookup_by_phone_async = async_variant(lookup_by_phone)
+_add_contact_async = async_variant(_add_contact)
+add_contacts_async = async_variant(add_contacts)
+_edit_contact_async = async_variant(_edit_contact)
+_delete_contact_async = async_variant(_delete_contact)
+edit_contacts_async = async_variant(edit_contacts)
+delete_contacts_async = async_variant(delete_contacts)
+merge_contacts_async = async_variant(merge_contacts)
+get_contacts_having_birthday_in_range_async = async_variant(get_contacts_having_birthday_in_range)
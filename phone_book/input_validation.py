@@ -1,12 +1,54 @@
+import re
 from functools import partial
 from typing import Dict, List, Optional
 
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import QRegularExpression, Qt
 from PyQt5.QtGui import QColor, QValidator
 from PyQt5.QtWidgets import QLineEdit
 
 StateToColor = Dict[QValidator.State, Optional[QColor]]
 
+# Rules of contact data shared by the contact form & the contacts import
+CONTACT_NAME_PATTERN = ".{1,255}"
+# adopted (Russia version) from https://phoneregex.com
+PHONE_NUMBER_PATTERN = r"^((\+7|7|8)+([0-9]){10})$"
+PHONE_NUMBER_MAX_LENGTH = 15  # of `contacts.phone_number` of the database
+
+_non_digits_rx = re.compile(r"[^0-9]")
+# digits possibly with a leading plus & separators, e.g. "+7 (921) 123-45-67" or "45-67"
+_phone_number_query_rx = re.compile(r"^\+?[0-9 ()\-]*[0-9][0-9 ()\-]*$")
+
+
+def normalize_phone_number(phone_number: str) -> str:
+    """E.164 form of a phone number just like `normalize_phone_number()` of the database gives: +7 & 10 digits
+    for a number written with +7, 7, 8 or without a prefix"""
+    digits = _non_digits_rx.sub("", phone_number)
+    if len(digits) == 11 and digits[0] in "78":
+        return "+7" + digits[1:]
+    if len(digits) == 10:
+        return "+7" + digits
+    return "+" + digits
+
+
+def get_phone_number_lookup_key(text: str) -> Optional[str]:
+    """the number for `lookup_by_phone` of the database if the text looks like a phone number, its start or its end:
+    "+" & the digits if the text starts with "+", i.e. with the country code, even if the number isn't typed whole,
+    a normalized number if there are 10 digits at least, just the digits (of the number's end) otherwise"""
+    if not _phone_number_query_rx.match(text):
+        return None
+    digits = _non_digits_rx.sub("", text)
+    if text.startswith("+"):
+        return "+" + digits
+    return normalize_phone_number(digits) if len(digits) >= 10 else digits
+
+
+def make_regular_expression(pattern: str, anchored=False) -> QRegularExpression:
+    """`anchored` makes the whole text to be matched just like `QRegularExpressionValidator` does"""
+    rx = QRegularExpression(QRegularExpression.anchoredPattern(pattern) if anchored else pattern)
+    if not rx.isValid():
+        raise ValueError(rx.errorString())
+    return rx
+
 
 class InputValidationHighlighterMixin:
     state_to_color: StateToColor = {
@@ -1,24 +1,62 @@
+import csv
+import logging
 import os.path
 from functools import partial
-from typing import Dict, Tuple
+from typing import Dict, List, Optional, Tuple
 
-from PyQt5.QtCore import QSettings, pyqtSignal
-from PyQt5.QtWidgets import QDialog, QMainWindow, QMessageBox
+from PyQt5.QtCore import QModelIndex, Qt, QTimer, pyqtSignal
+from PyQt5.QtGui import QKeySequence
+from PyQt5.QtWidgets import QDialog, QFileDialog, QMainWindow, QMessageBox, QProgressDialog, QShortcut
 
 from . import database as db
-from .contacts import AddContactForm, ContactsPage, DeleteContactDialog, EditContactForm, UpcomingBirthdaysDialog
+from .app_settings import get_settings
+from .contacts import (AddContactForm, ContactsFilterModel, ContactsPage, DeleteContactDialog, DeleteContactsDialog,
+                       EditContactForm, EditContactsForm, MergeContactsDialog, UpcomingBirthdaysDialog)
+from .contacts_dedup import ContactsDuplicates, ContactsDuplicatesSearch
+from .contacts_export import ContactsExporter, ContactsExportResult
+from .contacts_import import ContactsImporter, ContactsImportProgress, ContactsImportReport
+from .input_validation import get_phone_number_lookup_key
+from .metrics_dialog import MetricsDialog
 from .msg_dialogs import show_db_conn_err_msg
 from .reg_auth import AuthForm
 from .settings_dialog import SettingsDialog, SettingsDialogFieldValues
+from .startup import StartupPipeline, StartupPrefetch, restore_session
 from .ui import Ui_MainWindow
 
+logger = logging.getLogger(__name__)
+
 
 class MainWindow(QMainWindow):
+    # larger address books are shown by pages fetched lazily instead of being loaded at once
+    contacts_paging_threshold = 10000
+    contacts_page_size = 500
+    # a search is started once typing pauses for this long
+    search_delay_ms = 300
+
+    # reasons shown for contacts failed to be changed by a change of several ones
+    _edit_failure_reasons = {
+        db.EditContactResult.SAME_DATA_CONTACT_EXISTS: "контакт с такими данными уже существует",
+        db.EditContactResult.CONTACT_DOESNT_EXIST: "контакт не существует",
+        db.EditContactResult.NO_AUTHORITY_TO_EDIT_CONTACT: "нет прав на редактирование контакта",
+        db.EditContactResult.UNKNOWN_ERROR: "непредвиденная ошибка",
+    }
+    _delete_failure_reasons = {
+        db.DeleteContactResult.CONTACT_DOESNT_EXIST: "контакт уже не существует",
+        db.DeleteContactResult.NO_AUTHORITY_TO_DELETE_CONTACT: "нет прав на удаление контакта",
+        db.DeleteContactResult.UNKNOWN_ERROR: "непредвиденная ошибка",
+    }
+    _merge_failure_reasons = {
+        db.MergeContactsResult.SAME_DATA_CONTACT_EXISTS: "контакт с такими данными уже существует",
+        db.MergeContactsResult.CONTACT_DOESNT_EXIST: "контакт группы уже не существует",
+        db.MergeContactsResult.NO_AUTHORITY_TO_EDIT_CONTACT: "нет прав на редактирование контакта группы",
+        db.MergeContactsResult.UNKNOWN_ERROR: "непредвиденная ошибка",
+    }
+
     auth_status_changed = pyqtSignal()
     database_settings_changed = pyqtSignal()
     contact_edited = pyqtSignal()
 
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, startup: Optional[StartupPipeline] = None):
         super().__init__(parent)
         self.ui = Ui_MainWindow()
         self.ui.setupUi(self)
@@ -28,16 +66,23 @@ class MainWindow(QMainWindow):
         self.ui.add_contact_btn.clicked.connect(self.handle_add_contact_btn_clicked)
         self.ui.edit_contact_btn.clicked.connect(self.handle_edit_contact_btn_clicked)
         self.ui.delete_contact_btn.clicked.connect(self.handle_delete_contact_btn_clicked)
+        self.ui.import_contacts_btn.clicked.connect(self.handle_import_contacts_btn_clicked)
+        self.ui.export_contacts_btn.clicked.connect(self.handle_export_contacts_btn_clicked)
+        self.ui.find_duplicates_btn.clicked.connect(self.handle_find_duplicates_btn_clicked)
 
         self.auth_status_changed.connect(self.handle_auth_status_changed)
         self.database_settings_changed.connect(self.handle_database_settings_changed)
 
-        self.settings, self.default_settings = self.get_settings()
+        self.settings, self.default_settings = get_settings()
         if self.settings is self.default_settings:
             raise RuntimeError
 
         self.session_key = self.read_session_key_from_storage()
         self.username = None
+        # resumes the session while the window is being built; see `start_startup_pipeline()`
+        self.startup = startup
+        # set while the window is populated with data prefetched by the pipeline
+        self.startup_prefetch: Optional[StartupPrefetch] = None
 
         self.remember_me = False if self.session_key is None else True
         self.is_authenticated = False if self.session_key is None else None
@@ -46,31 +91,160 @@ class MainWindow(QMainWindow):
         self.rest_contacts_page_name = "Другое"
         self.full_letter_set = ''.join(self.letter_sets)
         self.letter_set_to_contacts_page: Dict[str, ContactsPage] = {}
+        self.contacts_model = db.ContactsReadWriteModel(parent=self)
+        self.contacts_bucket_models = db.ContactsBucketModels(self.letter_sets, self.contacts_page_size, parent=self)
+        self.contacts_bucket_models.fetch_failed.connect(self.on_db_call_failed)
+        self.letter_set_to_contacts_models: Dict[str, Tuple[db.ContactsPageReadWriteModel, db.ContactsBucketModel]] = {}
         self.setup_tabs()
 
+        # contacts loaded at once are searched without the server
+        self.contacts_filter_model = ContactsFilterModel(self.contacts_model, parent=self)
+        self.contacts_search_model = db.ContactsSearchModel(parent=self)
+        self.contacts_search_model.search_failed.connect(self.on_db_call_failed)
+        for model in (self.contacts_filter_model, self.contacts_search_model):
+            # a model reset shows hidden columns again
+            model.modelReset.connect(self.hide_search_results_primary_key_column)
+        self.ui.search_results_view.activated.connect(self.handle_search_result_activated)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.search_delay_ms)
+        self.search_timer.timeout.connect(self.search_contacts)
+        self.ui.search_ln_edt.textChanged.connect(self.handle_search_text_changed)
+
+        self.contacts_replica: Optional[db.ContactsReplica] = None
+        self.contacts_replica_owner = None
+        self.contacts_row_version = 0
+        if self.is_contacts_replica_turned_on(self.settings, self.default_settings):
+            self.contacts_replica = db.ContactsReplica(self.get_contacts_replica_path())
+
+        self.metrics_exporter: Optional[db.MetricsExporter] = None
+        self.metrics_dialog: Optional[MetricsDialog] = None
+        key = "metrics/turned_on"
+        type_ = bool
+        def_val = self.default_settings.value(key, False, type_)
+        self.set_metrics_turned_on(self.settings.value(key, def_val, type_))
+        QShortcut(QKeySequence("Ctrl+Shift+M"), self, self.show_metrics_dialog)
+
     @staticmethod
-    def get_settings():
-        settings = QSettings(QSettings.IniFormat, QSettings.UserScope, "vista", "phone_book")
-        def_settings_path = os.path.join(os.path.dirname(__file__), "phone_book_defaults.ini")
-        default_settings = QSettings(def_settings_path, QSettings.IniFormat)
-        return settings, default_settings
+    def is_first_run(settings, default_settings) -> bool:
+        key = "first_run"
+        type_ = bool
+        def_val = default_settings.value(key, True, type_)
+        return settings.value(key, def_val, type_)
+
+    @staticmethod
+    def is_contacts_replica_turned_on(settings, default_settings) -> bool:
+        key = "replica/turned_on"
+        type_ = bool
+        def_val = default_settings.value(key, False, type_)
+        return settings.value(key, def_val, type_)
+
+    @staticmethod
+    def get_birthdays_range(settings, default_settings) -> Optional[Tuple[str, int]]:
+        """(range type, range value) of birthdays notifications; None if they are turned off"""
+        key = "notifications/birthdays/turned_on"
+        type_ = bool
+        def_val = default_settings.value(key, True, type_)
+        if not settings.value(key, def_val, type_):
+            return None
+
+        key = "notifications/birthdays/range/type"
+        type_ = str
+        def_val = default_settings.value(key, "day", type_)
+        range_type = settings.value(key, def_val, type_)
+
+        key = "notifications/birthdays/range/value"
+        type_ = int
+        def_val = default_settings.value(key, 7, type_)
+        range_value = settings.value(key, def_val, type_)
+        return range_type, range_value
+
+    @classmethod
+    def start_startup_pipeline(cls) -> Optional[StartupPipeline]:
+        """start resuming the remembered session before the window is built, i.e. right after `QApplication` is
+        created; None if there is no session to resume or settings are to be checked at the first run"""
+        settings, default_settings = get_settings()
+        session_key = settings.value("session_key")
+        if not session_key or cls.is_first_run(settings, default_settings):
+            return None
+        db.setup_db(settings, default_settings)
+        birthdays_range = cls.get_birthdays_range(settings, default_settings)
+        pipeline = StartupPipeline(
+            session_key,
+            # contacts of the replica are shown at once anyway
+            None if cls.is_contacts_replica_turned_on(settings, default_settings) else cls.contacts_paging_threshold,
+            # the bucket of the first tab, i.e. the current one at startup
+            first_bucket=1,
+            page_size=cls.contacts_page_size,
+            birthdays_days=None if birthdays_range is None else db.UpcomingBirthdaysReadModel.range_days(
+                *birthdays_range))
+        pipeline.start()
+        return pipeline
+
+    def set_metrics_turned_on(self, turned_on: bool) -> Optional[db.MetricsRegistry]:
+        """start or stop measuring database calls & exporting the metrics if an export path is set"""
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.stop()
+            self.metrics_exporter = None
+        if not turned_on:
+            db.disable_metrics()
+            return None
+
+        key = "metrics/slow_call_threshold_ms"
+        type_ = int
+        def_val = self.default_settings.value(key, 500, type_)
+        slow_call_threshold_ms = self.settings.value(key, def_val, type_)
+        registry = db.enable_metrics(slow_call_threshold_ms / 1000 if slow_call_threshold_ms > 0 else None)
+
+        key = "metrics/export_path"
+        type_ = str
+        def_val = self.default_settings.value(key, "", type_)
+        export_path = self.settings.value(key, def_val, type_)
+        if export_path:
+            key = "metrics/export_interval_s"
+            type_ = int
+            def_val = self.default_settings.value(key, 60, type_)
+            self.metrics_exporter = db.MetricsExporter(export_path, self.settings.value(key, def_val, type_),
+                                                       parent=self)
+            self.metrics_exporter.start()
+        return registry
+
+    def show_metrics_dialog(self):
+        if self.metrics_dialog is None:
+            self.metrics_dialog = MetricsDialog(self.set_metrics_turned_on, parent=self)
+        self.metrics_dialog.show()
+        self.metrics_dialog.raise_()
 
     def handle_contact_selection_changed(self, page_where_changed: ContactsPage):
-        if page_where_changed is self.ui.contacts_tab_widget.currentWidget():
+        # contacts pages are hidden by search results
+        if page_where_changed is self.ui.contacts_tab_widget.currentWidget() and not self.is_searching():
             is_selection_empty = page_where_changed.is_selection_empty()
             self.ui.edit_contact_btn.setDisabled(is_selection_empty)
             self.ui.delete_contact_btn.setDisabled(is_selection_empty)
 
     def setup_tabs(self):
-        for letter_set in self.letter_sets + (self.rest_contacts_page_name,):
+        for idx, letter_set in enumerate(self.letter_sets + (self.rest_contacts_page_name,)):
             model = db.ContactsPageReadWriteModel(
+                self.contacts_model,
                 letter_set=letter_set if letter_set != self.rest_contacts_page_name else self.full_letter_set,
                 exclude=letter_set == self.rest_contacts_page_name, parent=self)
+            bucket_model = self.contacts_bucket_models.models[
+                idx + 1 if letter_set != self.rest_contacts_page_name else 0]
+            self.letter_set_to_contacts_models[letter_set] = model, bucket_model
             tab = ContactsPage(model)
             tab.contact_selection_changed.connect(partial(self.handle_contact_selection_changed, tab))
             self.letter_set_to_contacts_page[letter_set] = tab
             self.ui.contacts_tab_widget.addTab(tab, letter_set)
 
+    def get_contacts_replica_path(self):
+        dir_path = os.path.dirname(self.settings.fileName())
+        os.makedirs(dir_path, exist_ok=True)
+        return os.path.join(dir_path, "phone_book_replica.sqlite")
+
+    def get_contacts_replica_owner(self):
+        values = self._get_settings_dialog_fields_values()
+        return "{}@{}:{}/{}".format(self.username, values.host_name, values.port, values.database_name)
+
     def read_session_key_from_storage(self):
         return self.settings.value("session_key")
 
@@ -82,19 +256,15 @@ class MainWindow(QMainWindow):
         self.settings.remove("session_key")
         self.settings.sync()
 
-    def setup_db(self):
-        db.setup_db(self.settings, self.default_settings)
+    def setup_db(self, force=False):
+        db.setup_db(self.settings, self.default_settings, force=force)
 
     def welcome_if_first_run(self):
-        key = "first_run"
-        type_ = bool
-        def_val = self.default_settings.value(key, True, type_)
-        is_first_run = self.settings.value(key, def_val, type_)
         is_show_settings = False
-        if is_first_run:
+        if self.is_first_run(self.settings, self.default_settings):
             r = QMessageBox.question(self, "Телефонная книжка",
                                      "Добро пожаловать!\n\nХотите проверить настройки перед началом работы?")
-            self.settings.setValue(key, False)
+            self.settings.setValue("first_run", False)
             if r == QMessageBox.Yes:
                 is_show_settings = True
         return is_show_settings
@@ -111,11 +281,19 @@ class MainWindow(QMainWindow):
         self.hide()
         if not self.remember_me and self.is_authenticated:
             self.log_out()
+        # waits for the calls already submitted, e.g. the log out one
+        db.shutdown_executor()
+        db.close_db()
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.stop()
+        if self.contacts_replica is not None:
+            self.contacts_replica.close()
         event.accept()
 
     def on_auth_form_finished(self, form: AuthForm, r: QDialog.DialogCode):
         if r == QDialog.Accepted and form.result.session_key:
             self.session_key = form.result.session_key
+            db.bind_session(self.session_key)
             self.remember_me = form.result.remember_me
             self.username = form.result.username
             self.is_authenticated = True
@@ -125,31 +303,82 @@ class MainWindow(QMainWindow):
                 self.write_session_key_to_storage()
 
     def restore_session_or_log_in(self):
+        if not self.session_key:
+            self.open_auth_form()
+            return
+        # the pipeline is used up by the first attempt
+        startup, self.startup = self.startup, None
+        if startup is not None and startup.session_key == self.session_key:
+            db.add_callbacks(startup.future, on_success=self.on_startup_prefetched,
+                             on_error=self.on_session_restore_failed)
+            return
+        db.run_async(restore_session, self.session_key,
+                     on_success=self.on_session_restored, on_error=self.on_session_restore_failed)
+
+    def on_startup_prefetched(self, prefetch: StartupPrefetch):
+        # handlers of the auth status change take the prefetched data instead of fetching it
+        self.startup_prefetch = prefetch
         try:
-            if self.session_key and db.check_session_exists(self.session_key):
-                self.username, _ = db.get_user_info(self.session_key)
-                self.is_authenticated = True
-                self.auth_status_changed.emit()
-                return
-        except db.DatabaseConnectionError as exc:
-            show_db_conn_err_msg(details=str(exc), parent=self)
+            self.on_session_restored(prefetch.username)
+        finally:
+            self.startup_prefetch = None
+
+    def on_session_restore_failed(self, exc: Exception):
+        if not isinstance(exc, db.DatabaseConnectionError) or self.contacts_replica is None:
+            self.on_db_call_failed(exc)
+            return
+        # the server is unreachable, but contacts of a remembered session still can be shown
+        self.contacts_replica.run_async(self.contacts_replica.get_session_owner, self.session_key,
+                                        on_success=partial(self.on_offline_session_owner_found, exc),
+                                        on_error=self.on_contacts_replica_failed)
+
+    def on_offline_session_owner_found(self, exc: db.DatabaseConnectionError, owner: Optional[Tuple[str, str]]):
+        if owner is None:
+            self.on_db_call_failed(exc)
+            return
+        if self.is_authenticated:
+            return
+        owner, username = owner
+        self.ui.label.setText("Нет связи с сервером. Показаны сохраненные контакты {}".format(username))
+        self.load_contacts_replica(owner)
+
+    def on_session_restored(self, username):
+        if username is None:
+            self.open_auth_form()
             return
+        db.bind_session(self.session_key)
+        self.username = username
+        self.is_authenticated = True
+        self.auth_status_changed.emit()
 
+    def open_auth_form(self):
         form = AuthForm(self.remember_me, parent=self)
         form.finished.connect(partial(self.on_auth_form_finished, form))
         form.open()
 
+    def on_db_call_failed(self, exc: Exception):
+        if not isinstance(exc, db.DatabaseConnectionError):
+            raise exc
+        show_db_conn_err_msg(details=str(exc), parent=self)
+
+    @staticmethod
+    def on_contacts_replica_failed(exc: Exception):
+        # the replica is just a cache, contacts are fetched from the server anyway
+        logger.warning("Contacts replica failed: %s", exc)
+
     def log_out(self):
+        session_key = self.session_key
+        if self.contacts_replica is not None and session_key:
+            self.contacts_replica.run_async(self.contacts_replica.forget_session, session_key,
+                                            on_error=self.on_contacts_replica_failed)
         self.erase_session_key_from_storage()
         self.session_key = None
+        db.bind_session(None)
         self.is_authenticated = False
         self.auth_status_changed.emit()
-        try:
-            db.log_out(self.session_key)
-        except db.DatabaseConnectionError:
-            # Not critical because a session_key is erased &
-            # a database can delete it later on its own when it expires
-            pass
+        # A failure is not critical because a session_key is erased &
+        # a database can delete it later on its own when it expires
+        db.log_out_async(session_key, on_error=lambda exc: None)
 
     def handle_log_in_out_btn_clicked(self):
         if self.is_authenticated:
@@ -163,25 +392,118 @@ class MainWindow(QMainWindow):
             self.ui.log_in_out_btn.setText("Выйти")
             self.show_birthdays_if_any()
             self.ui.add_contact_btn.setEnabled(True)
-            self.ui.contacts_tab_widget.currentWidget().refresh_data(self.session_key)
+            self.ui.import_contacts_btn.setEnabled(True)
+            self.ui.export_contacts_btn.setEnabled(True)
+            self.ui.find_duplicates_btn.setEnabled(True)
+            self.ui.search_ln_edt.setEnabled(True)
+            self.refresh_contacts()
         else:
             self.ui.label.setText("Вход не выполнен")
             self.ui.log_in_out_btn.setText("Войти")
             self.ui.add_contact_btn.setDisabled(True)
-            self.clear_contacts_pages()
+            self.ui.import_contacts_btn.setDisabled(True)
+            self.ui.export_contacts_btn.setDisabled(True)
+            self.ui.find_duplicates_btn.setDisabled(True)
+            self.ui.search_ln_edt.clear()
+            self.ui.search_ln_edt.setDisabled(True)
+            self.contacts_model.clear()
+            self.contacts_bucket_models.clear()
+            self.contacts_replica_owner = None
 
     def handle_database_settings_changed(self):
         if self.is_authenticated:
             self.log_out()
             QMessageBox.information(self, "Телефонная книжка", "Настройки подключения к базе данных изменены.\n"
                                                                "Вам придется войти заново.")
-        self.setup_db()
+        # saved settings always reconnect, even if they turn out the same as the ones connected with
+        self.setup_db(force=True)
+
+    def refresh_contacts(self):
+        if self.contacts_replica is not None:
+            # contacts are shown from the replica at once & then just changes are fetched from the server
+            self.load_contacts_replica(self.get_contacts_replica_owner())
+        elif self.startup_prefetch is not None and self.startup_prefetch.contacts_count is not None:
+            self.on_contacts_counted(self.startup_prefetch.contacts_count, self.startup_prefetch)
+        else:
+            self.count_contacts()
+
+    def count_contacts(self):
+        db.count_contacts_async(on_success=self.on_contacts_counted, on_error=self.on_db_call_failed)
+
+    def load_contacts_replica(self, owner):
+        self.contacts_replica_owner = owner
+        self.contacts_replica.run_async(self.contacts_replica.load, owner,
+                                        on_success=partial(self.on_contacts_replica_loaded, owner),
+                                        on_error=self.on_contacts_replica_failed)
+
+    def on_contacts_replica_loaded(self, owner, result: Tuple[int, List[List]]):
+        if owner != self.contacts_replica_owner:
+            return
+        self.contacts_row_version, rows = result
+        if len(rows) <= self.contacts_paging_threshold:
+            self.contacts_model.set_unsorted_rows(rows)
+        if self.is_authenticated:
+            self.count_contacts()
+
+    def sync_contacts_replica(self):
+        owner = self.contacts_replica_owner
+        db.get_contacts_changed_since_async(self.contacts_row_version,
+                                            on_success=partial(self.on_contacts_changes_fetched, owner),
+                                            on_error=partial(self.on_contacts_changes_failed, owner))
 
-    def clear_contacts_pages(self):
-        tab_widget = self.ui.contacts_tab_widget
-        for idx in range(tab_widget.count()):
-            page: ContactsPage = tab_widget.widget(idx)
-            page.clear_data()
+    def on_contacts_changes_failed(self, owner, exc: Exception):
+        if not isinstance(exc, db.ContactsChangesPurgedError):
+            self.on_db_call_failed(exc)
+            return
+        if owner != self.contacts_replica_owner:
+            return
+        # the replica hasn't been synced for so long that deletions since then are forgotten by the server
+        logger.info("Contacts replica is too old, loading contacts anew")
+        self.contacts_row_version = 0
+        self.contacts_model.clear()
+        self.contacts_replica.run_async(self.contacts_replica.forget_contacts, owner,
+                                        on_error=self.on_contacts_replica_failed)
+        self.sync_contacts_replica()
+
+    def sync_contacts_replica_if_any(self):
+        # the snapshot is changed in place already, but the replica has to get the change with its row version
+        is_paged = self.contacts_bucket_models.is_active
+        if self.contacts_replica is not None and self.contacts_replica_owner is not None and self.is_authenticated \
+                and not is_paged:
+            self.sync_contacts_replica()
+
+    def on_contacts_changes_fetched(self, owner, changes: List[List]):
+        if owner != self.contacts_replica_owner:
+            return
+        self.contacts_model.apply_changes(changes)
+        if changes:
+            self.contacts_row_version = max(self.contacts_row_version, changes[-1][4])
+        self.contacts_replica.run_async(self.contacts_replica.apply_changes, owner, self.username, changes,
+                                        on_error=self.on_contacts_replica_failed)
+        if self.remember_me:
+            self.contacts_replica.run_async(self.contacts_replica.remember_session, owner, self.session_key,
+                                            on_error=self.on_contacts_replica_failed)
+
+    def on_contacts_counted(self, count, prefetch: Optional[StartupPrefetch] = None):
+        if not self.is_authenticated:
+            return
+        is_paged = count > self.contacts_paging_threshold
+        for letter_set, page in self.letter_set_to_contacts_page.items():
+            model, bucket_model = self.letter_set_to_contacts_models[letter_set]
+            page.set_model(bucket_model if is_paged else model)
+        if is_paged:
+            self.contacts_model.clear()
+            self.contacts_bucket_models.refresh()
+            if prefetch is not None and prefetch.contacts_bucket is not None:
+                self.contacts_bucket_models.models[prefetch.contacts_bucket].set_first_page(prefetch.contacts)
+        else:
+            self.contacts_bucket_models.clear()
+            if self.contacts_replica is not None:
+                self.sync_contacts_replica()
+            elif prefetch is not None and prefetch.contacts_bucket is None:
+                self.contacts_model.set_rows(prefetch.contacts)
+            else:
+                self.contacts_model.refresh_async(on_error=self.on_db_call_failed)
 
     def handle_tab_changed(self, idx):
         page: ContactsPage = self.ui.contacts_tab_widget.widget(idx)
@@ -190,12 +512,56 @@ class MainWindow(QMainWindow):
         self.ui.edit_contact_btn.setDisabled(is_selection_empty)
         self.ui.delete_contact_btn.setDisabled(is_selection_empty)
 
-        if self.is_authenticated and not page.is_data_fetched:
-            try:
-                page.fetch_data_first_time(self.session_key)
-            except db.DatabaseConnectionError as exc:
-                show_db_conn_err_msg(details=str(exc), parent=self)
-                self.close()
+    def is_searching(self) -> bool:
+        return bool(self.ui.search_ln_edt.text().strip())
+
+    def hide_search_results_primary_key_column(self):
+        self.ui.search_results_view.hideColumn(db.ContactsTableModel.Columns.primary_key.value)
+
+    def handle_search_text_changed(self):
+        is_searching = self.is_searching()
+        self.ui.search_results_view.setVisible(is_searching)
+        self.ui.contacts_tab_widget.setVisible(not is_searching)
+        if not is_searching:
+            self.search_timer.stop()
+            self.contacts_filter_model.search("")
+            self.contacts_search_model.search("")
+            self.handle_tab_changed(self.ui.contacts_tab_widget.currentIndex())
+            return
+
+        self.ui.edit_contact_btn.setDisabled(True)
+        self.ui.delete_contact_btn.setDisabled(True)
+        query = self.ui.search_ln_edt.text().strip()
+        # phone numbers are looked up by the server's index of them
+        is_local = not self.contacts_bucket_models.is_active and get_phone_number_lookup_key(query) is None
+        model = self.contacts_filter_model if is_local else self.contacts_search_model
+        if self.ui.search_results_view.model() is not model:
+            self.ui.search_results_view.setModel(model)
+            self.hide_search_results_primary_key_column()
+        if is_local:
+            self.contacts_filter_model.search(query)
+        else:
+            self.search_timer.start()  # restarted by every keystroke
+
+    def search_contacts(self):
+        query = self.ui.search_ln_edt.text().strip()
+        phone_number_key = get_phone_number_lookup_key(query)
+        if phone_number_key is None:
+            if query != self.contacts_search_model.query:
+                self.contacts_search_model.search(query)
+        elif phone_number_key != self.contacts_search_model.query:
+            # a name may consist of digits too
+            self.contacts_search_model.search(phone_number_key, by_phone=True, fallback_name=query)
+
+    def handle_search_result_activated(self, index: QModelIndex):
+        """show the found contact on its page"""
+        model = self.ui.search_results_view.model()
+        contact_id = model.index(index.row(), model.Columns.primary_key.value).data()
+        contact_name = model.index(index.row(), model.Columns.name.value).data()
+        self.ui.search_ln_edt.clear()
+        _, page = self.detect_page_where_contact_located(contact_name)
+        self.ui.contacts_tab_widget.setCurrentWidget(page)
+        page.select_contact(contact_id)
 
     def detect_page_where_contact_located(self, contact_name: str) -> Tuple[str, ContactsPage]:
         first_letter = contact_name[0].upper()
@@ -214,8 +580,8 @@ class MainWindow(QMainWindow):
         res_code, contact_name = form.result.code, form.result.contact_name
 
         if res_code is db.AddContactResult.SUCCESS:
+            self.sync_contacts_replica_if_any()
             page_name, tab = self.detect_page_where_contact_located(contact_name)
-            tab.refresh_data(self.session_key)
 
             if tab is self.ui.contacts_tab_widget.currentWidget():
                 QMessageBox.information(self, "Телефонная книжка", "Контакт успешно добавлен на текущую страницу.")
@@ -251,8 +617,7 @@ class MainWindow(QMainWindow):
 
     def handle_add_contact_btn_clicked(self):
         page: ContactsPage = self.ui.contacts_tab_widget.currentWidget()
-        cb = partial(page.model.add_contact, self.session_key)
-        form = AddContactForm(cb, parent=self)
+        form = AddContactForm(page.model.add_contact_async, parent=self)
         form.finished.connect(partial(self.on_add_contact_form_finished, form))
         form.open()
 
@@ -263,11 +628,9 @@ class MainWindow(QMainWindow):
         res_code, contact_new_name = form.result.code, form.result.contact_new_name
 
         if res_code is db.EditContactResult.SUCCESS:
+            self.sync_contacts_replica_if_any()
             page_name, page = self.detect_page_where_contact_located(contact_new_name)
             current_page = self.ui.contacts_tab_widget.currentWidget()
-            current_page.refresh_data(self.session_key)
-            if current_page is not page:
-                page.refresh_data(self.session_key)
 
             if page is current_page:
                 QMessageBox.information(self, "Телефонная книжка", "Контакт отредактирован.")
@@ -306,22 +669,53 @@ class MainWindow(QMainWindow):
         else:
             raise RuntimeError("unknown member: {}".format(res_code))
 
-    def _get_contacts_page_selected_row_idx(self, page: ContactsPage) -> int:
-        rows = set(idx.row() for idx in page.view.selectedIndexes())
-        if len(rows) > 1:
-            raise RuntimeError(
-                "for `page.view` expected: "
-                "1) `selectionMode` property to be `QTableView.SingleSelection`; "
-                "2) `selectionBehavior` property to be `QTableView.SelectRows`")
-        elif len(rows) == 0:
-            raise RuntimeError("no rows selected")
-        return rows.pop()
+    def show_contacts_changes_report(self, text: str, contacts_names: Dict[int, str], failure_reasons: Dict[int, str]):
+        """report results of a change of several contacts, failed ones are listed in details"""
+        text = "{}: {} из {}.".format(text, len(contacts_names) - len(failure_reasons), len(contacts_names))
+        if failure_reasons:
+            text += "\nНе удалось: {}.".format(len(failure_reasons))
+        msg_box = QMessageBox(QMessageBox.Warning if failure_reasons else QMessageBox.Information,
+                              "Телефонная книжка", text, parent=self)
+        if failure_reasons:
+            msg_box.setDetailedText("\n".join("{}: {}".format(contacts_names[contact_id], reason)
+                                              for contact_id, reason in failure_reasons.items()))
+        msg_box.exec()
+
+    def on_edit_contacts_form_finished(self, form: EditContactsForm, contacts_names: Dict[int, str],
+                                       r: QDialog.DialogCode):
+        if r == QDialog.Rejected:
+            return
+
+        results: Dict[int, Tuple[db.EditContactResult, Optional[int]]] = form.result.code
+        if any(res_code is db.EditContactResult.INVALID_SESSION for res_code, _ in results.values()):
+            QMessageBox.warning(self, "Телефонная книжка", "Сессия истекла. Вам нужно войти заново.")
+            self.log_out()
+            return
+        if any(res_code is db.EditContactResult.SUCCESS for res_code, _ in results.values()):
+            self.sync_contacts_replica_if_any()
+        self.show_contacts_changes_report(
+            "Отредактировано контактов", contacts_names,
+            {contact_id: self._edit_failure_reasons[res_code] for contact_id, (res_code, _) in results.items()
+             if res_code is not db.EditContactResult.SUCCESS})
+
+    def _get_selected_contacts_names(self, page: ContactsPage, row_idxs: List[int]) -> Dict[int, str]:
+        primary_key, name = page.model.Columns.primary_key.value, page.model.Columns.name.value
+        return {page.model.index(row_idx, primary_key).data(): page.model.index(row_idx, name).data()
+                for row_idx in row_idxs}
 
     def handle_edit_contact_btn_clicked(self):
         page: ContactsPage = self.ui.contacts_tab_widget.currentWidget()
-        contact_row_idx = self._get_contacts_page_selected_row_idx(page)
+        row_idxs = page.get_selected_row_idxs()
+        if len(row_idxs) > 1:
+            contacts = [page.model.get_contact_data(row_idx) for row_idx in row_idxs]
+            form = EditContactsForm(partial(page.model.edit_contacts_async, row_idxs), contacts, parent=self)
+            form.finished.connect(partial(self.on_edit_contacts_form_finished, form,
+                                          self._get_selected_contacts_names(page, row_idxs)))
+            form.open()
+            return
+        contact_row_idx, = row_idxs
         data = page.model.get_contact_data(contact_row_idx)
-        cb = partial(page.model.edit_contact, self.session_key, contact_row_idx)
+        cb = partial(page.model.edit_contact_async, contact_row_idx)
         form = EditContactForm(cb, data.name, data.phone_number, data.birth_date, parent=self)
         form.finished.connect(partial(self.on_edit_contact_form_finished, form))
         form.open()
@@ -333,8 +727,7 @@ class MainWindow(QMainWindow):
         res_code = form.result.code
 
         if res_code is db.DeleteContactResult.SUCCESS:
-            current_page = self.ui.contacts_tab_widget.currentWidget()
-            current_page.refresh_data(self.session_key)
+            self.sync_contacts_replica_if_any()
             QMessageBox.information(self, "Телефонная книжка", "Контакт успешно удален.")
         elif res_code is db.DeleteContactResult.CONTACT_DOESNT_EXIST:
             QMessageBox.warning(self, "Телефонная книжка", "Не удалось удалить: контакт уже не существует.")
@@ -348,35 +741,219 @@ class MainWindow(QMainWindow):
         else:
             raise RuntimeError("unknown member: {}".format(res_code))
 
+    def on_delete_contacts_dialog_finished(self, form: DeleteContactsDialog, contacts_names: Dict[int, str],
+                                           r: QDialog.DialogCode):
+        if r == QDialog.Rejected:
+            return
+
+        results: Dict[int, db.DeleteContactResult] = form.result.code
+        if any(res_code is db.DeleteContactResult.INVALID_SESSION for res_code in results.values()):
+            QMessageBox.warning(self, "Телефонная книжка", "Сессия истекла. Вам нужно войти заново.")
+            self.log_out()
+            return
+        if any(res_code is db.DeleteContactResult.SUCCESS for res_code in results.values()):
+            self.sync_contacts_replica_if_any()
+        self.show_contacts_changes_report(
+            "Удалено контактов", contacts_names,
+            {contact_id: self._delete_failure_reasons[res_code] for contact_id, res_code in results.items()
+             if res_code is not db.DeleteContactResult.SUCCESS})
+
     def handle_delete_contact_btn_clicked(self):
         page: ContactsPage = self.ui.contacts_tab_widget.currentWidget()
-        contact_row_idx = self._get_contacts_page_selected_row_idx(page)
-        cb = partial(page.model.delete_contact, self.session_key, contact_row_idx)
+        row_idxs = page.get_selected_row_idxs()
+        if len(row_idxs) > 1:
+            form = DeleteContactsDialog(partial(page.model.delete_contacts_async, row_idxs), len(row_idxs),
+                                        parent=self)
+            form.finished.connect(partial(self.on_delete_contacts_dialog_finished, form,
+                                          self._get_selected_contacts_names(page, row_idxs)))
+            form.open()
+            return
+        contact_row_idx, = row_idxs
+        cb = partial(page.model.delete_contact_async, contact_row_idx)
         form = DeleteContactDialog(cb, parent=self)
         form.finished.connect(partial(self.on_delete_contact_form_finished, form))
         form.open()
 
-    def show_birthdays_if_any(self):
-        key = "notifications/birthdays/turned_on"
-        type_ = bool
-        def_val = self.default_settings.value(key, True, type_)
-        if not self.settings.value(key, def_val, type_):
+    def handle_import_contacts_btn_clicked(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Импорт контактов", "",
+                                              "Контакты (*.csv *.vcf *.vcard);;CSV (*.csv);;vCard (*.vcf *.vcard)")
+        if not path:
             return
+        importer = ContactsImporter(path, parent=self)
+        progress_dialog = QProgressDialog("Импорт контактов...", "Отменить", 0, 1000, self)
+        progress_dialog.setWindowModality(Qt.WindowModal)
+        progress_dialog.setMinimumDuration(0)
+        # closed when the import is finished, i.e. the batch being sent is done after cancelling
+        progress_dialog.setAutoReset(False)
+        progress_dialog.setAutoClose(False)
+        progress_dialog.canceled.connect(importer.cancel)
+        importer.progressed.connect(partial(self.on_contacts_import_progressed, progress_dialog))
+        self.ui.import_contacts_btn.setDisabled(True)
+        importer.run_async(on_success=partial(self.on_contacts_imported, importer, progress_dialog),
+                           on_error=partial(self.on_contacts_import_failed, importer, progress_dialog))
 
-        key = "notifications/birthdays/range/type"
-        type_ = str
-        def_val = self.default_settings.value(key, "day", type_)
-        range_type = self.settings.value(key, def_val, type_)
+    @staticmethod
+    def on_contacts_import_progressed(progress_dialog: QProgressDialog, progress: ContactsImportProgress):
+        if progress.bytes_total:
+            progress_dialog.setValue(progress.bytes_read * progress_dialog.maximum() // progress.bytes_total)
+        progress_dialog.setLabelText("Импорт контактов...\nПрочитано записей: {}, добавлено контактов: {}".format(
+            progress.rows_read, progress.added_count))
+
+    def _finish_contacts_import(self, importer: ContactsImporter, progress_dialog: QProgressDialog):
+        progress_dialog.close()
+        importer.deleteLater()
+        self.ui.import_contacts_btn.setEnabled(bool(self.is_authenticated))
+
+    def on_contacts_imported(self, importer: ContactsImporter, progress_dialog: QProgressDialog,
+                             report: ContactsImportReport):
+        self._finish_contacts_import(importer, progress_dialog)
+        if report.is_session_invalid:
+            QMessageBox.warning(self, "Телефонная книжка", "Сессия истекла. Вам нужно войти заново.")
+            self.log_out()
+            return
+        if report.added_count and self.is_authenticated:
+            self.refresh_contacts()
+        if report.server_error is not None:
+            status = "остановлен: сервер не смог добавить очередную пачку контактов"
+        else:
+            status = "прерван" if report.is_cancelled else "завершен"
+        text = "Импорт {}.\n\nДобавлено контактов: {}\nУже существовали: {}\nЗаписей с ошибками: {}".format(
+            status, report.added_count, report.duplicates_count, report.errors_count)
+        msg_box = QMessageBox(QMessageBox.Warning if report.errors_count or report.server_error is not None
+                              else QMessageBox.Information, "Телефонная книжка", text, parent=self)
+        details = []
+        if report.server_error is not None:
+            details.append(report.server_error)
+        details.extend("Строка {}: {}".format(error.line, error.message) for error in report.errors)
+        if report.errors_count > len(report.errors):
+            details.append("...")
+        if details:
+            msg_box.setDetailedText("\n".join(details))
+        msg_box.exec()
+
+    def on_contacts_import_failed(self, importer: ContactsImporter, progress_dialog: QProgressDialog,
+                                  exc: Exception):
+        self._finish_contacts_import(importer, progress_dialog)
+        if not isinstance(exc, (OSError, UnicodeDecodeError, csv.Error)):
+            self.on_db_call_failed(exc)
+            return
+        # contacts of the batches sent before are imported
+        if self.is_authenticated:
+            self.refresh_contacts()
+        QMessageBox.warning(self, "Телефонная книжка", "Не удалось прочитать файл.\n\n{}".format(exc))
 
-        key = "notifications/birthdays/range/value"
-        type_ = int
-        def_val = self.default_settings.value(key, 7, type_)
-        range_value = self.settings.value(key, def_val, type_)
+    def handle_export_contacts_btn_clicked(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Экспорт контактов", "contacts.csv",
+                                              "CSV (*.csv);;vCard (*.vcf);;JSON Lines (*.jsonl)")
+        if not path:
+            return
+        exporter = ContactsExporter(path, parent=self)
+        progress_dialog = QProgressDialog("Экспорт контактов...", "Отменить", 0, 0, self)
+        progress_dialog.setWindowModality(Qt.WindowModal)
+        progress_dialog.setMinimumDuration(0)
+        progress_dialog.setAutoReset(False)
+        progress_dialog.setAutoClose(False)
+        progress_dialog.canceled.connect(exporter.cancel)
+        exporter.progressed.connect(partial(self.on_contacts_export_progressed, progress_dialog))
+        self.ui.export_contacts_btn.setDisabled(True)
+        exporter.run_async(on_success=partial(self.on_contacts_exported, exporter, progress_dialog),
+                           on_error=partial(self.on_contacts_export_failed, exporter, progress_dialog))
+
+    @staticmethod
+    def on_contacts_export_progressed(progress_dialog: QProgressDialog, written_count: int, total: int):
+        progress_dialog.setMaximum(total)
+        progress_dialog.setValue(written_count)
+        progress_dialog.setLabelText("Экспорт контактов...\nЗаписано контактов: {} из {}".format(written_count, total))
+
+    def _finish_contacts_export(self, exporter: ContactsExporter, progress_dialog: QProgressDialog):
+        progress_dialog.close()
+        exporter.deleteLater()
+        self.ui.export_contacts_btn.setEnabled(bool(self.is_authenticated))
+
+    def on_contacts_exported(self, exporter: ContactsExporter, progress_dialog: QProgressDialog,
+                             result: ContactsExportResult):
+        self._finish_contacts_export(exporter, progress_dialog)
+        if not result.is_cancelled:
+            QMessageBox.information(self, "Телефонная книжка", "Экспортировано контактов: {}".format(
+                result.written_count))
+
+    def on_contacts_export_failed(self, exporter: ContactsExporter, progress_dialog: QProgressDialog,
+                                  exc: Exception):
+        self._finish_contacts_export(exporter, progress_dialog)
+        if not isinstance(exc, OSError):
+            self.on_db_call_failed(exc)
+            return
+        QMessageBox.warning(self, "Телефонная книжка", "Не удалось записать файл.\n\n{}".format(exc))
+
+    def handle_find_duplicates_btn_clicked(self):
+        search = ContactsDuplicatesSearch(parent=self)
+        progress_dialog = QProgressDialog("Поиск похожих контактов...", "", 0, 0, self)
+        progress_dialog.setCancelButton(None)
+        progress_dialog.setWindowModality(Qt.WindowModal)
+        progress_dialog.setMinimumDuration(0)
+        search.progressed.connect(partial(self.on_contacts_duplicates_search_progressed, progress_dialog))
+        self.ui.find_duplicates_btn.setDisabled(True)
+        search.run_async(on_success=partial(self.on_contacts_duplicates_found, search, progress_dialog),
+                         on_error=partial(self.on_contacts_duplicates_search_failed, search, progress_dialog))
+
+    @staticmethod
+    def on_contacts_duplicates_search_progressed(progress_dialog: QProgressDialog, fetched_count: int):
+        progress_dialog.setLabelText("Поиск похожих контактов...\nПолучено контактов: {}".format(fetched_count))
+
+    def _finish_contacts_duplicates_search(self, search: ContactsDuplicatesSearch, progress_dialog: QProgressDialog):
+        progress_dialog.close()
+        search.deleteLater()
+        self.ui.find_duplicates_btn.setEnabled(bool(self.is_authenticated))
+
+    def on_contacts_duplicates_found(self, search: ContactsDuplicatesSearch, progress_dialog: QProgressDialog,
+                                     duplicates: ContactsDuplicates):
+        self._finish_contacts_duplicates_search(search, progress_dialog)
+        if not self.is_authenticated:
+            return
+        if not duplicates.groups:
+            QMessageBox.information(self, "Телефонная книжка", "Похожих контактов не найдено.")
+            return
+        dialog = MergeContactsDialog(db.merge_contacts_async, duplicates, parent=self)
+        dialog.finished.connect(partial(self.on_merge_contacts_dialog_finished, dialog))
+        dialog.open()
+
+    def on_contacts_duplicates_search_failed(self, search: ContactsDuplicatesSearch, progress_dialog: QProgressDialog,
+                                             exc: Exception):
+        self._finish_contacts_duplicates_search(search, progress_dialog)
+        self.on_db_call_failed(exc)
+
+    def on_merge_contacts_dialog_finished(self, dialog: MergeContactsDialog, r: QDialog.DialogCode):
+        if r == QDialog.Rejected:
+            return
+
+        results: Dict[int, Tuple[db.MergeContactsResult, Optional[int]]] = dialog.result.code
+        if any(res_code is db.MergeContactsResult.INVALID_SESSION for res_code, _ in results.values()):
+            QMessageBox.warning(self, "Телефонная книжка", "Сессия истекла. Вам нужно войти заново.")
+            self.log_out()
+            return
+        if any(res_code is db.MergeContactsResult.SUCCESS for res_code, _ in results.values()):
+            # several contacts of different pages are changed at once, so they are just fetched again
+            self.refresh_contacts()
+        self.show_contacts_changes_report(
+            "Объединено групп контактов",
+            {kept_id: dialog.contacts[kept_id][db.ContactsTableModel.Columns.name.value] for kept_id in results},
+            {kept_id: self._merge_failure_reasons[res_code] for kept_id, (res_code, _) in results.items()
+             if res_code is not db.MergeContactsResult.SUCCESS})
 
-        model = db.UpcomingBirthdaysReadModel(range_type, range_value, parent=self)
+    def show_birthdays_if_any(self):
+        birthdays_range = self.get_birthdays_range(self.settings, self.default_settings)
+        if birthdays_range is None:
+            return
+        model = db.UpcomingBirthdaysReadModel(*birthdays_range, parent=self)
         dialog = UpcomingBirthdaysDialog(model, parent=self)
-        dialog.refresh_data(self.session_key)
-        if dialog.model.rowCount() > 0:
+        if self.startup_prefetch is not None and self.startup_prefetch.birthdays is not None:
+            dialog.set_data(self.startup_prefetch.birthdays)
+            self.on_birthdays_fetched(dialog)
+            return
+        dialog.refresh_data(on_success=lambda rows: self.on_birthdays_fetched(dialog), on_error=self.on_db_call_failed)
+
+    def on_birthdays_fetched(self, dialog: UpcomingBirthdaysDialog):
+        if dialog.model.rowCount() > 0 and self.is_authenticated:
             dialog.view.resizeColumnsToContents()
 
             # dialog.adjustSize() <- this doesn't work although sizePolicy is set to Expanding,
@@ -458,10 +1035,10 @@ class MainWindow(QMainWindow):
             self.set_settings(dialog.result.field_values)
 
     @staticmethod
-    def _setting_dialog_check_db_connection_cb(settings_values: SettingsDialogFieldValues):
+    def _setting_dialog_check_db_connection_cb(settings_values: SettingsDialogFieldValues, **callbacks):
         filtered = dict([(key, value) for (key, value) in settings_values._asdict().items() if
                          key in ("host_name", "port", "database_name", "username", "password", "qsql_driver")])
-        return db.check_db_connection_settings(**filtered)
+        return db.check_db_connection_settings_async(**filtered, **callbacks)
 
     def _setup_settings_dialog(self):
         initial_values = self._get_settings_dialog_fields_values()
@@ -0,0 +1,73 @@
+from typing import Callable, Optional
+
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtWidgets import QDialog, QHeaderView, QTableWidgetItem
+
+from . import database as db
+from . import ui
+
+
+class _NumberItem(QTableWidgetItem):
+    """sorted by the number rather than by the text"""
+    def __init__(self, value):
+        super().__init__("{:.1f}".format(value) if isinstance(value, float) else str(value))
+        self.value = value
+        self.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+
+    def __lt__(self, other):
+        return self.value < other.value if isinstance(other, _NumberItem) else super().__lt__(other)
+
+
+class MetricsDialog(QDialog):
+    """a debug panel of database calls' stats by call, refreshed while shown; times are in ms"""
+    refresh_interval_ms = 2000
+
+    def __init__(self, enable_metrics_cb: Callable[[bool], Optional[db.MetricsRegistry]], parent=None):
+        super().__init__(parent, Qt.Window)
+        self.ui = ui.Ui_MetricsDialog()
+        self.ui.setupUi(self)
+        self.ui.metrics_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.ui.turned_on_chb.setChecked(db.get_metrics() is not None)
+        self.ui.turned_on_chb.toggled.connect(self.handle_turned_on_chb_toggled)
+        self.ui.refresh_btn.clicked.connect(self.refresh)
+        self.ui.reset_btn.clicked.connect(self.handle_reset_btn_clicked)
+        self.ui.button_box.rejected.connect(self.reject)
+
+        self.enable_metrics_cb = enable_metrics_cb
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(self.refresh_interval_ms)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.refresh_timer.start()
+
+    def hideEvent(self, event):
+        self.refresh_timer.stop()
+        super().hideEvent(event)
+
+    def handle_turned_on_chb_toggled(self, checked: bool):
+        self.enable_metrics_cb(checked)
+        self.refresh()
+
+    def handle_reset_btn_clicked(self):
+        registry = db.get_metrics()
+        if registry is not None:
+            registry.reset()
+        self.refresh()
+
+    def refresh(self):
+        registry = db.get_metrics()
+        snapshot = registry.snapshot() if registry is not None else {}
+        table = self.ui.metrics_table
+        table.setSortingEnabled(False)
+        table.setRowCount(len(snapshot))
+        for row_idx, (name, stats) in enumerate(sorted(snapshot.items())):
+            values = (stats.count, stats.errors, stats.percentile(50) * 1000, stats.percentile(95) * 1000,
+                      stats.percentile(99) * 1000, stats.max_seconds * 1000, stats.mean("connect") * 1000,
+                      stats.mean("execute") * 1000, stats.mean("fetch") * 1000, stats.round_trips, stats.rows)
+            table.setItem(row_idx, 0, QTableWidgetItem(name))
+            for column, value in enumerate(values, 1):
+                table.setItem(row_idx, column, _NumberItem(value))
+        table.setSortingEnabled(True)
@@ -1,18 +1,19 @@
 from functools import partial
 from types import SimpleNamespace
+from typing import Optional, Tuple
 
 from PyQt5.QtCore import Qt
-from PyQt5.QtWidgets import QApplication, QDialog, QDialogButtonBox, QLineEdit, QMessageBox
+from PyQt5.QtWidgets import QApplication, QDialog, QLineEdit, QMessageBox
 
 from . import database as db
+from . import ui
 from .msg_dialogs import show_db_conn_err_msg, show_invalid_input_warning, show_not_implemented_msg
-from .ui import Ui_AuthForm, Ui_RegisterForm
 
 
 class RegisterForm(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent, Qt.FramelessWindowHint)
-        self.ui = Ui_RegisterForm()
+        self.ui = ui.Ui_RegisterForm()
         self.ui.setupUi(self)
         self.ui.button_box.rejected.connect(self.reject)
         self.ui.button_box.accepted.connect(self.handle_ok_btn_clicked)
@@ -29,44 +30,52 @@ class RegisterForm(QDialog):
             show_invalid_input_warning(invalid_input_fields, highlighted=True, parent=self)
             return
 
-        self.ui.button_box.button(QDialogButtonBox.Ok).setDisabled(True)
-        QApplication.processEvents()
-        try:
-            res_code, password = db.register(username, email, birth_date)
-        except db.DatabaseConnectionError as exc:
-            show_db_conn_err_msg(details=str(exc), parent=self)
+        self.ui.button_box.setDisabled(True)
+        db.register_async(username, email, birth_date,
+                          on_success=partial(self.on_registered, username), on_error=self.on_db_call_failed)
+
+    def on_registered(self, username, result):
+        if not self.isVisible():
+            return
+        self.ui.button_box.setEnabled(True)
+        res_code, password = result
+        self.result.code, self.result.username, self.result.password = res_code, username, password
+        if res_code is db.RegisterResult.SUCCESS:
+            self.accept()
+            # TODO: send a password by an email
+            ans = QMessageBox.question(
+                self, "Телефонная книжка",
+                "Регистрация успешна.\n"
+                "Ваш пароль выслан [! не реализовано] на указанную почту.\n"
+                "Скопировать в буфер обмена?")
+            if ans == QMessageBox.Yes:
+                QApplication.clipboard().setText(password)
+        elif res_code is db.RegisterResult.USERNAME_EXISTS:
+            self.ui.username_ln_edt.setFocus()
+            QMessageBox.warning(self, "Телефонная книжка", "Пользователь с таким именем уже существует.")
+        elif res_code is db.RegisterResult.EMAIL_EXISTS:
+            self.ui.email_ln_edt.setFocus()
+            QMessageBox.warning(self, "Телефонная книжка", "Пользователь с таким e-mail уже существует.")
+        elif res_code is db.RegisterResult.UNKNOWN_ERROR:
+            QMessageBox.critical(self, "Телефонная книжка", "Возникла непредвиденная ошибка.")
             self.close()
         else:
-            self.result.code, self.result.username, self.result.password = res_code, username, password
-            if res_code is db.RegisterResult.SUCCESS:
-                self.accept()
-                # TODO: send a password by an email
-                ans = QMessageBox.question(
-                    self, "Телефонная книжка",
-                    "Регистрация успешна.\n"
-                    "Ваш пароль выслан [! не реализовано] на указанную почту.\n"
-                    "Скопировать в буфер обмена?")
-                if ans == QMessageBox.Yes:
-                    QApplication.clipboard().setText(password)
-            elif res_code is db.RegisterResult.USERNAME_EXISTS:
-                self.ui.username_ln_edt.setFocus()
-                QMessageBox.warning(self, "Телефонная книжка", "Пользователь с таким именем уже существует.")
-            elif res_code is db.RegisterResult.EMAIL_EXISTS:
-                self.ui.email_ln_edt.setFocus()
-                QMessageBox.warning(self, "Телефонная книжка", "Пользователь с таким e-mail уже существует.")
-            elif res_code is db.RegisterResult.UNKNOWN_ERROR:
-                QMessageBox.critical(self, "Телефонная книжка", "Возникла непредвиденная ошибка.")
-                self.close()
-            else:
-                raise RuntimeError("unknown member: {}".format(res_code))
-        finally:
-            self.ui.button_box.button(QDialogButtonBox.Ok).setEnabled(True)
+            raise RuntimeError("unknown member: {}".format(res_code))
+
+    def on_db_call_failed(self, exc: Exception):
+        if not isinstance(exc, db.DatabaseConnectionError):
+            raise exc
+        if not self.isVisible():
+            return
+        self.ui.button_box.setEnabled(True)
+        show_db_conn_err_msg(details=str(exc), parent=self)
+        self.close()
 
 
 class AuthForm(QDialog):
     def __init__(self, remember_me=False, parent=None):
         super().__init__(parent, Qt.FramelessWindowHint)
-        self.ui = Ui_AuthForm()
+        self.ui = ui.Ui_AuthForm()
         self.ui.setupUi(self)
         self.ui.login_btn.clicked.connect(self.handle_login_btn_clicked)
         self.ui.register_btn.clicked.connect(self.handle_register_button_clicked)
@@ -89,43 +98,54 @@ class AuthForm(QDialog):
             return
 
         self.ui.login_btn.setDisabled(True)
-        QApplication.processEvents()
-        try:
-            session_key = db.log_in(uname_or_email, password)
-            self.result.username, _ = db.get_user_info(session_key)
-        except db.DatabaseConnectionError as exc:
-            show_db_conn_err_msg(details=str(exc), parent=self)
-            self.close()
+        db.run_async(self.log_in, uname_or_email, password,
+                     on_success=self.on_logged_in, on_error=self.on_db_call_failed)
+
+    @staticmethod
+    def log_in(uname_or_email, password) -> Tuple[Optional[str], Optional[str]]:
+        """runs in the database thread; both calls are made in a row without returning to the GUI one"""
+        session_key = db.log_in(uname_or_email, password)
+        username = db.get_user_info(session_key)[0] if session_key else None
+        return session_key, username
+
+    def on_logged_in(self, result):
+        if not self.isVisible():
+            return
+        self.ui.login_btn.setEnabled(True)
+        session_key, self.result.username = result
+        if session_key:
+            self.result.session_key = session_key
+            self.accept()
         else:
-            if session_key:
-                self.result.session_key = session_key
-                self.accept()
-            else:
-                self.ui.password_ln_edt.setFocus()
-                QMessageBox.warning(self, "Телефонная книжка",
-                                    "Не удалось войти. Такая комбинация учетных данных не найдена.")
-        finally:
-            self.ui.login_btn.setEnabled(True)
+            self.ui.password_ln_edt.setFocus()
+            QMessageBox.warning(self, "Телефонная книжка",
+                                "Не удалось войти. Такая комбинация учетных данных не найдена.")
+
+    def on_db_call_failed(self, exc: Exception):
+        if not isinstance(exc, db.DatabaseConnectionError):
+            raise exc
+        self.ui.login_btn.setEnabled(True)
+        show_db_conn_err_msg(details=str(exc), parent=self)
+        self.close()
 
     def on_register_form_finished(self, form: RegisterForm, r: QDialog.DialogCode):
         if r == QDialog.Accepted:
-            try:
-                session_key = db.log_in(form.result.username, form.result.password)
-                self.result.username = form.result.username
-            except db.DatabaseConnectionError as exc:
-                show_db_conn_err_msg(details=str(exc), parent=self)
-                self.close()
-            else:
-                if session_key:
-                    self.result.session_key = session_key
-                    self.accept()
-                else:
-                    self.close()
-                    QMessageBox.warning(self.parent(), "Телефонная книжка", "Автоматический вход не удался.")
+            db.log_in_async(form.result.username, form.result.password,
+                            on_success=partial(self.on_logged_in_after_registration, form.result.username),
+                            on_error=self.on_db_call_failed)
         else:
             # TODO: process a case when register form closed due to db connection error
             self.show()
 
+    def on_logged_in_after_registration(self, username, session_key):
+        if session_key:
+            self.result.username = username
+            self.result.session_key = session_key
+            self.accept()
+        else:
+            self.close()
+            QMessageBox.warning(self.parent(), "Телефонная книжка", "Автоматический вход не удался.")
+
     def handle_register_button_clicked(self):
         form = RegisterForm(parent=self.parent())
         self.hide()
@@ -1,11 +1,12 @@
+from concurrent.futures import Future
 from types import SimpleNamespace
-from typing import Callable, NamedTuple, Tuple
+from typing import Callable, NamedTuple
 
 from PyQt5.QtCore import Qt
-from PyQt5.QtWidgets import QApplication, QDialog, QDialogButtonBox, QMessageBox
+from PyQt5.QtWidgets import QDialog, QDialogButtonBox, QMessageBox
 
+from . import ui
 from .msg_dialogs import show_db_conn_err_msg, show_invalid_input_warning
-from .ui import Ui_SettingsDialog
 
 
 class SettingsDialogFieldValues(NamedTuple):
@@ -23,10 +24,10 @@ class SettingsDialog(QDialog):
     # TODO: some input validation
     def __init__(self, initial_field_values: SettingsDialogFieldValues,
                  get_defaults_cb: Callable[[], SettingsDialogFieldValues],
-                 check_db_connection_cb: Callable[[SettingsDialogFieldValues], Tuple[bool, str]],
+                 check_db_connection_cb: Callable[..., Future],
                  parent=None):
         super().__init__(parent, Qt.FramelessWindowHint)
-        self.ui = Ui_SettingsDialog()
+        self.ui = ui.Ui_SettingsDialog()
         self.ui.setupUi(self)
         self.ui.check_connection_btn.clicked.connect(self.handle_check_connection_btn_clicked)
         self.ui.birthdays_notification_chb.stateChanged.connect(self.handle_birthdays_notification_chb_state_changed)
@@ -71,16 +72,22 @@ class SettingsDialog(QDialog):
             show_invalid_input_warning(invalid_input_fields, highlighted=True, parent=self)
             return
         self.ui.check_connection_btn.setDisabled(True)
-        QApplication.processEvents()
-        try:
-            conn_check = self.check_db_connection_cb(self._get_field_values())
-            if not conn_check.is_error:
-                QMessageBox.information(self, "Телефонная книжка", "Соединение установлено успешно.")
-            else:
-                msg_text = "Ошибка конфигурации." if conn_check.is_critical else "Не удалось соединиться."
-                show_db_conn_err_msg(msg_text, details=conn_check.message, critical=conn_check.is_critical, parent=self)
-        finally:
-            self.ui.check_connection_btn.setEnabled(True)
+        self.check_db_connection_cb(self._get_field_values(),
+                                    on_success=self.on_connection_checked, on_error=self.on_connection_check_failed)
+
+    def on_connection_checked(self, conn_check):
+        self.ui.check_connection_btn.setEnabled(True)
+        if not self.isVisible():
+            return
+        if not conn_check.is_error:
+            QMessageBox.information(self, "Телефонная книжка", "Соединение установлено успешно.")
+        else:
+            msg_text = "Ошибка конфигурации." if conn_check.is_critical else "Не удалось соединиться."
+            show_db_conn_err_msg(msg_text, details=conn_check.message, critical=conn_check.is_critical, parent=self)
+
+    def on_connection_check_failed(self, exc: Exception):
+        self.ui.check_connection_btn.setEnabled(True)
+        raise exc
 
     def handle_birthdays_notification_chb_state_changed(self, chb_active):
         self.ui.birthdays_notification_range_value_sb.setEnabled(chb_active)
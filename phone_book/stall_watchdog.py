@@ -0,0 +1,109 @@
+"""Detects stalls of the GUI event loop, e.g. a database call or a large model reset done in the main thread.
+
+A heartbeat timer of the main thread is checked by a helper thread: once the timer is late by the threshold,
+the main thread's Python stack & the handler running are written to the log. Stalls are summarized at exit.
+"""
+import inspect
+import logging
+import sys
+import threading
+import traceback
+from time import monotonic
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from PyQt5.QtCore import QObject, QTimer
+
+logger = logging.getLogger(__name__)
+
+
+class Stall(NamedTuple):
+    handler: str  # "?" if the stall was over before the helper thread looked at the stack
+    duration: float  # seconds
+
+
+class StallWatchdog(QObject):
+    """is to be created & started in the main thread; handlers are methods of `handler_classes`, e.g. `MainWindow`
+
+    The outermost handler on the stack is reported, i.e. the one called by the event loop.
+    """
+    heartbeat_interval_ms = 100
+    repeat_stack_interval = 5.0  # seconds; the stack of a long stall is logged again
+
+    def __init__(self, threshold_ms=500, handler_classes: Tuple[type, ...] = (), parent=None):
+        super().__init__(parent)
+        self.threshold = threshold_ms / 1000
+        self.stalls: List[Stall] = []
+        # frames are matched by code objects, as locals of a running frame aren't to be read from another thread
+        self._handler_names: Dict[object, str] = {}
+        for cls in handler_classes:
+            for name, fn in inspect.getmembers(cls, inspect.isfunction):
+                self._handler_names.setdefault(fn.__code__, "{}.{}".format(cls.__name__, name))
+        self._main_thread_id = threading.get_ident()
+        self._last_beat_at = monotonic()
+        self._stall_handler: Optional[str] = None  # set by the helper thread
+        self._timer = QTimer(self)
+        self._timer.setInterval(self.heartbeat_interval_ms)
+        self._timer.timeout.connect(self._beat)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._watch, name="phone_book_stall_watchdog", daemon=True)
+
+    def start(self):
+        self._last_beat_at = monotonic()
+        self._timer.start()
+        self._thread.start()
+
+    def stop(self):
+        self._timer.stop()
+        self._stopped.set()
+        self._thread.join()
+
+    def _beat(self):
+        now = monotonic()
+        stalled_for = now - self._last_beat_at - self.heartbeat_interval_ms / 1000
+        self._last_beat_at = now
+        if stalled_for >= self.threshold:
+            handler, self._stall_handler = self._stall_handler or "?", None
+            self.stalls.append(Stall(handler, stalled_for))
+            logger.warning("The event loop was stalled for %.0f ms in %s", stalled_for * 1000, handler)
+
+    def _find_handler(self, frame) -> str:
+        handler = "?"
+        while frame is not None:
+            handler = self._handler_names.get(frame.f_code, handler)
+            frame = frame.f_back
+        return handler
+
+    def _watch(self):
+        sampled_beat_at, sampled_at = None, 0.0
+        while not self._stopped.wait(self.threshold / 4):
+            last_beat_at = self._last_beat_at
+            now = monotonic()
+            if now - last_beat_at - self.heartbeat_interval_ms / 1000 < self.threshold:
+                continue
+            if last_beat_at == sampled_beat_at and now - sampled_at < self.repeat_stack_interval:
+                continue
+            frame = sys._current_frames().get(self._main_thread_id)
+            if frame is None:
+                continue
+            handler = self._find_handler(frame)
+            stack = "".join(traceback.format_stack(frame))
+            del frame
+            if last_beat_at != sampled_beat_at:
+                self._stall_handler = handler
+            sampled_beat_at, sampled_at = last_beat_at, now
+            logger.warning("The event loop is stalled for %.0f ms in %s; the main thread's stack:\n%s",
+                           (now - last_beat_at) * 1000, handler, stack)
+
+    def summary(self) -> str:
+        if not self.stalls:
+            return "No event loop stalls of {:.0f} ms or longer".format(self.threshold * 1000)
+        durations = [stall.duration for stall in self.stalls]
+        lines = ["Event loop stalls of {:.0f} ms or longer: {}, {:.1f} s in total, the longest {:.0f} ms".format(
+            self.threshold * 1000, len(durations), sum(durations), max(durations) * 1000)]
+        by_handler: Dict[str, List[float]] = {}
+        for stall in self.stalls:
+            by_handler.setdefault(stall.handler, []).append(stall.duration)
+        for handler, durations in sorted(by_handler.items(), key=lambda item: -sum(item[1])):
+            lines.append("  {}: {}, {:.1f} s in total, the longest {:.0f} ms".format(
+                handler, len(durations), sum(durations), max(durations) * 1000))
+        return "\n".join(lines)
@@ -0,0 +1,81 @@
+"""Resumes the remembered session while the main window is being built.
+
+The pipeline is started right after `QApplication` is created: the database thread opens the connection,
+checks the session & binds it, then prefetches what the window shows first, i.e. contacts of the first tab &
+upcoming birthdays. By the time the window is shown, it is populated without round trips of its own.
+"""
+import logging
+from concurrent.futures import Future
+from time import perf_counter
+from typing import List, NamedTuple, Optional
+
+from . import database as db
+
+logger = logging.getLogger(__name__)
+
+
+def restore_session(session_key) -> Optional[str]:
+    """runs in the database thread; returns a username if the session still exists"""
+    if not db.check_session_exists(session_key):
+        return None
+    username, _ = db.get_user_info(session_key)
+    return username
+
+
+class StartupPrefetch(NamedTuple):
+    username: Optional[str]  # None if the session has expired; nothing is prefetched then
+    contacts_count: Optional[int] = None  # None if contacts aren't prefetched
+    contacts: Optional[List[List]] = None  # all contacts sorted, or the first page of `contacts_bucket`
+    contacts_bucket: Optional[int] = None  # set if the address book is shown by pages
+    birthdays: Optional[List[List]] = None  # None if birthdays notifications are turned off
+
+
+class StartupPipeline:
+    """`setup_db()` has to be called before `start()`; the result is a `StartupPrefetch`
+
+    Contacts aren't prefetched if `contacts_paging_threshold` is None, e.g. when they are shown from the replica.
+    Only the session check is critical: a failed prefetch is left to the window to be repeated.
+    """
+    def __init__(self, session_key: str, contacts_paging_threshold: Optional[int] = None, first_bucket=1,
+                 page_size=500, birthdays_days: Optional[int] = None):
+        self.session_key = session_key
+        self.contacts_paging_threshold = contacts_paging_threshold
+        self.first_bucket = first_bucket
+        self.page_size = page_size
+        self.birthdays_days = birthdays_days
+        self.future: Optional[Future] = None
+
+    def start(self) -> Future:
+        self.future = db.run_async(self.run)
+        return self.future
+
+    def run(self) -> StartupPrefetch:
+        """runs in the database thread"""
+        started_at = perf_counter()
+        username = restore_session(self.session_key)
+        if username is None:
+            return StartupPrefetch(None)
+        db.bind_session(self.session_key)
+        try:
+            prefetch = self._prefetch(username)
+        except db.DatabaseError as exc:
+            logger.warning("Startup prefetch failed: %s", exc)
+            return StartupPrefetch(username)
+        logger.debug("Session resumed & %s contacts, %s birthdays prefetched in %.0f ms",
+                     "no" if prefetch.contacts is None else len(prefetch.contacts),
+                     "no" if prefetch.birthdays is None else len(prefetch.birthdays),
+                     (perf_counter() - started_at) * 1000)
+        return prefetch
+
+    def _prefetch(self, username: str) -> StartupPrefetch:
+        count = contacts = bucket = birthdays = None
+        if self.contacts_paging_threshold is not None:
+            count = db.count_contacts()
+            if count > self.contacts_paging_threshold:
+                bucket = self.first_bucket
+                contacts = db.get_contacts_page(bucket, limit=self.page_size)
+            else:
+                contacts = db.ContactsReadWriteModel.fetch_rows()
+        if self.birthdays_days is not None:
+            birthdays = db.get_contacts_having_birthday_in_range(self.birthdays_days)
+        return StartupPrefetch(username, count, contacts, bucket, birthdays)
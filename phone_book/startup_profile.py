@@ -0,0 +1,117 @@
+"""Times startup up to the first paint of the main window, by stages & by imported modules.
+
+Nothing heavy is imported here, so that Qt's modules are timed as well.
+"""
+import importlib.abc
+import sys
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
+
+
+class _TimedLoader(importlib.abc.Loader):
+    def __init__(self, loader, timer: "ImportTimer", name: str):
+        self._loader = loader
+        self._timer = timer
+        self._name = name
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._timer.enter(self._name)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._timer.exit()
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    """times the execution of modules; like with `-X importtime`, a module's cumulative time includes the ones
+    of modules imported by it, while its self time doesn't"""
+    def __init__(self):
+        self.times: Dict[str, Tuple[float, float]] = {}  # (cumulative, self) seconds by module
+        self._stack: List[List] = []  # [name, started at, time of nested imports]
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(spec.loader, self, fullname)
+                return spec
+        return None
+
+    def enter(self, name: str):
+        self._stack.append([name, perf_counter(), 0.0])
+
+    def exit(self):
+        name, started_at, nested = self._stack.pop()
+        cumulative = perf_counter() - started_at
+        self.times[name] = (cumulative, cumulative - nested)
+        if self._stack:
+            self._stack[-1][2] += cumulative
+
+    def install(self):
+        sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+
+class StartupProfile:
+    """stages are marked as startup goes; the report is made at the first paint of the watched window"""
+    slowest_imports_count = 20
+
+    def __init__(self, started_at: float):
+        self.started_at = started_at
+        self.stages: List[Tuple[str, float]] = []
+        self.import_timer = ImportTimer()
+        self.first_paint_at: Optional[float] = None
+        self._paint_filter = None
+
+    def start(self):
+        self.import_timer.install()
+
+    def mark(self, stage: str):
+        """`stage` is over"""
+        self.stages.append((stage, perf_counter()))
+
+    def watch_first_paint(self, widget, on_painted):
+        from PyQt5.QtCore import QEvent, QObject
+
+        profile = self
+
+        class PaintFilter(QObject):
+            def eventFilter(self, watched, event):
+                if event.type() == QEvent.Paint and profile.first_paint_at is None:
+                    profile.first_paint_at = perf_counter()
+                    profile.import_timer.uninstall()
+                    watched.removeEventFilter(self)
+                    on_painted()
+                return False
+
+        self._paint_filter = PaintFilter(widget)
+        widget.installEventFilter(self._paint_filter)
+
+    def report(self) -> str:
+        lines = []
+        if self.first_paint_at is not None:
+            lines.append("Startup: the first paint in {:.0f} ms".format((self.first_paint_at - self.started_at) * 1000))
+        previous_at = self.started_at
+        marks = sorted(self.stages + ([("first paint", self.first_paint_at)] if self.first_paint_at else []),
+                       key=lambda mark: mark[1])
+        for stage, at in marks:
+            lines.append("  {:<24}{:>8.1f} ms".format(stage, (at - previous_at) * 1000))
+            previous_at = at
+        times = sorted(self.import_timer.times.items(), key=lambda item: -item[1][1])
+        lines.append("Imports: {} modules, {:.0f} ms; the slowest by self time (cumulative, self; ms):".format(
+            len(times), sum(self_time for _, self_time in self.import_timer.times.values()) * 1000))
+        for name, (cumulative, self_time) in times[:self.slowest_imports_count]:
+            lines.append("  {:<48}{:>8.1f}{:>8.1f}".format(name, cumulative * 1000, self_time * 1000))
+        return "\n".join(lines)
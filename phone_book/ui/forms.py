@@ -0,0 +1,79 @@
+"""Generated forms set up further: input validation & highlighting of invalid fields."""
+from PyQt5.QtCore import QDate, QRegularExpression
+from PyQt5.QtGui import QIntValidator, QRegularExpressionValidator
+
+from . import auth_form, contact_data_form, register_form, settings_dialog
+from ..input_validation import (CONTACT_NAME_PATTERN, PHONE_NUMBER_PATTERN, InputValidationHighlighterMixin,
+                                make_regular_expression)
+
+
+class Ui_AuthForm(auth_form.Ui_AuthForm, InputValidationHighlighterMixin):
+    def setupUi(self, AuthForm):
+        super().setupUi(AuthForm)
+
+        # Just forbid an empty string:
+        rx = QRegularExpression(".{1,}")
+        if not rx.isValid():
+            raise ValueError(rx.errorString())
+        self.username_ln_edt.setValidator(QRegularExpressionValidator(rx, self.username_ln_edt))
+        self.password_ln_edt.setValidator(QRegularExpressionValidator(rx, self.password_ln_edt))
+
+        self.setup_highlighting()
+
+
+class Ui_RegisterForm(register_form.Ui_RegisterForm, InputValidationHighlighterMixin):
+    def setupUi(self, RegisterForm):
+        super().setupUi(RegisterForm)
+        self.birth_date_dt_edt.setMaximumDate(QDate.currentDate().addYears(-16))
+        self.username_ln_edt.setFocus()
+
+        rx = QRegularExpression(".{1,255}")
+        if not rx.isValid():
+            raise ValueError(rx.errorString())
+        self.username_ln_edt.setValidator(QRegularExpressionValidator(rx, self.username_ln_edt))
+        self.username_ln_edt.setToolTip("Любая строка от 1 до 255 символов.")
+
+        # adopted from https://emailregex.com
+        rx = QRegularExpression(
+            r"""(?:[a-z0-9!#$%&'*+/=?^_`{|}~-]+(?:\.[a-z0-9!#$%&'*+/=?^_`{|}~-]+)*|"(?:[\x01-\x08\x0b\x0c\x0e-\x1f\x21\x23-\x5b\x5d-\x7f]|\\[\x01-\x09\x0b\x0c\x0e-\x7f])*")@(?:(?:[a-z0-9](?:[a-z0-9-]*[a-z0-9])?\.)+[a-z0-9](?:[a-z0-9-]*[a-z0-9])?|\[(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?|[a-z0-9-]*[a-z0-9]:(?:[\x01-\x08\x0b\x0c\x0e-\x1f\x21-\x5a\x53-\x7f]|\\[\x01-\x09\x0b\x0c\x0e-\x7f])+)\])"""
+        )
+        if not rx.isValid():
+            raise ValueError(rx.errorString())
+        self.email_ln_edt.setValidator(QRegularExpressionValidator(rx, self.email_ln_edt))
+
+        self.setup_highlighting()
+
+
+class Ui_ContactDataForm(contact_data_form.Ui_ContactDataForm, InputValidationHighlighterMixin):
+    def setupUi(self, ContactDataForm):
+        super().setupUi(ContactDataForm)
+        self.birth_date_dt_edt.setMaximumDate(QDate.currentDate())
+        self.name_ln_edt.setFocus()
+
+        rx = make_regular_expression(CONTACT_NAME_PATTERN)
+        self.name_ln_edt.setValidator(QRegularExpressionValidator(rx, self.name_ln_edt))
+        self.name_ln_edt.setToolTip("Любая строка от 1 до 255 символов.")
+
+        rx = make_regular_expression(PHONE_NUMBER_PATTERN)
+        self.phone_number_ln_edt.setValidator(QRegularExpressionValidator(rx, self.phone_number_ln_edt))
+
+        self.setup_highlighting()
+
+
+class Ui_SettingsDialog(settings_dialog.Ui_SettingsDialog, InputValidationHighlighterMixin):
+    def setupUi(self, ContactsPage):
+        super().setupUi(ContactsPage)
+
+        rx = QRegularExpression(".{1,}")
+        if not rx.isValid():
+            raise ValueError(rx.errorString())
+        self.host_name_ln_edt.setValidator(QRegularExpressionValidator(rx, self.host_name_ln_edt))
+        self.database_name_ln_edt.setValidator(QRegularExpressionValidator(rx, self.database_name_ln_edt))
+        self.username_ln_edt.setValidator(QRegularExpressionValidator(rx, self.username_ln_edt))
+        self.password_ln_edt.setValidator(QRegularExpressionValidator(rx, self.password_ln_edt))
+
+        min_, max_ = 0, 2 ** 16 - 1
+        self.port_ln_edt.setValidator(QIntValidator(min_, max_, self.port_ln_edt))
+        self.port_ln_edt.setToolTip("Целое число от {} до {}.".format(min_, max_))
+
+        self.setup_highlighting()
@@ -35,6 +35,23 @@ class Ui_MainWindow(object):
         self.delete_contact_btn.setEnabled(False)
         self.delete_contact_btn.setObjectName("delete_contact_btn")
         self.horizontalLayout.addWidget(self.delete_contact_btn)
+        self.import_contacts_btn = QtWidgets.QPushButton(self.centralwidget)
+        self.import_contacts_btn.setEnabled(False)
+        self.import_contacts_btn.setObjectName("import_contacts_btn")
+        self.horizontalLayout.addWidget(self.import_contacts_btn)
+        self.export_contacts_btn = QtWidgets.QPushButton(self.centralwidget)
+        self.export_contacts_btn.setEnabled(False)
+        self.export_contacts_btn.setObjectName("export_contacts_btn")
+        self.horizontalLayout.addWidget(self.export_contacts_btn)
+        self.find_duplicates_btn = QtWidgets.QPushButton(self.centralwidget)
+        self.find_duplicates_btn.setEnabled(False)
+        self.find_duplicates_btn.setObjectName("find_duplicates_btn")
+        self.horizontalLayout.addWidget(self.find_duplicates_btn)
+        self.search_ln_edt = QtWidgets.QLineEdit(self.centralwidget)
+        self.search_ln_edt.setEnabled(False)
+        self.search_ln_edt.setClearButtonEnabled(True)
+        self.search_ln_edt.setObjectName("search_ln_edt")
+        self.horizontalLayout.addWidget(self.search_ln_edt)
         spacerItem = QtWidgets.QSpacerItem(40, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
         self.horizontalLayout.addItem(spacerItem)
         self.label = QtWidgets.QLabel(self.centralwidget)
@@ -52,6 +69,16 @@ class Ui_MainWindow(object):
         self.settings_btn.setObjectName("settings_btn")
         self.horizontalLayout.addWidget(self.settings_btn)
         self.verticalLayout.addLayout(self.horizontalLayout)
+        self.search_results_view = QtWidgets.QTableView(self.centralwidget)
+        self.search_results_view.setVisible(False)
+        self.search_results_view.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.search_results_view.setAlternatingRowColors(True)
+        self.search_results_view.setSelectionMode(QtWidgets.QAbstractItemView.SingleSelection)
+        self.search_results_view.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.search_results_view.setObjectName("search_results_view")
+        self.search_results_view.horizontalHeader().setHighlightSections(False)
+        self.search_results_view.verticalHeader().setVisible(False)
+        self.verticalLayout.addWidget(self.search_results_view)
         self.contacts_tab_widget = QtWidgets.QTabWidget(self.centralwidget)
         self.contacts_tab_widget.setTabPosition(QtWidgets.QTabWidget.West)
         self.contacts_tab_widget.setTabShape(QtWidgets.QTabWidget.Rounded)
@@ -69,6 +96,10 @@ class Ui_MainWindow(object):
         self.add_contact_btn.setText(_translate("MainWindow", "Добавить"))
         self.edit_contact_btn.setText(_translate("MainWindow", "Изменить"))
         self.delete_contact_btn.setText(_translate("MainWindow", "Удалить"))
+        self.import_contacts_btn.setText(_translate("MainWindow", "Импорт"))
+        self.export_contacts_btn.setText(_translate("MainWindow", "Экспорт"))
+        self.find_duplicates_btn.setText(_translate("MainWindow", "Дубликаты"))
+        self.search_ln_edt.setPlaceholderText(_translate("MainWindow", "Поиск по имени"))
         self.label.setText(_translate("MainWindow", "Вход не выполнен"))
         self.log_in_out_btn.setText(_translate("MainWindow", "Войти"))
         self.settings_btn.setText(_translate("MainWindow", "Настройки"))
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+# Form implementation generated from reading ui file 'qt_designer/merge_contacts_dialog.ui'
+#
+# Created by: PyQt5 UI code generator 5.12.1
+#
+# WARNING! All changes made in this file will be lost!
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+
+class Ui_MergeContactsDialog(object):
+    def setupUi(self, MergeContactsDialog):
+        MergeContactsDialog.setObjectName("MergeContactsDialog")
+        MergeContactsDialog.setWindowModality(QtCore.Qt.ApplicationModal)
+        MergeContactsDialog.resize(520, 420)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Expanding)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(MergeContactsDialog.sizePolicy().hasHeightForWidth())
+        MergeContactsDialog.setSizePolicy(sizePolicy)
+        MergeContactsDialog.setMinimumSize(QtCore.QSize(300, 200))
+        MergeContactsDialog.setStyleSheet("#MergeContactsDialog {\n"
+"    border-width: 2;\n"
+"    border-radius: 5;\n"
+"    border-style: solid;\n"
+"    border-color: gray;\n"
+"}\n"
+"")
+        self.gridLayout = QtWidgets.QGridLayout(MergeContactsDialog)
+        self.gridLayout.setObjectName("gridLayout")
+        self.label = QtWidgets.QLabel(MergeContactsDialog)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Preferred, QtWidgets.QSizePolicy.Minimum)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.label.sizePolicy().hasHeightForWidth())
+        self.label.setSizePolicy(sizePolicy)
+        font = QtGui.QFont()
+        font.setFamily("Arial")
+        font.setPointSize(16)
+        self.label.setFont(font)
+        self.label.setScaledContents(True)
+        self.label.setAlignment(QtCore.Qt.AlignCenter)
+        self.label.setWordWrap(False)
+        self.label.setObjectName("label")
+        self.gridLayout.addWidget(self.label, 0, 0, 1, 1)
+        self.hint_label = QtWidgets.QLabel(MergeContactsDialog)
+        self.hint_label.setWordWrap(True)
+        self.hint_label.setObjectName("hint_label")
+        self.gridLayout.addWidget(self.hint_label, 1, 0, 1, 1)
+        self.groups_tree = QtWidgets.QTreeWidget(MergeContactsDialog)
+        self.groups_tree.setAlternatingRowColors(True)
+        self.groups_tree.setSelectionMode(QtWidgets.QAbstractItemView.NoSelection)
+        self.groups_tree.setObjectName("groups_tree")
+        self.gridLayout.addWidget(self.groups_tree, 2, 0, 1, 1)
+        self.button_box = QtWidgets.QDialogButtonBox(MergeContactsDialog)
+        self.button_box.setStyleSheet("QDialogButtonBox *[text=\"OK\"] {\n"
+"    background: #ccff66;\n"
+"}\n"
+"\n"
+"QDialogButtonBox *[text=\"Cancel\"] { \n"
+"    background: #fe6665;\n"
+"}")
+        self.button_box.setOrientation(QtCore.Qt.Horizontal)
+        self.button_box.setStandardButtons(QtWidgets.QDialogButtonBox.Cancel|QtWidgets.QDialogButtonBox.Ok)
+        self.button_box.setCenterButtons(True)
+        self.button_box.setObjectName("button_box")
+        self.gridLayout.addWidget(self.button_box, 3, 0, 1, 1)
+
+        self.retranslateUi(MergeContactsDialog)
+        QtCore.QMetaObject.connectSlotsByName(MergeContactsDialog)
+
+    def retranslateUi(self, MergeContactsDialog):
+        _translate = QtCore.QCoreApplication.translate
+        MergeContactsDialog.setWindowTitle(_translate("MergeContactsDialog", "Телефонная книжка"))
+        self.label.setText(_translate("MergeContactsDialog", "Похожие контакты"))
+        self.hint_label.setText(_translate("MergeContactsDialog", "Отмеченные группы будут объединены в выделенный жирным контакт. Сходство показано с ним, заранее отмечены контакты, сходные на 90% и более. Двойной щелчок по контакту выбирает его вместо выделенного, снятая отметка исключает контакт из объединения."))
+        self.groups_tree.headerItem().setText(0, _translate("MergeContactsDialog", "Имя"))
+        self.groups_tree.headerItem().setText(1, _translate("MergeContactsDialog", "Телефон"))
+        self.groups_tree.headerItem().setText(2, _translate("MergeContactsDialog", "Дата рождения"))
+        self.groups_tree.headerItem().setText(3, _translate("MergeContactsDialog", "Сходство"))
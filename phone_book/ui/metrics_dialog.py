@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+# Form implementation generated from reading ui file 'qt_designer/metrics_dialog.ui'
+#
+# Created by: PyQt5 UI code generator 5.12.1
+#
+# WARNING! All changes made in this file will be lost!
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+
+class Ui_MetricsDialog(object):
+    def setupUi(self, MetricsDialog):
+        MetricsDialog.setObjectName("MetricsDialog")
+        MetricsDialog.resize(900, 400)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Expanding)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(MetricsDialog.sizePolicy().hasHeightForWidth())
+        MetricsDialog.setSizePolicy(sizePolicy)
+        MetricsDialog.setMinimumSize(QtCore.QSize(400, 200))
+        self.gridLayout = QtWidgets.QGridLayout(MetricsDialog)
+        self.gridLayout.setObjectName("gridLayout")
+        self.turned_on_chb = QtWidgets.QCheckBox(MetricsDialog)
+        self.turned_on_chb.setObjectName("turned_on_chb")
+        self.gridLayout.addWidget(self.turned_on_chb, 0, 0, 1, 3)
+        self.metrics_table = QtWidgets.QTableWidget(MetricsDialog)
+        self.metrics_table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.metrics_table.setAlternatingRowColors(True)
+        self.metrics_table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.metrics_table.setObjectName("metrics_table")
+        self.metrics_table.setColumnCount(12)
+        self.metrics_table.setRowCount(0)
+        item = QtWidgets.QTableWidgetItem()
+        self.metrics_table.setHorizontalHeaderItem(0, item)
+        item = QtWidgets.QTableWidgetItem()
+        self.metrics_table.setHorizontalHeaderItem(1, item)
+        item = QtWidgets.QTableWidgetItem()
+        self.metrics_table.setHorizontalHeaderItem(2, item)
+        item = QtWidgets.QTableWidgetItem()
+        self.metrics_table.setHorizontalHeaderItem(3, item)
+        item = QtWidgets.QTableWidgetItem()
+        self.metrics_table.setHorizontalHeaderItem(4, item)
+        item = QtWidgets.QTableWidgetItem()
+        self.metrics_table.setHorizontalHeaderItem(5, item)
+        item = QtWidgets.QTableWidgetItem()
+        self.metrics_table.setHorizontalHeaderItem(6, item)
+        item = QtWidgets.QTableWidgetItem()
+        self.metrics_table.setHorizontalHeaderItem(7, item)
+        item = QtWidgets.QTableWidgetItem()
+        self.metrics_table.setHorizontalHeaderItem(8, item)
+        item = QtWidgets.QTableWidgetItem()
+        self.metrics_table.setHorizontalHeaderItem(9, item)
+        item = QtWidgets.QTableWidgetItem()
+        self.metrics_table.setHorizontalHeaderItem(10, item)
+        item = QtWidgets.QTableWidgetItem()
+        self.metrics_table.setHorizontalHeaderItem(11, item)
+        self.metrics_table.verticalHeader().setVisible(False)
+        self.gridLayout.addWidget(self.metrics_table, 1, 0, 1, 3)
+        self.refresh_btn = QtWidgets.QPushButton(MetricsDialog)
+        self.refresh_btn.setObjectName("refresh_btn")
+        self.gridLayout.addWidget(self.refresh_btn, 2, 0, 1, 1)
+        self.reset_btn = QtWidgets.QPushButton(MetricsDialog)
+        self.reset_btn.setObjectName("reset_btn")
+        self.gridLayout.addWidget(self.reset_btn, 2, 1, 1, 1)
+        self.button_box = QtWidgets.QDialogButtonBox(MetricsDialog)
+        self.button_box.setOrientation(QtCore.Qt.Horizontal)
+        self.button_box.setStandardButtons(QtWidgets.QDialogButtonBox.Close)
+        self.button_box.setObjectName("button_box")
+        self.gridLayout.addWidget(self.button_box, 2, 2, 1, 1)
+
+        self.retranslateUi(MetricsDialog)
+        QtCore.QMetaObject.connectSlotsByName(MetricsDialog)
+
+    def retranslateUi(self, MetricsDialog):
+        _translate = QtCore.QCoreApplication.translate
+        MetricsDialog.setWindowTitle(_translate("MetricsDialog", "Телефонная книжка: метрики базы данных"))
+        self.turned_on_chb.setText(_translate("MetricsDialog", "Собирать метрики"))
+        self.metrics_table.setSortingEnabled(True)
+        item = self.metrics_table.horizontalHeaderItem(0)
+        item.setText(_translate("MetricsDialog", "Вызов"))
+        item = self.metrics_table.horizontalHeaderItem(1)
+        item.setText(_translate("MetricsDialog", "Число"))
+        item = self.metrics_table.horizontalHeaderItem(2)
+        item.setText(_translate("MetricsDialog", "Ошибки"))
+        item = self.metrics_table.horizontalHeaderItem(3)
+        item.setText(_translate("MetricsDialog", "p50, мс"))
+        item = self.metrics_table.horizontalHeaderItem(4)
+        item.setText(_translate("MetricsDialog", "p95, мс"))
+        item = self.metrics_table.horizontalHeaderItem(5)
+        item.setText(_translate("MetricsDialog", "p99, мс"))
+        item = self.metrics_table.horizontalHeaderItem(6)
+        item.setText(_translate("MetricsDialog", "Макс., мс"))
+        item = self.metrics_table.horizontalHeaderItem(7)
+        item.setText(_translate("MetricsDialog", "Соединение, мс"))
+        item = self.metrics_table.horizontalHeaderItem(8)
+        item.setText(_translate("MetricsDialog", "Выполнение, мс"))
+        item = self.metrics_table.horizontalHeaderItem(9)
+        item.setText(_translate("MetricsDialog", "Выборка, мс"))
+        item = self.metrics_table.horizontalHeaderItem(10)
+        item.setText(_translate("MetricsDialog", "Обращения"))
+        item = self.metrics_table.horizontalHeaderItem(11)
+        item.setText(_translate("MetricsDialog", "Строки"))
+        self.refresh_btn.setText(_translate("MetricsDialog", "Обновить"))
+        self.reset_btn.setText(_translate("MetricsDialog", "Сбросить"))
@@ -0,0 +1,21 @@
+"""Generated forms of contacts tables set up further."""
+from PyQt5.QtGui import QPalette
+from PyQt5.QtWidgets import QHeaderView
+
+from . import contacts_page, upcoming_birthdays_dialog
+
+
+class Ui_ContactsPage(contacts_page.Ui_ContactsPage):
+    def setupUi(self, ContactsPage):
+        super().setupUi(ContactsPage)
+        self.tableView.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        pal = self.tableView.palette()
+        pal.setColor(QPalette.Inactive, QPalette.Highlight, pal.color(QPalette.Active, QPalette.Highlight))
+        pal.setColor(QPalette.Inactive, QPalette.HighlightedText, pal.color(QPalette.Active, QPalette.HighlightedText))
+        self.tableView.setPalette(pal)
+
+
+class Ui_UpcomingBirthdaysDialog(upcoming_birthdays_dialog.Ui_UpcomingBirthdaysDialog):
+    def setupUi(self, ContactsPage):
+        super().setupUi(ContactsPage)
+        self.tableView.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)